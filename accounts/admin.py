@@ -1,5 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.shortcuts import render
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from .models import User
 
@@ -43,4 +45,42 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'last_login')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at', 'last_login')
+    
+    actions = ['bulk_grant_points']
+    
+    def bulk_grant_points(self, request, queryset):
+        """選択したユーザーにポイントを一括付与する"""
+        from jobs.models import Job
+        
+        if 'apply' in request.POST:
+            try:
+                total_points = int(request.POST.get('total_points', 0))
+            except ValueError:
+                total_points = 0
+            reason = request.POST.get('reason', '')
+            
+            if total_points > 0 and reason:
+                # 付与はバックグラウンドジョブで実行する
+                user_ids = list(queryset.filter(is_admin=False).values_list('id', flat=True))
+                job = Job.enqueue('points.bulk_grant', {
+                    'user_ids': user_ids,
+                    'total_points': total_points,
+                    'reason': reason,
+                    'created_by_id': request.user.id,
+                }, created_by=request.user)
+                self.message_user(
+                    request,
+                    f'{len(user_ids)}名への{total_points}ポイント付与をジョブ #{job.id} として受け付けました。'
+                )
+                return None
+            self.message_user(request, '必要な情報を入力してください。', level=messages.ERROR)
+        
+        return render(request, 'admin/accounts/user/bulk_grant_points.html', {
+            **self.admin_site.each_context(request),
+            'title': 'ポイント一括付与',
+            'opts': self.model._meta,
+            'queryset': queryset,
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        })
+    bulk_grant_points.short_description = '選択したユーザーにポイントを一括付与する'
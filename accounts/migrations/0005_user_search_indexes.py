@@ -0,0 +1,39 @@
+from django.db import migrations
+
+SEARCH_FIELDS = ('full_name', 'username', 'email')
+
+
+def create_search_indexes(apps, schema_editor):
+    """ユーザー検索用のインデックス（データベースごとに検索方法が異なるため個別に作成）"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # 部分一致（icontains = UPPER(...) LIKE UPPER(...)）用のトライグラムインデックス
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS users_{field}_trgm_idx '
+                f'ON users USING gin ((UPPER({field}::text)) gin_trgm_ops)'
+            )
+    elif vendor == 'sqlite':
+        # 前方一致（LIKE 'xxx%'）は NOCASE のインデックスで検索できる
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS users_{field}_nocase_idx ON users ({field} COLLATE NOCASE)'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    suffix = 'trgm' if schema_editor.connection.vendor == 'postgresql' else 'nocase'
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS users_{field}_{suffix}_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_is_staff_user_is_superuser'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connections, models, router
 
 
 class User(AbstractUser):
@@ -18,6 +18,21 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.full_name} ({self.username})"
 
+    @classmethod
+    def search(cls, query):
+        """
+        一般ユーザーを氏名・ユーザー名・メールアドレスで検索
+
+        PostgreSQL では部分一致（pg_trgm のインデックスを使用）、
+        それ以外では前方一致（NOCASE のインデックスを使用）で検索する。
+        """
+        vendor = connections[router.db_for_read(cls)].vendor
+        lookup = 'icontains' if vendor == 'postgresql' else 'istartswith'
+        condition = models.Q()
+        for field in ('full_name', 'username', 'email'):
+            condition |= models.Q(**{f'{field}__{lookup}': query})
+        return cls.objects.filter(condition, is_admin=False)
+
     def save(self, *args, **kwargs):
         # is_adminがTrueの場合、is_staffとis_superuserも自動的にTrueに設定
         if self.is_admin:
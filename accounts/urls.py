@@ -5,4 +5,7 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
+    
+    # 管理者用 API
+    path('api/search/', views.user_search_api, name='user_search_api'),
 ]
\ No newline at end of file
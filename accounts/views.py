@@ -1,8 +1,16 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.http import JsonResponse
 from django.urls import reverse
+from incentive_system.pagination import CursorPaginator
+from .models import User
+
+
+def is_admin(user):
+    """管理者かどうかチェック"""
+    return user.is_authenticated and user.is_admin
 
 
 def login_view(request):
@@ -37,3 +45,28 @@ def profile_view(request):
         'user': request.user
     })
 
+
+@user_passes_test(is_admin)
+def user_search_api(request):
+    """API: 一般ユーザーを検索（ポイント付与画面のインクリメンタルサーチ用）"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'success': True, 'users': [], 'next_cursor': None})
+    
+    users_query = User.search(query).only('id', 'full_name', 'username', 'email')
+    paginator = CursorPaginator(users_query, ('full_name', 'id'), per_page=20)
+    users = paginator.get_page(request.GET.get('cursor'))
+    
+    return JsonResponse({
+        'success': True,
+        'users': [
+            {
+                'id': user.id,
+                'full_name': user.full_name,
+                'username': user.username,
+                'email': user.email,
+            }
+            for user in users
+        ],
+        'next_cursor': users.next_cursor,
+    })
@@ -0,0 +1,202 @@
+"""
+大量データ向けの管理画面（スケールモード）
+
+台帳のように行数が非常に多いテーブルの一覧画面で使う部品をまとめる。
+
+- EstimatedCountPaginator: 全件 COUNT の代わりに推定件数・上限付き件数を使う
+- AutocompleteListFilter: 選択肢を列挙せず、自動補完で絞り込む
+- DateDrillDownListFilter: 年 → 月の順に範囲条件（インデックス利用）で絞り込む
+- ScaleModeAdminMixin: 上記を使う ModelAdmin 用の共通設定
+"""
+from datetime import datetime
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    件数を推定するページネーター
+
+    絞り込み無しの場合、PostgreSQL では pg_class.reltuples の推定値を使う。
+    それ以外は ADMIN_EXACT_COUNT_LIMIT 件までだけ数え、上限を超えた分は数えない。
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+        queryset = self.object_list
+
+        estimate = self._estimate_table_rows(queryset)
+        if estimate is not None and estimate > limit:
+            return estimate
+        return queryset.order_by()[:limit + 1].count()
+
+    def _estimate_table_rows(self, queryset):
+        """絞り込み無しのクエリの推定行数（推定できない場合は None）"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # ANALYZE 前のテーブルは -1（または 0）になる
+        if row is None or row[0] <= 0:
+            return None
+        return int(row[0])
+
+
+class AutocompleteListFilter(admin.FieldListFilter):
+    """
+    自動補完による外部キーの絞り込み
+
+    RelatedOnlyFieldListFilter のように一覧全体から DISTINCT で選択肢を作らず、
+    参照先の管理画面（search_fields が必要）の自動補完 API で検索する。
+    """
+    template = 'admin/autocomplete_list_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+        if hasattr(field, 'verbose_name'):
+            self.title = field.verbose_name
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'すべて',
+        }
+
+    @property
+    def widget_id(self):
+        return f'id_filter_{self.field_path}'
+
+    def render_widget(self):
+        """自動補完の入力欄（選択中の1件のみ取得する）"""
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site),
+            to_field_name=self.field.target_field.name,
+            required=False,
+        )
+        return form_field.widget.render(
+            self.lookup_kwarg, self.lookup_val, attrs={'id': self.widget_id, 'style': 'width: 100%'}
+        )
+
+
+class DateDrillDownListFilter(admin.FieldListFilter):
+    """
+    年・月のドリルダウンによる日時（日付）の絞り込み
+
+    date_hierarchy は選択肢の作成に一覧全体の DISTINCT を実行するため、
+    最古・最新の日時（インデックスから1件ずつ）だけで年の選択肢を作り、
+    絞り込みは範囲条件（__gte / __lt）で行う。DateTimeField・DateField に対応する。
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg_since = f'{field_path}__gte'
+        self.lookup_kwarg_until = f'{field_path}__lt'
+        self.date_params = {
+            key: value for key, value in params.items()
+            if key in (self.lookup_kwarg_since, self.lookup_kwarg_until)
+        }
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.model = model
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg_since, self.lookup_kwarg_until]
+
+    def _bounds(self):
+        """最古・最新の日時（現地時刻）"""
+        queryset = self.model._default_manager.exclude(**{f'{self.field_path}__isnull': True})
+        first = queryset.order_by(self.field_path).values_list(self.field_path, flat=True).first()
+        last = queryset.order_by(f'-{self.field_path}').values_list(self.field_path, flat=True).first()
+        if first is None:
+            return None, None
+        if not isinstance(self.field, models.DateTimeField):
+            return first, last
+        return timezone.localtime(first), timezone.localtime(last)
+
+    def _range(self, year, month=None):
+        """年（または年月）の開始・終了日時"""
+        if month is None:
+            start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        else:
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+        if not isinstance(self.field, models.DateTimeField):
+            return str(start.date()), str(end.date())
+        return str(timezone.make_aware(start)), str(timezone.make_aware(end))
+
+    def _link(self, changelist, display, since, until):
+        return {
+            'selected': self.date_params == {self.lookup_kwarg_since: since, self.lookup_kwarg_until: until},
+            'query_string': changelist.get_query_string(
+                {self.lookup_kwarg_since: since, self.lookup_kwarg_until: until}
+            ),
+            'display': display,
+        }
+
+    def _selected_year(self):
+        since = self.date_params.get(self.lookup_kwarg_since)
+        try:
+            return int(since[:4]) if since else None
+        except ValueError:
+            return None
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.date_params,
+            'query_string': changelist.get_query_string(remove=self.expected_parameters()),
+            'display': 'すべて',
+        }
+
+        first, last = self._bounds()
+        if first is None:
+            return
+
+        selected_year = self._selected_year()
+        if selected_year is None:
+            for year in range(last.year, first.year - 1, -1):
+                yield self._link(changelist, f'{year}年', *self._range(year))
+            return
+
+        yield self._link(changelist, f'{selected_year}年', *self._range(selected_year))
+        for month in range(12, 0, -1):
+            if (selected_year, month) < (first.year, first.month) or (selected_year, month) > (last.year, last.month):
+                continue
+            yield self._link(changelist, f'{selected_year}年{month}月', *self._range(selected_year, month))
+
+
+class ScaleModeAdminMixin:
+    """
+    大量データ向け一覧画面の共通設定
+
+    全件数の表示を行わず、件数は推定値で代用する。
+    list_filter には AutocompleteListFilter・DateDrillDownListFilter を使うこと。
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @property
+    def media(self):
+        # 自動補完の絞り込みで使う select2 を読み込む
+        return super().media + AutocompleteSelect(None, self.admin_site).media
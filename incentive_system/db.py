@@ -0,0 +1,136 @@
+"""
+データベース操作の共通処理
+"""
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL の serialization_failure / deadlock_detected
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+def is_retryable_error(error):
+    """再試行で解消する可能性のあるエラーか（直列化失敗・デッドロック・SQLite のロック競合）"""
+    if getattr(error.__cause__, 'pgcode', None) in RETRYABLE_SQLSTATES:
+        return True
+    message = str(error).lower()
+    return 'database is locked' in message or 'deadlock' in message
+
+
+def run_in_transaction(func, max_attempts=3, base_delay=0.05, using=None):
+    """
+    func をトランザクション内で実行し、直列化失敗・デッドロック時は待機して再試行
+
+    外側のトランザクション内から呼ばれた場合は再試行できないため、そのまま例外を送出する。
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func()
+        except OperationalError as e:
+            in_outer_transaction = transaction.get_connection(using).in_atomic_block
+            if attempt >= max_attempts or in_outer_transaction or not is_retryable_error(e):
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) * (1 + random.random())
+            logger.info('トランザクションを再試行します（%d回目）: %s', attempt, e)
+            time.sleep(delay)
+
+
+def max_query_params(connection):
+    """1つの SQL 文で使えるパラメータ数"""
+    if connection.vendor == 'sqlite':
+        # Django は古い SQLite に合わせて 999 とするが、実際の上限（3.32 以降は 32766）まで使う
+        connection.ensure_connection()
+        limit = getattr(connection.connection, 'getlimit', None)
+        if limit is not None:
+            return limit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    if connection.vendor == 'postgresql':
+        return 65535
+    return connection.features.max_query_params or 999
+
+
+def insert_rows(model, columns, rows, returning=None, using=None, max_rows=1000):
+    """
+    値のタプルの行をまとめて INSERT し、returning を指定した場合はその列の値を挿入順に返す
+
+    bulk_create はモデルのインスタンスを作ってフィールドごとに値を変換するため、
+    数十万行の取り込みでは処理時間の大半を占める。値はデータベース用に変換済みのもの
+    （日時は connection.ops.adapt_datetimefield_value）を渡すこと。
+    1文に入れる行数はパラメータ数の上限（最大 max_rows 行）まで増やし、往復の回数を減らす。
+    RETURNING が使えない SQLite（3.35 未満）では、bulk_create と同様に返す値は None になる。
+    """
+    connection = connections[using or router.db_for_write(model)]
+    returned = []
+    if returning and not connection.features.can_return_rows_from_bulk_insert:
+        returned = [None] * len(rows)
+        returning = None
+    table = connection.ops.quote_name(model._meta.db_table)
+    column_list = ', '.join(connection.ops.quote_name(column) for column in columns)
+    placeholder = f'({", ".join(["%s"] * len(columns))})'
+    suffix = f' RETURNING {connection.ops.quote_name(returning)}' if returning else ''
+    batch_size = max(1, min(max_rows, max_query_params(connection) // len(columns)))
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} ({column_list}) VALUES {", ".join([placeholder] * len(batch))}{suffix}',
+                [value for row in batch for value in row]
+            )
+            if returning:
+                returned.extend(row[0] for row in cursor.fetchall())
+    return returned
+
+
+@contextmanager
+def isolated_databases(verbosity=0):
+    """
+    設定されたデータベースの代わりに、検証用に作成したデータベースで実行する
+
+    合成データを投入する検証コマンド用。テストランナーと同じ手順で test_ 付きのデータベースを作成し
+    （レプリカはミラーとしてプライマリの検証用データベースを参照する）、終了時に削除する。
+    SQLite はスレッドから共有できるよう一時ファイルに作成する。キャッシュも共有キャッシュを
+    汚さないようプロセス内のものに切り替える。
+    テストの実行中（既に検証用のデータベースを使っている）は何もしない。
+    """
+    from django.core import mail
+    from django.test.utils import override_settings, setup_databases, teardown_databases
+    from points.cache import category_cache
+
+    # setup_test_environment() が mail.outbox を作成する
+    if hasattr(mail, 'outbox'):
+        yield
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix='incentive-check-')
+    test_names = {}
+    for alias in connections:
+        test_settings = connections[alias].settings_dict.setdefault('TEST', {})
+        if connections[alias].vendor == 'sqlite' and not test_settings.get('NAME') and not test_settings.get('MIRROR'):
+            test_names[alias] = test_settings.get('NAME')
+            test_settings['NAME'] = os.path.join(temp_dir, f'{alias}.sqlite3')
+
+    caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'isolated'}}
+    try:
+        with override_settings(CACHES=caches):
+            category_cache.clear()
+            old_config = setup_databases(verbosity, interactive=False, serialized_aliases=set())
+            try:
+                yield
+            finally:
+                connections.close_all()
+                teardown_databases(old_config, verbosity)
+                category_cache.clear()
+    finally:
+        for alias, name in test_names.items():
+            connections[alias].settings_dict['TEST']['NAME'] = name
+        shutil.rmtree(temp_dir, ignore_errors=True)
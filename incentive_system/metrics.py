@@ -0,0 +1,102 @@
+"""
+ビュー単位の性能計測値（プロセス内ヒストグラム）
+
+QueryMetricsMiddleware が URL 名ごとにクエリ数・DB時間・処理時間を記録する。
+値はワーカープロセスごとに保持され、snapshot() で辞書として取り出せる。
+"""
+import bisect
+import threading
+
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """累積ではない固定バケットのヒストグラム（最後のバケットは上限なし）"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, ratio):
+        """バケットの上限値で近似したパーセンタイル"""
+        if not self.count:
+            return 0
+        threshold = self.count * ratio
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= threshold:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self):
+        labels = [f'le_{bucket}' for bucket in self.buckets] + ['inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'avg': round(self.total / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class ViewMetrics:
+    """1ビュー分の計測値"""
+
+    def __init__(self):
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_ms = Histogram(MS_BUCKETS)
+        self.wall_ms = Histogram(MS_BUCKETS)
+        self.over_budget = 0
+
+
+class MetricsRegistry:
+    """URL名ごとの計測値を保持するレジストリ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, queries, db_ms, wall_ms, over_budget=False):
+        with self._lock:
+            metrics = self._views.get(view_name)
+            if metrics is None:
+                metrics = self._views[view_name] = ViewMetrics()
+            metrics.queries.observe(queries)
+            metrics.db_ms.observe(db_ms)
+            metrics.wall_ms.observe(wall_ms)
+            if over_budget:
+                metrics.over_budget += 1
+
+    def snapshot(self):
+        """全ビューの計測値を辞書で取得"""
+        with self._lock:
+            return {
+                view_name: {
+                    'queries': metrics.queries.as_dict(),
+                    'db_ms': metrics.db_ms.as_dict(),
+                    'wall_ms': metrics.wall_ms.as_dict(),
+                    'over_budget': metrics.over_budget,
+                }
+                for view_name, metrics in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
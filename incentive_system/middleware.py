@@ -0,0 +1,121 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+from .routers import REPLICA_ALIAS, enable_replica, end_request, has_written, start_request
+
+logger = logging.getLogger('incentive_system.performance')
+
+
+class QueryCounter:
+    """connection.execute_wrapper に渡してクエリ数とDB時間を数える"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryMetricsMiddleware:
+    """
+    リクエストごとのクエリ数・DB時間・処理時間を URL 名単位で記録するミドルウェア
+
+    VIEW_PERFORMANCE_BUDGETS に URL 名ごとの上限を設定すると、超過時に警告ログを出力する。
+    StreamingHttpResponse の本文生成中に発行されたクエリは計測対象外。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        view_name = match.view_name
+        db_ms = counter.duration * 1000
+        exceeded = self._check_budget(view_name, counter.count, db_ms, wall_ms)
+        registry.observe(view_name, counter.count, db_ms, wall_ms, over_budget=bool(exceeded))
+
+        if exceeded:
+            logger.warning(
+                'ビューの性能予算を超過しました: %s (%s) path=%s',
+                view_name, ', '.join(exceeded), request.path
+            )
+        return response
+
+    def _check_budget(self, view_name, queries, db_ms, wall_ms):
+        """予算を超過した項目の一覧を返す"""
+        budgets = getattr(settings, 'VIEW_PERFORMANCE_BUDGETS', {})
+        budget = budgets.get(view_name, budgets.get('default'))
+        if not budget:
+            return []
+
+        exceeded = []
+        for key, value in (('queries', queries), ('db_ms', db_ms), ('wall_ms', wall_ms)):
+            limit = budget.get(key)
+            if limit is not None and value > limit:
+                exceeded.append(f'{key}={value:.0f} > {limit}')
+        return exceeded
+
+
+class ReplicaRoutingMiddleware:
+    """
+    DATABASE_REPLICA_VIEWS の GET / HEAD リクエストの読み取りをレプリカに送るミドルウェア
+
+    書き込みを行ったリクエストの応答には Cookie を付け、DATABASE_REPLICA_STICKY_SECONDS 秒間は
+    そのブラウザの読み取りをプライマリで行う（付与・交換の直後に古い残高を表示しない）。
+    StreamingHttpResponse の本文生成中の読み取りはプライマリで行う。
+    """
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = REPLICA_ALIAS in settings.DATABASES
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        tokens = start_request()
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    self.cookie_name, '1',
+                    max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            end_request(tokens)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.resolver_match.url_name in settings.DATABASE_REPLICA_VIEWS and self.cookie_name not in request.COOKIES:
+            enable_replica()
+        return None
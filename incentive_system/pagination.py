@@ -0,0 +1,145 @@
+"""
+キーセット（カーソル）ページネーション
+
+OFFSET と COUNT(*) を使わず、並び順のキー（例: created_at, id）の値を
+不透明なトークンにして次ページ・前ページを取得する。
+何ページ目であっても1ページ目と同じコストで取得できる。
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+
+class InvalidCursor(ValueError):
+    """不正なカーソルトークン"""
+
+
+class CursorPage:
+    """カーソルページネーションの1ページ分"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    キーセットページネーター
+
+    ordering には一意になるキーの組み合わせ（末尾に id など）を指定する。
+    例: CursorPaginator(queryset, ('-created_at', '-id'), per_page=20)
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, direction, obj):
+        """オブジェクトの並び順キーからカーソルトークンを作成"""
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """カーソルトークンを (方向, キーの値) に復元"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(str(e))
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor('カーソルの形式が正しくありません')
+
+        # 改ざんされたトークンの値をそのまま絞り込みに渡さないよう、フィールドの型に変換する
+        decoded = []
+        for field, value in zip(self.fields, values):
+            try:
+                value = self.queryset.model._meta.get_field(field).to_python(value)
+            except (ValidationError, TypeError, ValueError) as e:
+                raise InvalidCursor(str(e))
+            if value is None:
+                raise InvalidCursor('カーソルの形式が正しくありません')
+            if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            decoded.append(value)
+        return direction, decoded
+
+    def _keyset_filter(self, values, reverse):
+        """キーの値より後ろ（reverse=True の場合は前）の行を絞り込む条件"""
+        condition = Q()
+        for index, ordering in enumerate(self.ordering):
+            descending = ordering.startswith('-')
+            if reverse:
+                descending = not descending
+            lookup = 'lt' if descending else 'gt'
+            term = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            for prefix_field, prefix_value in zip(self.fields[:index], values[:index]):
+                term &= Q(**{prefix_field: prefix_value})
+            condition |= term
+        return condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def get_page(self, cursor=None):
+        """カーソルに対応するページを取得（不正なカーソルは1ページ目として扱う）"""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        reverse = direction == 'prev'
+        queryset = self.queryset.order_by(*(self._reversed_ordering() if reverse else self.ordering))
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage([])
+
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor('next', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('prev', rows[0]) if has_previous else None,
+        )
@@ -0,0 +1,62 @@
+"""
+読み取り専用レプリカへのルーティング
+
+DATABASE_REPLICA_VIEWS に含まれる URL 名の GET / HEAD リクエストのみ、
+ポイント・商品・取引履歴の読み取りをレプリカ（DATABASES['replica']）に送る。
+ReplicaRoutingMiddleware がリクエストごとに enable_replica() を呼び、
+書き込みがあったリクエストの後は一定時間プライマリから読む（read-your-writes）。
+"""
+from contextvars import ContextVar
+
+REPLICA_ALIAS = 'replica'
+
+# レプリカから読み取るアプリ（セッション・認証はレプリカの遅延の影響を受けないよう対象外）
+REPLICA_APP_LABELS = {'points', 'products', 'transactions'}
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+def start_request():
+    """リクエスト開始時の状態にする（end_request に渡すトークンを返す）"""
+    return _use_replica.set(False), _wrote.set(False)
+
+
+def end_request(tokens):
+    use_token, wrote_token = tokens
+    _use_replica.reset(use_token)
+    _wrote.reset(wrote_token)
+
+
+def enable_replica():
+    """現在のリクエストの読み取りをレプリカに送る"""
+    _use_replica.set(True)
+
+
+def has_written():
+    """現在のリクエストで書き込みを行ったか"""
+    return _wrote.get()
+
+
+class ReadReplicaRouter:
+    """レプリカ対象のリクエストでのみ読み取りをレプリカに送るルーター"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get() and model._meta.app_label in REPLICA_APP_LABELS:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {'default', REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # レプリカはプライマリから複製されるためマイグレーションしない
+        if db == REPLICA_ALIAS:
+            return False
+        return None
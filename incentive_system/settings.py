@@ -5,6 +5,7 @@ Django settings for incentive_system project.
 from pathlib import Path
 from decouple import config, Csv
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,6 +18,9 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=Csv())
 
+# テスト実行中か（manage.py test）
+TESTING = sys.argv[1:2] == ['test']
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -30,6 +34,8 @@ INSTALLED_APPS = [
     'points',
     'products',
     'transactions',
+    'jobs',
+    'sales',
 ]
 
 MIDDLEWARE = [
@@ -38,8 +44,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'incentive_system.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'incentive_system.middleware.QueryMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'incentive_system.urls'
@@ -64,11 +72,130 @@ TEMPLATES = [
 WSGI_APPLICATION = 'incentive_system.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if config('USE_POSTGRESQL', default=False, cast=bool):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='incentive_system'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # 接続をリクエスト間で使い回し、再利用前に切断されていないか確認する
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # PgBouncer（トランザクションモード）経由で接続する場合は True にする
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+    # 読み取り専用レプリカ（DB_REPLICA_HOST を設定した場合のみ）
+    if config('DB_REPLICA_HOST', default=''):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': config('DB_REPLICA_HOST'),
+            'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    # 小規模な単一ノード運用向けの SQLite 設定（WAL・ビジータイムアウト・書き込みの直列化）
+    if config('SQLITE_PRODUCTION_PROFILE', default=False, cast=bool):
+        DATABASES['default'].update({
+            'ENGINE': 'incentive_system.sqlite_backend',
+            'OPTIONS': {
+                'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int),
+            },
+        })
+
+# テストではレプリカをテスト用 DB のミラーとして定義し、ルーティングをテストできるようにする
+if TESTING:
+    DATABASES.setdefault('replica', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})
+
+DATABASE_ROUTERS = ['incentive_system.routers.ReadReplicaRouter']
+
+# レプリカから読み取る画面の URL 名（GET / HEAD のみ）
+# テストでは TestCase のトランザクション内のデータがレプリカから見えないため、必要なテストでのみ有効にする
+DATABASE_REPLICA_VIEWS = [] if TESTING else [
+    'point_history', 'point_history_api', 'exchange_history', 'exchange_history_api',
+    'admin_dashboard', 'admin_exchange_list', 'user_points_detail',
+]
+
+# 書き込み後にプライマリから読み取る秒数（レプリカの遅延より長くする）
+DATABASE_REPLICA_STICKY_SECONDS = config('DATABASE_REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Cache
+if config('USE_REDIS', default=False, cast=bool):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': config('REDIS_URL', default='redis://localhost:6379/0'),
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    # プロセスごとのキャッシュ（開発・1プロセス運用向け）。複数プロセスでは更新が伝わらないため、
+    # カテゴリのキャッシュはデータベースから読み直し、ダッシュボードのキャッシュ・ETag は使わない
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+
+# ポイントカテゴリキャッシュのバージョン確認間隔（秒）
+POINT_CATEGORY_CACHE_CHECK_INTERVAL = config('POINT_CATEGORY_CACHE_CHECK_INTERVAL', default=5, cast=int)
+
+# ダッシュボード表示内容のキャッシュ有効期間（秒）
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=3600, cast=int)
+
+# 商品交換の状態別件数キャッシュの有効期間（秒）
+EXCHANGE_STATUS_COUNT_TTL = config('EXCHANGE_STATUS_COUNT_TTL', default=300, cast=int)
+
+# 商品交換のトランザクション試行回数（直列化失敗・デッドロック時に再試行）
+EXCHANGE_MAX_ATTEMPTS = config('EXCHANGE_MAX_ATTEMPTS', default=3, cast=int)
+
+# 大量データ向け管理画面で件数を正確に数える上限（超えた分は推定値・上限値で表示）
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
+# バックグラウンドジョブ（manage.py run_worker）
+JOB_WORKER_CONCURRENCY = config('JOB_WORKER_CONCURRENCY', default=2, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2.0, cast=float)  # ジョブが無いときの待機秒数
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)  # 再試行までの秒数（試行ごとに倍）
+JOB_LOCK_TIMEOUT = config('JOB_LOCK_TIMEOUT', default=600, cast=int)  # 応答が途絶えたジョブを再取得するまでの秒数
+JOB_HEARTBEAT_INTERVAL = config('JOB_HEARTBEAT_INTERVAL', default=60, cast=int)  # 実行中の応答日時の更新間隔（JOB_LOCK_TIMEOUT より短くする）
+
+# ポイント付与ファイルの取り込みで1トランザクションに処理する行数
+# （大きいほど残高の更新がまとまり速くなるが、1回の書き込みが長くなる）
+GRANT_IMPORT_CHUNK_SIZE = config('GRANT_IMPORT_CHUNK_SIZE', default=20000, cast=int)
+
+# 売上インセンティブ（sales）の基準通貨と、月ごとの為替レートのキャッシュ有効期間（秒）
+SALES_BASE_CURRENCY = config('SALES_BASE_CURRENCY', default='JPY')
+FX_RATE_CACHE_TTL = config('FX_RATE_CACHE_TTL', default=3600, cast=int)
+
+# ビュー別の性能計測（クエリ数・DB時間・処理時間）
+QUERY_METRICS_ENABLED = config('QUERY_METRICS_ENABLED', default=True, cast=bool)
+
+# URL名ごとの性能予算（超過時に incentive_system.performance ロガーへ警告を出力）
+VIEW_PERFORMANCE_BUDGETS = {
+    'default': {'queries': 30, 'wall_ms': 1000},
+    'dashboard': {'queries': 8, 'db_ms': 50, 'wall_ms': 300},
+    'point_history': {'queries': 8, 'db_ms': 50, 'wall_ms': 300},
+    'product_list': {'queries': 8, 'db_ms': 50, 'wall_ms': 300},
+    'product_detail': {'queries': 8, 'db_ms': 50, 'wall_ms': 300},
+    'exchange_product': {'queries': 20, 'db_ms': 200, 'wall_ms': 500},
+    'exchange_history': {'queries': 8, 'db_ms': 50, 'wall_ms': 300},
+    'admin_dashboard': {'queries': 10, 'db_ms': 200, 'wall_ms': 500},
+    'admin_exchange_list': {'queries': 10, 'db_ms': 100, 'wall_ms': 500},
 }
 
 # Password validation
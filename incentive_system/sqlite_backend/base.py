@@ -0,0 +1,100 @@
+"""
+小規模な単一ノード運用向けの SQLite バックエンド（SQLITE_PRODUCTION_PROFILE=True で使用）
+
+- 接続時に WAL・synchronous=NORMAL・mmap・キャッシュサイズを設定する
+- トランザクションを BEGIN IMMEDIATE で開始する。通常の BEGIN（DEFERRED）では
+  読み取りから書き込みへのロック昇格が競合すると、busy_timeout を待たずに
+  database is locked になる
+- プロセス内のロックで書き込みトランザクションを直列化し、SQLite のビジーループ
+  （スリープして再試行）ではなく到着順に待たせる
+"""
+import threading
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # 負の値は KiB 単位
+    'temp_store': 'memory',
+}
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def get_write_lock(name):
+    """データベースファイルごとの書き込みロック"""
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    OPTIONS:
+        timeout: ロック待ちの上限秒数（busy_timeout・書き込みロック共通。デフォルト: 20）
+        pragmas: DEFAULT_PRAGMAS を上書きする PRAGMA
+        serialize_writes: 書き込みトランザクションをプロセス内で直列化するか（デフォルト: True）
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        self.serialize_writes = options.get('serialize_writes', True)
+        self.lock_timeout = options.get('timeout', 20)
+        self._held_write_lock = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('serialize_writes', None)
+        params.setdefault('timeout', self.lock_timeout)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.serialize_writes:
+            self._acquire_write_lock()
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _acquire_write_lock(self):
+        lock = get_write_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=self.lock_timeout):
+            # run_in_transaction などの再試行対象になるよう SQLite と同じエラーにする
+            raise OperationalError('database is locked')
+        self._held_write_lock = lock
+
+    def _release_write_lock(self):
+        lock, self._held_write_lock = self._held_write_lock, None
+        if lock is not None:
+            lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
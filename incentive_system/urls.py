@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from . import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,6 +13,8 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('products/', include('products.urls')),
     path('transactions/', include('transactions.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('metrics/views/', views.view_metrics, name='view_metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,17 @@
+from django.contrib.auth.decorators import user_passes_test
+from django.http import JsonResponse
+
+from .metrics import registry
+
+
+def is_admin(user):
+    """管理者かどうかチェック"""
+    return user.is_authenticated and user.is_admin
+
+
+@user_passes_test(is_admin)
+def view_metrics(request):
+    """ビュー別の性能計測値（このワーカープロセス分）を取得"""
+    if request.method == 'POST' and request.POST.get('reset'):
+        registry.reset()
+    return JsonResponse({'success': True, 'views': registry.snapshot()})
@@ -0,0 +1,83 @@
+from django.contrib import admin
+from django.utils.html import format_html
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """ジョブ管理画面"""
+    list_display = (
+        'id', 'name', 'get_status_display', 'get_progress_display', 'attempts',
+        'created_by', 'created_at', 'started_at', 'finished_at'
+    )
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('name', 'progress_message')
+    ordering = ('-created_at',)
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'name', 'payload', 'status', 'priority', 'attempts', 'max_attempts', 'run_at',
+        'progress_current', 'progress_total', 'progress_message', 'result', 'error',
+        'worker', 'heartbeat_at', 'created_by', 'created_at', 'started_at', 'finished_at'
+    )
+    
+    fieldsets = (
+        ('ジョブ情報', {
+            'fields': ('name', 'payload', 'status', 'priority', 'created_by')
+        }),
+        ('進捗', {
+            'fields': ('progress_current', 'progress_total', 'progress_message', 'result', 'error')
+        }),
+        ('実行情報', {
+            'fields': (
+                'attempts', 'max_attempts', 'run_at', 'worker', 'heartbeat_at',
+                'created_at', 'started_at', 'finished_at'
+            ),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    actions = ['retry_jobs', 'cancel_jobs']
+    
+    def get_status_display(self, obj):
+        """状態表示"""
+        status_colors = {
+            'queued': 'gray',
+            'running': 'blue',
+            'succeeded': 'green',
+            'failed': 'red',
+            'cancelled': 'orange',
+        }
+        return format_html(
+            '<span style="color: {}; font-weight: bold;">{}</span>',
+            status_colors.get(obj.status, 'gray'),
+            obj.get_status_display()
+        )
+    get_status_display.short_description = '状態'
+    
+    def get_progress_display(self, obj):
+        """進捗表示"""
+        percent = obj.progress_percent
+        if percent is None:
+            return obj.progress_message or '-'
+        return format_html(
+            '<progress value="{}" max="100"></progress> {}% {}',
+            percent, percent, obj.progress_message
+        )
+    get_progress_display.short_description = '進捗'
+    
+    def has_add_permission(self, request):
+        """追加権限なし（各画面・enqueue_jobコマンドから登録）"""
+        return False
+    
+    def retry_jobs(self, request, queryset):
+        """選択したジョブを再実行する"""
+        updated = sum(job.retry() for job in queryset.filter(status__in=['failed', 'cancelled']))
+        self.message_user(request, f'{updated}件のジョブを再実行待ちにしました。')
+    retry_jobs.short_description = '選択したジョブを再実行する（失敗・キャンセルのみ）'
+    
+    def cancel_jobs(self, request, queryset):
+        """選択したジョブをキャンセルする"""
+        updated = queryset.filter(status='queued').update(status='cancelled')
+        self.message_user(request, f'{updated}件のジョブをキャンセルしました。')
+    cancel_jobs.short_description = '選択したジョブをキャンセルする（待機中のみ）'
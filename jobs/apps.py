@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'バックグラウンドジョブ'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # 各アプリの tasks.py で定義されたジョブを登録する
+        autodiscover_modules('tasks')
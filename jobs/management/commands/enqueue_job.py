@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import registry
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    """ジョブ登録コマンド（cron などからの定期実行用）"""
+    help = 'バックグラウンドジョブを登録します（実行は run_worker が行います）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='ジョブ名（例: points.expire_points）')
+        parser.add_argument('--payload', default='{}', help='ジョブの引数（JSON）')
+        parser.add_argument('--priority', type=int, default=0, help='優先度（小さいほど先に実行）')
+
+    def handle(self, *args, **options):
+        if not registry.is_registered(options['name']):
+            raise CommandError(
+                f'未登録のジョブです: {options["name"]}（登録済み: {", ".join(registry.registered_names())}）'
+            )
+        try:
+            payload = json.loads(options['payload'])
+        except ValueError as e:
+            raise CommandError(f'--payload が JSON として正しくありません: {e}')
+
+        job = Job.enqueue(options['name'], payload, priority=options['priority'])
+        self.stdout.write(self.style.SUCCESS(f'ジョブ #{job.id} を登録しました。'))
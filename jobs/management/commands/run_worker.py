@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+def _run_worker_process(concurrency, poll_interval, burst):
+    Worker(concurrency=concurrency, poll_interval=poll_interval, burst=burst).run()
+
+
+class Command(BaseCommand):
+    """バックグラウンドジョブのワーカーコマンド"""
+    help = 'ジョブテーブルから実行可能なジョブを取得して実行します（SIGTERM で実行中のジョブを終えてから停止）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 2),
+            help='1プロセスあたりの同時実行数（スレッド数）',
+        )
+        parser.add_argument('--processes', type=int, default=1, help='ワーカープロセス数（デフォルト: 1）')
+        parser.add_argument('--poll-interval', type=float, help='ジョブが無いときの待機秒数')
+        parser.add_argument('--burst', action='store_true', help='実行可能なジョブが無くなったら終了する')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        poll_interval = options['poll_interval']
+        burst = options['burst']
+
+        if options['processes'] <= 1:
+            processed = Worker(concurrency=concurrency, poll_interval=poll_interval, burst=burst).run()
+            self.stdout.write(self.style.SUCCESS(f'ワーカーを停止しました（{processed}件実行）。'))
+            return
+
+        # 子プロセスへ DB 接続を引き継がないよう、fork の前に閉じておく
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_run_worker_process, args=(concurrency, poll_interval, burst))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()  # 子プロセスは SIGTERM で実行中のジョブを終えて停止する
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS('ワーカーを停止しました。'))
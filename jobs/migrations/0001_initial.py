@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='ジョブ名')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='引数')),
+                ('status', models.CharField(choices=[('queued', '待機中'), ('running', '実行中'), ('succeeded', '完了'), ('failed', '失敗'), ('cancelled', 'キャンセル')], default='queued', max_length=20, verbose_name='状態')),
+                ('priority', models.SmallIntegerField(default=0, help_text='小さいほど先に実行', verbose_name='優先度')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='試行回数')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='最大試行回数')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='実行予定日時')),
+                ('progress_current', models.PositiveIntegerField(default=0, verbose_name='進捗')),
+                ('progress_total', models.PositiveIntegerField(blank=True, null=True, verbose_name='進捗（全体）')),
+                ('progress_message', models.CharField(blank=True, max_length=200, verbose_name='進捗メッセージ')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='結果')),
+                ('error', models.TextField(blank=True, verbose_name='エラー')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='ワーカー')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='最終応答日時')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='登録者')),
+            ],
+            options={
+                'verbose_name': 'ジョブ',
+                'verbose_name_plural': 'ジョブ',
+                'db_table': 'jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'priority', 'run_at'], name='jobs_status_267120_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,151 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import registry
+
+
+class Job(models.Model):
+    """バックグラウンドジョブ（run_worker コマンドが実行する）"""
+    STATUS_CHOICES = [
+        ('queued', '待機中'),
+        ('running', '実行中'),
+        ('succeeded', '完了'),
+        ('failed', '失敗'),
+        ('cancelled', 'キャンセル'),
+    ]
+    
+    name = models.CharField('ジョブ名', max_length=100)
+    payload = models.JSONField('引数', default=dict, blank=True)
+    status = models.CharField('状態', max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField('優先度', default=0, help_text='小さいほど先に実行')
+    attempts = models.PositiveSmallIntegerField('試行回数', default=0)
+    max_attempts = models.PositiveSmallIntegerField('最大試行回数', default=3)
+    run_at = models.DateTimeField('実行予定日時', default=timezone.now)
+    progress_current = models.PositiveIntegerField('進捗', default=0)
+    progress_total = models.PositiveIntegerField('進捗（全体）', null=True, blank=True)
+    progress_message = models.CharField('進捗メッセージ', max_length=200, blank=True)
+    result = models.JSONField('結果', null=True, blank=True)
+    error = models.TextField('エラー', blank=True)
+    worker = models.CharField('ワーカー', max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField('最終応答日時', null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='登録者'
+    )
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    started_at = models.DateTimeField('開始日時', null=True, blank=True)
+    finished_at = models.DateTimeField('終了日時', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'ジョブ'
+        verbose_name_plural = 'ジョブ'
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.name} ({self.get_status_display()})"
+    
+    @property
+    def progress_percent(self):
+        """進捗率（全体件数が不明な場合は None）"""
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_current * 100 / self.progress_total))
+    
+    @classmethod
+    def enqueue(cls, name, payload=None, created_by=None, priority=0, run_at=None, max_attempts=None):
+        """ジョブを登録"""
+        if not registry.is_registered(name):
+            raise ValueError(f'未登録のジョブです: {name}')
+        return cls.objects.create(
+            name=name,
+            payload=payload or {},
+            priority=priority,
+            run_at=run_at or timezone.now(),
+            max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+            created_by=created_by,
+        )
+    
+    @classmethod
+    def claim(cls, worker):
+        """
+        実行可能なジョブを1件取得して実行中にする
+        
+        SKIP LOCKED で他のワーカーが確認中の行を飛ばし、状態を条件にした UPDATE で
+        確定させる（SKIP LOCKED が無い SQLite でも二重に取得しない）。
+        応答（ワーカーが JOB_HEARTBEAT_INTERVAL 秒ごとに更新）が JOB_LOCK_TIMEOUT 秒途絶えた
+        実行中のジョブも再取得の対象とする（ワーカーのプロセスが停止した場合）。
+        """
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+        claimable = Q(status='queued', run_at__lte=now) | Q(status='running', heartbeat_at__lt=stale_before)
+        
+        while True:
+            with transaction.atomic():
+                candidate = cls.objects.select_for_update(skip_locked=True).filter(claimable).order_by(
+                    'priority', 'run_at', 'id'
+                ).values_list('id', 'status', 'attempts').first()
+                if candidate is None:
+                    return None
+                
+                job_id, status, attempts = candidate
+                claimed = cls.objects.filter(id=job_id, status=status, attempts=attempts).update(
+                    status='running',
+                    attempts=attempts + 1,
+                    worker=worker,
+                    heartbeat_at=now,
+                    started_at=now,
+                    finished_at=None,
+                )
+            if claimed:
+                return cls.objects.get(id=job_id)
+    
+    def set_progress(self, current, total=None, message=None):
+        """進捗を記録（ワーカーの応答日時も更新する）"""
+        self.progress_current = current
+        fields = {'progress_current': current, 'heartbeat_at': timezone.now()}
+        if total is not None:
+            self.progress_total = fields['progress_total'] = total
+        if message is not None:
+            self.progress_message = fields['progress_message'] = message[:200]
+        Job.objects.filter(id=self.id).update(**fields)
+    
+    def execute(self):
+        """登録された処理を実行し、結果に応じて完了・再試行待ち・失敗にする"""
+        try:
+            handler = registry.get_handler(self.name)
+            result = handler(self, **self.payload)
+        except Exception:
+            self._finish_with_error(traceback.format_exc())
+        else:
+            Job.objects.filter(id=self.id, status='running').update(
+                status='succeeded', result=result, error='', finished_at=timezone.now()
+            )
+    
+    def _finish_with_error(self, error):
+        now = timezone.now()
+        running = Job.objects.filter(id=self.id, status='running')
+        if self.attempts < self.max_attempts:
+            # 待機時間を試行ごとに倍にして再試行
+            delay = getattr(settings, 'JOB_RETRY_DELAY', 30) * (2 ** (self.attempts - 1))
+            running.update(status='queued', error=error, run_at=now + timedelta(seconds=delay))
+        else:
+            running.update(status='failed', error=error, finished_at=now)
+    
+    def retry(self):
+        """失敗・キャンセルしたジョブを再実行待ちに戻す（試行回数はリセット）"""
+        return Job.objects.filter(id=self.id, status__in=['failed', 'cancelled']).update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+        )
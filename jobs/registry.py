@@ -0,0 +1,28 @@
+"""
+ジョブ処理の登録
+
+各アプリの tasks.py で @register('アプリ名.処理名') を付けた関数がジョブとして実行される。
+関数は実行中の Job を第1引数に、Job.payload をキーワード引数として受け取り、
+戻り値（JSON に変換できる値）は Job.result に保存される。
+"""
+_handlers = {}
+
+
+def register(name):
+    """ジョブ処理を登録するデコレーター"""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def get_handler(name):
+    return _handlers[name]
+
+
+def is_registered(name):
+    return name in _handlers
+
+
+def registered_names():
+    return sorted(_handlers)
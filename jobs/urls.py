@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # 管理者用
+    path('<int:job_id>/', views.job_status, name='job_status'),
+]
@@ -0,0 +1,31 @@
+from django.contrib.auth.decorators import user_passes_test
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .models import Job
+
+
+def is_admin(user):
+    """管理者かどうかチェック"""
+    return user.is_authenticated and user.is_admin
+
+
+@user_passes_test(is_admin)
+def job_status(request, job_id):
+    """API: ジョブの状態・進捗を取得"""
+    job = get_object_or_404(Job, id=job_id)
+    return JsonResponse({
+        'success': True,
+        'job': {
+            'id': job.id,
+            'name': job.name,
+            'status': job.status,
+            'progress_current': job.progress_current,
+            'progress_total': job.progress_total,
+            'progress_percent': job.progress_percent,
+            'progress_message': job.progress_message,
+            'attempts': job.attempts,
+            'result': job.result,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        },
+    })
@@ -0,0 +1,102 @@
+"""
+ジョブワーカー
+
+スレッドごとに「ジョブの取得 → 実行」を繰り返す。ジョブが無いときは
+JOB_POLL_INTERVAL 秒待機する。SIGTERM / SIGINT を受けると実行中のジョブを
+終えてから停止する。
+実行中のジョブの応答日時は JOB_HEARTBEAT_INTERVAL 秒ごとに別スレッドで更新するため、
+進捗を報告しない処理も JOB_LOCK_TIMEOUT を超えて他のワーカーに再取得されることはない。
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat:
+    """実行中のジョブの応答日時を別スレッドで定期的に更新する"""
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 60)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{job.id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    Job.objects.filter(id=self.job.id, status='running', worker=self.job.worker).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception:
+                    # 一時的な DB エラーでは止めず、次の間隔で再試行する
+                    logger.exception('ジョブの応答日時を更新できませんでした: %s', self.job)
+        finally:
+            connections.close_all()
+
+
+class Worker:
+    def __init__(self, concurrency=1, poll_interval=None, burst=False):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or getattr(settings, 'JOB_POLL_INTERVAL', 2.0)
+        self.burst = burst  # True の場合はジョブが無くなったら終了
+        self.stop_event = threading.Event()
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        threads = [
+            threading.Thread(target=self._loop, args=(f'{self.worker_id}:{index}',), daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+        return self.processed
+
+    def _loop(self, worker_id):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                job = Job.claim(worker_id)
+                if job is None:
+                    if self.burst:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+
+                logger.info('ジョブを開始します: %s', job)
+                with Heartbeat(job):
+                    job.execute()
+                with self._lock:
+                    self.processed += 1
+        finally:
+            connections.close_all()
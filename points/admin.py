@@ -1,8 +1,17 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.shortcuts import render
+from django.urls import reverse
 from django.utils.html import format_html
 from django.utils import timezone
 from django.db.models import Sum
-from .models import PointCategory, Point
+from incentive_system.admin_scale import AutocompleteListFilter, DateDrillDownListFilter, ScaleModeAdminMixin
+from .models import (
+    GrantImport, PointCategory, Point, SegmentGrantResult, UserPointBalance, UserSegment
+)
 
 
 @admin.register(PointCategory)
@@ -21,16 +30,20 @@ class PointCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Point)
-class PointAdmin(admin.ModelAdmin):
+class PointAdmin(ScaleModeAdminMixin, admin.ModelAdmin):
     """ポイント管理画面"""
     list_display = (
         'user', 'category', 'amount', 'remaining_amount', 
         'get_status_display', 'reason', 'issued_at', 'expires_at'
     )
     list_filter = (
-        'category', 'is_expired', 'issued_at', 'expires_at',
-        ('user', admin.RelatedOnlyFieldListFilter)
+        ('category', AutocompleteListFilter),
+        'is_expired',
+        ('issued_at', DateDrillDownListFilter),
+        'expires_at',
+        ('user', AutocompleteListFilter),
     )
+    list_select_related = ('user', 'category')
     search_fields = ('user__username', 'user__full_name', 'reason')
     ordering = ('-issued_at',)
     readonly_fields = ('issued_at', 'created_at', 'updated_at', 'calculate_expiry_date')
@@ -64,15 +77,229 @@ class PointAdmin(admin.ModelAdmin):
         """クエリセット最適化"""
         return super().get_queryset(request).select_related('user', 'category')
     
-    actions = ['mark_as_expired', 'bulk_grant_points']
+    actions = ['mark_as_expired']
     
     def mark_as_expired(self, request, queryset):
         """選択したポイントを期限切れにする"""
-        updated = queryset.update(is_expired=True)
+        updated = Point.expire_points(queryset)
         self.message_user(request, f'{updated}件のポイントを期限切れにしました。')
     mark_as_expired.short_description = '選択したポイントを期限切れにする'
 
 
+@admin.register(UserPointBalance)
+class UserPointBalanceAdmin(admin.ModelAdmin):
+    """ポイント残高管理画面"""
+    list_display = ('user', 'category', 'balance', 'version', 'updated_at')
+    list_filter = ('category',)
+    list_select_related = ('user', 'category')
+    search_fields = ('user__username', 'user__full_name')
+    readonly_fields = ('user', 'category', 'balance', 'version', 'updated_at')
+    
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('user', 'category')
+    
+    def has_add_permission(self, request):
+        """追加権限なし（付与・消費・失効処理で自動更新）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限なし（再構築はrebuild_point_balancesコマンドで行う）"""
+        return False
+
+
+class UserSegmentForm(forms.ModelForm):
+    """ユーザーセグメント編集フォーム（ユーザーIDファイルの取り込み付き）"""
+    member_file = forms.FileField(
+        label='ユーザーIDファイル',
+        required=False,
+        help_text='1行に1件のユーザーID（CSVの場合は先頭列）。取り込むとメンバーを置き換えます。'
+    )
+    
+    class Meta:
+        model = UserSegment
+        fields = ('name', 'description', 'active_only', 'joined_before', 'balance_below', 'uses_member_list')
+
+
+@admin.register(UserSegment)
+class UserSegmentAdmin(admin.ModelAdmin):
+    """ユーザーセグメント管理画面"""
+    form = UserSegmentForm
+    list_display = ('name', 'active_only', 'joined_before', 'balance_below', 'uses_member_list', 'updated_at')
+    search_fields = ('name', 'description')
+    readonly_fields = ('get_member_count', 'get_user_count', 'created_by', 'created_at', 'updated_at')
+    
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'description')
+        }),
+        ('条件', {
+            'fields': ('active_only', 'joined_before', 'balance_below', 'uses_member_list', 'member_file',
+                       'get_member_count')
+        }),
+        ('対象', {
+            'fields': ('get_user_count',)
+        }),
+        ('システム情報', {
+            'fields': ('created_by', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def get_member_count(self, obj):
+        """取り込んだユーザーIDの件数"""
+        return obj.members.count() if obj.pk else 0
+    get_member_count.short_description = '取り込み済みのユーザーID'
+    
+    def get_user_count(self, obj):
+        """現在の条件に該当するユーザー数"""
+        return obj.get_users().count() if obj.pk else '-'
+    get_user_count.short_description = '該当ユーザー数（現時点）'
+    
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        
+        member_file = form.cleaned_data.get('member_file')
+        if member_file:
+            # アップロードされたファイルを行単位で読みながら取り込む
+            lines = io.TextIOWrapper(member_file.file, encoding='utf-8-sig')
+            member_count, skipped = obj.import_members(lines)
+            self.message_user(request, f'{member_count}件のユーザーIDを取り込みました（取り込めなかった行: {skipped}件）。')
+    
+    actions = ['grant_points']
+    
+    def grant_points(self, request, queryset):
+        """選択したセグメントにポイントを付与する"""
+        if queryset.count() != 1:
+            self.message_user(request, 'セグメントを1件だけ選択してください。', level=messages.ERROR)
+            return None
+        segment = queryset.get()
+        
+        if 'apply' in request.POST:
+            try:
+                total_points = int(request.POST.get('total_points', 0))
+            except ValueError:
+                total_points = 0
+            reason = request.POST.get('reason', '')
+            
+            if total_points > 0 and reason:
+                job = segment.enqueue_grant(total_points, reason, created_by=request.user)
+                report_url = reverse('segment_grant_report', args=[job.id])
+                self.message_user(request, format_html(
+                    'セグメント「{}」への{}ポイント付与をジョブ #{} として受け付けました。'
+                    '完了後に<a href="{}">ユーザー別の結果</a>をダウンロードできます。',
+                    segment.name, total_points, job.id, report_url
+                ))
+                return None
+            self.message_user(request, '必要な情報を入力してください。', level=messages.ERROR)
+        
+        return render(request, 'admin/points/usersegment/grant_points.html', {
+            **self.admin_site.each_context(request),
+            'title': 'セグメントへのポイント付与',
+            'opts': self.model._meta,
+            'segment': segment,
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        })
+    grant_points.short_description = '選択したセグメントにポイントを付与する'
+
+
+@admin.register(SegmentGrantResult)
+class SegmentGrantResultAdmin(admin.ModelAdmin):
+    """セグメント付与結果管理画面"""
+    list_display = ('job', 'segment', 'user', 'points', 'balance_after', 'created_at')
+    list_filter = ('segment',)
+    list_select_related = ('job', 'segment', 'user')
+    search_fields = ('user__username', 'user__full_name')
+    raw_id_fields = ('job', 'user')
+    
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('job', 'segment', 'user')
+    
+    def has_add_permission(self, request):
+        """追加権限なし（付与ジョブが記録する）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限なし（付与ジョブが記録する）"""
+        return False
+
+
+@admin.register(GrantImport)
+class GrantImportAdmin(admin.ModelAdmin):
+    """ポイント付与の取り込み管理画面"""
+    list_display = (
+        'id', 'file', 'status', 'rows_processed', 'granted_rows', 'granted_points',
+        'error_rows', 'get_error_file_link', 'created_by', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'created_at')
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'status', 'rows_processed', 'granted_rows', 'granted_points', 'error_rows',
+        'get_error_file_link', 'message', 'created_by', 'created_at', 'updated_at', 'finished_at'
+    )
+    
+    fieldsets = (
+        ('ファイル', {
+            'fields': ('file', 'default_reason'),
+            'description': (
+                'CSV（UTF-8）または XLSX。1行目は見出しで、user_id / username / email のいずれか、'
+                'points、reason（任意）の列を使います。'
+            ),
+        }),
+        ('結果', {
+            'fields': (
+                'status', 'rows_processed', 'granted_rows', 'granted_points', 'error_rows',
+                'get_error_file_link', 'message'
+            )
+        }),
+        ('システム情報', {
+            'fields': ('created_by', 'created_at', 'updated_at', 'finished_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('created_by')
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj:
+            return ('file', 'default_reason') + self.readonly_fields
+        return self.readonly_fields
+    
+    def get_error_file_link(self, obj):
+        """エラーファイルのダウンロードリンク"""
+        if not obj.error_file:
+            return '-'
+        return format_html('<a href="{}">ダウンロード</a>', obj.error_file.url)
+    get_error_file_link.short_description = 'エラーファイル'
+    
+    def save_model(self, request, obj, form, change):
+        obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        # 取り込みはバックグラウンドジョブで実行する
+        job = obj.enqueue()
+        self.message_user(request, f'取り込み #{obj.id} をジョブ #{job.id} として受け付けました。')
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限なし（取り込み結果は取り込み処理が更新する）"""
+        return False
+    
+    actions = ['resume_imports']
+    
+    def resume_imports(self, request, queryset):
+        """失敗した取り込みを続きから再開する"""
+        resumed = 0
+        for grant_import in queryset.filter(status='failed'):
+            grant_import.enqueue()
+            resumed += 1
+        self.message_user(request, f'{resumed}件の取り込みを再開しました。')
+    resume_imports.short_description = '選択した取り込み（失敗したもの）を再開する'
+
+
 # カスタム管理画面の追加
 class PointGrantForm(admin.ModelAdmin):
     """ポイント付与専用フォーム"""
@@ -5,3 +5,6 @@ class PointsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'points'
     verbose_name = 'ポイント管理'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
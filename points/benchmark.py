@@ -0,0 +1,417 @@
+"""
+ホットパスのベンチマーク（manage.py bench から利用）
+
+合成データ（ユーザー・ポイント・商品・取引履歴・交換履歴）を投入し、
+主要な処理をウォームアップ後に繰り返し計測してパーセンタイルを算出する。
+合成データのユーザー名・商品名には接頭辞を付け、計測後にまとめて削除する。
+"""
+import math
+import platform
+import random
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from incentive_system.middleware import QueryCounter
+from incentive_system.pagination import CursorPaginator
+from .models import Point, PointCategory, UserPointBalance
+
+PRODUCT_PREFIX = '[bench] '
+HISTORY_PAGE_SIZE = 20
+HISTORY_DEEP_PAGE = 1000
+EXCHANGE_STATUS_WEIGHTS = {'pending': 2, 'processing': 1, 'completed': 6, 'cancelled': 1}
+
+
+class BenchmarkDataset:
+    """ベンチマーク用の合成データ"""
+
+    def __init__(self, prefix='bench_', users=1000, lots_per_user=12, products=50,
+                 transactions_per_user=20, exchanges_per_user=5,
+                 history_rows=HISTORY_PAGE_SIZE * HISTORY_DEEP_PAGE + HISTORY_PAGE_SIZE, seed=42):
+        self.prefix = prefix
+        self.users = users
+        self.lots_per_user = lots_per_user
+        self.products = products
+        self.transactions_per_user = transactions_per_user
+        self.exchanges_per_user = exchanges_per_user
+        self.history_rows = history_rows
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.categories = [PointCategory.get_digital_category(), PointCategory.get_corporate_category()]
+
+    def as_dict(self):
+        return {
+            'users': self.users,
+            'lots_per_user': self.lots_per_user,
+            'products': self.products,
+            'transactions_per_user': self.transactions_per_user,
+            'exchanges_per_user': self.exchanges_per_user,
+            'history_rows': self.history_rows,
+            'seed': self.seed,
+        }
+
+    def user_queryset(self):
+        return User.objects.filter(username__startswith=self.prefix)
+
+    def product_queryset(self):
+        from products.models import Product
+        return Product.objects.filter(name__startswith=PRODUCT_PREFIX)
+
+    def cleanup(self):
+        """合成データを削除（関連するポイント・履歴は CASCADE で削除される）"""
+        from transactions.models import DailyPointStats
+
+        self.user_queryset().delete()
+        self.product_queryset().delete()
+        self._invalidate_status_counts()
+        today = timezone.localdate()
+        DailyPointStats.rollup(today - timedelta(days=400), today)
+
+    def create(self):
+        """合成データを投入"""
+        from transactions.models import DailyPointStats
+
+        now = timezone.now()
+        user_ids = self._create_users()
+        self._create_lots(user_ids, now)
+        self._create_ledger(user_ids, now)
+        product_ids = self._create_products()
+        self._create_exchanges(user_ids, product_ids, now)
+
+        # 残高テーブル（全カテゴリ分の行を用意してから再集計し、取引連番を揃える）
+        UserPointBalance.objects.bulk_create([
+            UserPointBalance(user_id=user_id, category=category)
+            for user_id in user_ids for category in self.categories
+        ], batch_size=1000, ignore_conflicts=True)
+        UserPointBalance.rebuild(user_ids)
+        self._sync_last_sequence()
+
+        today = timezone.localdate()
+        DailyPointStats.rollup(today - timedelta(days=400), today)
+        return user_ids
+
+    def _create_users(self):
+        User.objects.bulk_create([
+            User(
+                username=f'{self.prefix}{index:06d}',
+                email=f'{self.prefix}{index:06d}@bench.invalid',
+                full_name=f'ベンチマーク {index:06d}',
+                password='!',
+            )
+            for index in range(self.users)
+        ], batch_size=1000)
+        return list(self.user_queryset().order_by('id').values_list('id', flat=True))
+
+    def _create_lots(self, user_ids, now):
+        """付与月を過去12ヶ月に分散させたポイントを作成"""
+        lots_by_month = {}
+        for user_id in user_ids:
+            for _ in range(self.lots_per_user):
+                months_ago = self.random.randrange(12)
+                amount = self.random.randrange(100, 5001, 100)
+                lots_by_month.setdefault(months_ago, []).append((user_id, amount))
+
+        for months_ago, rows in lots_by_month.items():
+            issued_at = now - timedelta(days=30 * months_ago + self.random.randrange(30))
+            expires_at = Point(issued_at=issued_at).calculate_expiry_date()
+            expired = expires_at <= now
+            reason = f'ベンチマーク付与（{months_ago}ヶ月前）'
+            Point.objects.bulk_create([
+                Point(
+                    user_id=user_id,
+                    category=self.categories[index % 2],
+                    amount=amount,
+                    remaining_amount=0 if expired else self.random.randrange(0, amount + 1, 100),
+                    reason=reason,
+                    expires_at=expires_at,
+                    is_expired=expired,
+                )
+                for index, (user_id, amount) in enumerate(rows)
+            ], batch_size=1000)
+            # issued_at は auto_now_add のため作成後に書き換える
+            Point.objects.filter(user__username__startswith=self.prefix, reason=reason).update(
+                issued_at=issued_at, created_at=issued_at
+            )
+
+    def _create_ledger(self, user_ids, now):
+        """取引履歴を作成（先頭ユーザーは深いページの計測用に件数を多くする）"""
+        from transactions.models import PointTransaction
+
+        weights = {'grant': 14, 'exchange': 5, 'expire': 1}
+        sequences = {}
+        balances = {}
+        rows_by_month = {}
+        for position, user_id in enumerate(user_ids):
+            count = self.history_rows if position == 0 else self.transactions_per_user
+            for _ in range(count):
+                category = self.random.choice(self.categories)
+                key = (user_id, category.id)
+                transaction_type = self.random.choices(list(weights), list(weights.values()))[0]
+                amount = self.random.randrange(100, 3001, 100)
+                if transaction_type != 'grant':
+                    amount = -min(amount, balances.get(key, 0))
+                balances[key] = balances.get(key, 0) + amount
+                sequences[key] = sequences.get(key, 0) + 1
+                rows_by_month.setdefault(self.random.randrange(12), []).append(PointTransaction(
+                    user_id=user_id,
+                    transaction_type=transaction_type,
+                    category=category,
+                    amount=amount,
+                    balance_after=balances[key],
+                    sequence=sequences[key],
+                    reason='ベンチマーク',
+                ))
+
+        for months_ago, rows in rows_by_month.items():
+            reason = f'ベンチマーク（{months_ago}ヶ月前）'
+            for row in rows:
+                row.reason = reason
+            PointTransaction.objects.bulk_create(rows, batch_size=1000)
+            created_at = now - timedelta(days=30 * months_ago + self.random.randrange(30))
+            PointTransaction.objects.filter(
+                user__username__startswith=self.prefix, reason=reason
+            ).update(created_at=created_at)
+
+    def _create_products(self):
+        from products.models import Product
+
+        Product.objects.bulk_create([
+            Product(
+                category=self.categories[index % 2],
+                name=f'{PRODUCT_PREFIX}商品 {index:04d}',
+                required_points=self.random.randrange(100, 3001, 100),
+                sort_order=index,
+            )
+            for index in range(self.products)
+        ])
+        return list(self.product_queryset().order_by('id').values_list('id', 'required_points'))
+
+    def _create_exchanges(self, user_ids, product_ids, now):
+        from products.models import ProductExchange
+
+        statuses = list(EXCHANGE_STATUS_WEIGHTS)
+        weights = list(EXCHANGE_STATUS_WEIGHTS.values())
+        rows_by_month = {}
+        for user_id in user_ids:
+            for _ in range(self.exchanges_per_user):
+                product_id, required_points = self.random.choice(product_ids)
+                rows_by_month.setdefault(self.random.randrange(12), []).append(ProductExchange(
+                    user_id=user_id,
+                    product_id=product_id,
+                    points_used=required_points,
+                    status=self.random.choices(statuses, weights)[0],
+                ))
+
+        for months_ago, rows in rows_by_month.items():
+            notes = f'ベンチマーク（{months_ago}ヶ月前）'
+            for row in rows:
+                row.notes = notes
+            ProductExchange.objects.bulk_create(rows, batch_size=1000)
+            ProductExchange.objects.filter(
+                user__username__startswith=self.prefix, notes=notes
+            ).update(exchange_date=now - timedelta(days=30 * months_ago + self.random.randrange(30)))
+        self._invalidate_status_counts()
+
+    def _sync_last_sequence(self):
+        from transactions.models import PointTransaction
+
+        last_sequence = PointTransaction.objects.filter(
+            user=OuterRef('user'), category=OuterRef('category')
+        ).order_by().values('user').annotate(last=Max('sequence')).values('last')[:1]
+        UserPointBalance.objects.filter(user__username__startswith=self.prefix).update(
+            last_sequence=Coalesce(Subquery(last_sequence), Value(0))
+        )
+
+    def _invalidate_status_counts(self):
+        from products.counters import CACHE_KEY
+        from products.models import ProductExchange
+
+        cache.delete_many([CACHE_KEY.format(status) for status, _ in ProductExchange.STATUS_CHOICES])
+
+
+def percentile(sorted_values, ratio):
+    """最近順位法によるパーセンタイル"""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(ratio * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(func, iterations, warmup):
+    """ウォームアップ後に func を繰り返し実行し、処理時間（ms）とクエリ数を集計"""
+    for _ in range(warmup):
+        func()
+
+    durations = []
+    queries = []
+    for _ in range(iterations):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            start = time.perf_counter()
+            func()
+            durations.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+
+    durations.sort()
+    return {
+        'iterations': iterations,
+        'min_ms': round(durations[0], 3),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'p50_ms': round(percentile(durations, 0.50), 3),
+        'p90_ms': round(percentile(durations, 0.90), 3),
+        'p95_ms': round(percentile(durations, 0.95), 3),
+        'p99_ms': round(percentile(durations, 0.99), 3),
+        'max_ms': round(durations[-1], 3),
+        'queries': statistics.median_low(queries),
+    }
+
+
+def client_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0].lstrip('.') if hosts else 'localhost'
+
+
+class BenchmarkRunner:
+    """合成データに対してホットパスを計測する"""
+
+    def __init__(self, dataset, iterations=30, warmup=3, bulk_size=500, stdout=None):
+        self.dataset = dataset
+        self.iterations = iterations
+        self.warmup = warmup
+        self.bulk_size = bulk_size
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self, only=None):
+        user_ids = self.dataset.create()
+        try:
+            cases = self.build_cases(user_ids)
+            results = {}
+            for name, func in cases.items():
+                if only and name not in only:
+                    continue
+                self.log(f'計測中: {name}')
+                results[name] = measure(func, self.iterations, self.warmup)
+            return results
+        finally:
+            self.dataset.cleanup()
+
+    def build_cases(self, user_ids):
+        from points.views import _get_admin_dashboard_context
+        from products.models import Product
+        from products.views import _get_admin_exchange_page
+        from transactions.models import PointTransaction
+
+        rng = random.Random(self.dataset.seed)
+        heavy_user = User.objects.get(id=user_ids[0])
+        consumer = User.objects.get(id=user_ids[-1])
+        sample_users = list(User.objects.filter(id__in=user_ids[1:201]))
+
+        # 交換・消費の計測で不足しないよう、計測回数分のポイントを付与しておく
+        product = Product.objects.filter(
+            name__startswith=PRODUCT_PREFIX
+        ).select_related('category').order_by('required_points', 'id').first()
+        runs = self.iterations + self.warmup
+        needed = runs * (product.required_points + 100)
+        Point.grant_points(consumer, math.ceil(needed / float(product.category.ratio)) + 100, 'ベンチマーク準備')
+
+        host = client_host()
+        history_client = Client(HTTP_HOST=host)
+        history_client.force_login(heavy_user)
+        consumer_client = Client(HTTP_HOST=host)
+        consumer_client.force_login(consumer)
+
+        history_url = reverse('point_history')
+        ordering = ('-created_at', '-id')
+        history_query = PointTransaction.objects.filter(user=heavy_user).order_by(*ordering)
+        offset = (HISTORY_DEEP_PAGE - 1) * HISTORY_PAGE_SIZE - 1
+        # 1000ページ目の直前の行からカーソルを作成（1000ページ目に行が無い場合は計測しない）
+        anchor_rows = list(history_query[offset:offset + 2])
+        deep_cursor = None
+        if len(anchor_rows) == 2:
+            paginator = CursorPaginator(history_query, ordering, per_page=HISTORY_PAGE_SIZE)
+            deep_cursor = paginator.encode_cursor('next', anchor_rows[0])
+
+        def get_ok(client, url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} が {response.status_code} を返しました')
+
+        def exchange():
+            response = consumer_client.post(reverse('exchange_product', args=[product.id]))
+            consumer_client.cookies.pop('messages', None)
+            if response.status_code != 302 or response.url != reverse('exchange_history'):
+                raise RuntimeError('商品交換に失敗しました')
+
+        def consume():
+            with transaction.atomic():
+                Point.consume_points(consumer, product.category, 100)
+
+        def admin_dashboard():
+            date_to = timezone.localdate()
+            context = _get_admin_dashboard_context(date_to - timedelta(days=29), date_to)
+            list(context['daily_stats'])
+            list(context['recent_grants'])
+
+        def admin_exchange_list():
+            from products.counters import get_status_counts
+            list(_get_admin_exchange_page('pending'))
+            get_status_counts()
+
+        def expire_points_scan():
+            # 失効処理（expire_points）の1バッチ目の走査
+            list(
+                Point.objects.filter(is_expired=False, expires_at__lte=timezone.now())
+                .order_by('expires_at', 'id').values_list('id', 'expires_at')[:5000]
+            )
+
+        cases = {
+            'get_user_points_summary': lambda: Point.get_user_points_summary(rng.choice(sample_users)),
+            'grant_points': lambda: Point.grant_points(rng.choice(sample_users), 1000, 'ベンチマーク付与'),
+            'bulk_grant': lambda: Point.bulk_grant(
+                rng.sample(user_ids, min(self.bulk_size, len(user_ids))), 1000, 'ベンチマーク一括付与'
+            ),
+            'consume_points': consume,
+            'exchange_product': exchange,
+            'point_history_page_1': lambda: get_ok(history_client, history_url),
+            'exchange_history': lambda: get_ok(history_client, reverse('exchange_history')),
+            'expire_points_scan': expire_points_scan,
+            'admin_dashboard': admin_dashboard,
+            'admin_exchange_list': admin_exchange_list,
+        }
+        if deep_cursor:
+            cases['point_history_page_1000'] = lambda: get_ok(
+                history_client, f'{history_url}?cursor={deep_cursor}'
+            )
+        else:
+            self.log(f'履歴が{HISTORY_DEEP_PAGE}ページに満たないため point_history_page_1000 は計測しません')
+        return cases
+
+
+def environment_info():
+    """計測環境の情報"""
+    version = getattr(connection, 'pg_version', None) or getattr(connection.Database, 'sqlite_version', '')
+    return {
+        'database': connection.vendor,
+        'database_version': str(version),
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
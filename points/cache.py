@@ -0,0 +1,138 @@
+"""
+ポイントカテゴリのキャッシュ
+
+プロセス内キャッシュ（1段目）と Django キャッシュ（2段目、本番では Redis）の
+2段構成。カテゴリ更新時は共有キャッシュ上のバージョンを書き換え、
+各ワーカーは一定間隔でバージョンを確認してプロセス内キャッシュを破棄する。
+ロールバックではシグナルが発火しないため、テストでは category_cache.clear() を
+呼んでからカテゴリを参照すること。
+
+Django キャッシュがプロセスごとに独立している場合（Redis を使わない LocMemCache など）は
+無効化が他のプロセスに伝わらないため、共有キャッシュを使わず一定間隔でデータベースから読み直す。
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# プロセスごとに独立しているキャッシュバックエンド
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache():
+    """Django キャッシュがプロセス間で共有されているか"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+class PointCategoryCache:
+    """ポイントカテゴリのキャッシュ（ID・カテゴリ名で参照）"""
+    CACHE_KEY = 'points:categories'
+    VERSION_KEY = 'points:categories:version'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = None
+        self._by_name = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def check_interval(self):
+        """共有キャッシュのバージョンを確認する間隔（秒）"""
+        return getattr(settings, 'POINT_CATEGORY_CACHE_CHECK_INTERVAL', 5)
+
+    def _load(self):
+        """必要に応じてプロセス内キャッシュを再読み込み"""
+        now = time.monotonic()
+        if self._by_id is not None and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if not is_shared_cache():
+                from .models import PointCategory
+                self._set(list(PointCategory.objects.order_by('id')), None, now)
+                return
+
+            version = cache.get(self.VERSION_KEY)
+            if self._by_id is not None and version == self._version:
+                self._checked_at = now
+                return
+
+            entry = cache.get(self.CACHE_KEY)
+            if entry is not None and entry['version'] == version:
+                categories = entry['categories']
+            else:
+                from .models import PointCategory
+                categories = list(PointCategory.objects.order_by('id'))
+                cache.set(self.CACHE_KEY, {'version': version, 'categories': categories}, None)
+            self._set(categories, version, now)
+
+    def _set(self, categories, version, now):
+        self._by_id = {category.pk: category for category in categories}
+        self._by_name = {category.name: category for category in categories}
+        self._version = version
+        self._checked_at = now
+
+    def get_by_id(self, category_id):
+        """IDでカテゴリを取得（存在しない場合はNone）"""
+        self._load()
+        return self._by_id.get(category_id)
+
+    def get_by_name(self, name):
+        """カテゴリ名でカテゴリを取得（存在しない場合はNone）"""
+        self._load()
+        return self._by_name.get(name)
+
+    def all(self):
+        """全カテゴリをID順で取得"""
+        self._load()
+        return list(self._by_id.values())
+
+    def clear(self):
+        """プロセス内キャッシュを破棄"""
+        with self._lock:
+            self._by_id = None
+            self._by_name = None
+            self._version = None
+
+    def invalidate(self):
+        """全ワーカーのキャッシュを無効化"""
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        cache.delete(self.CACHE_KEY)
+        self.clear()
+
+
+category_cache = PointCategoryCache()
+
+
+USER_POINTS_VERSION_KEY = 'points:user_version:{}'
+
+
+def get_user_points_version(user_id):
+    """
+    ユーザーのポイント状況のバージョンを取得（残高が変わるたびに変わる値）
+
+    更新は共有キャッシュを通じて伝わるため、is_shared_cache() が偽の場合は使わないこと。
+    """
+    key = USER_POINTS_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_user_points(user_ids):
+    """ユーザーのポイント状況のバージョンをトランザクションのコミット後に更新"""
+    from django.db import transaction
+
+    keys = [USER_POINTS_VERSION_KEY.format(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,23 @@
+"""
+ポイント管理のシステムチェック（manage.py check --deploy で実行）
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .cache import is_shared_cache
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """本番で共有キャッシュ（Redis）が設定されているか"""
+    if is_shared_cache():
+        return []
+    return [Error(
+        f'キャッシュ {settings.CACHES["default"]["BACKEND"]} はプロセスごとに独立しています。',
+        hint=(
+            'USE_REDIS=True と REDIS_URL を設定してください。設定しない場合、カテゴリのキャッシュは'
+            '一定間隔でデータベースから読み直し、ダッシュボードのキャッシュ・ETag は無効になります。'
+            '1プロセスでのみ運用する場合は SILENCED_SYSTEM_CHECKS に points.E001 を追加してください。'
+        ),
+        id='points.E001',
+    )]
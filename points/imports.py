@@ -0,0 +1,234 @@
+"""
+ポイント付与ファイル（CSV / XLSX）の取り込み
+
+ファイルを1行ずつ読みながら chunk_size 行ごとに、ユーザーの解決（1回の IN クエリ）・
+検証・一括付与・エラー行の記録を1つのトランザクションで行う。
+処理済み行数も同じトランザクションで記録するため、中断した場合は次のチャンクから再開する。
+
+ファイルの1行目は見出しで、次の列を使う（大文字・小文字は区別しない）。
+
+- user_id / username / email のいずれか（ユーザーの特定に使う）
+- points（1人あたりの付与ポイント数）
+- reason（付与理由。無い場合は取り込みの既定の付与理由）
+"""
+import csv
+import io
+import os
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GrantImport, GrantImportError, Point
+
+USER_COLUMNS = ('user_id', 'username', 'email')
+MAX_POINTS_PER_ROW = 1000000
+
+
+def open_rows(fileobj, name):
+    """バイナリのファイルから各行を値のリストとして順に返す（拡張子で CSV / XLSX を判定）"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.xlsx':
+        return _iter_xlsx_rows(fileobj)
+    if extension in ('.csv', '.txt'):
+        return csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    raise ValueError(f'対応していないファイル形式です: {extension or name}')
+
+
+def _iter_xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX ファイルの読み込みには openpyxl が必要です。')
+
+    # read_only モードでは行を順に読み出し、シート全体をメモリに載せない
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def _cell(row, index):
+    """セルの値を文字列で返す（XLSX の整数値の小数表記・空セルを正規化）"""
+    if index is None or index >= len(row) or row[index] is None:
+        return ''
+    value = row[index]
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _format_row(row):
+    output = io.StringIO()
+    csv.writer(output).writerow(['' if value is None else value for value in row])
+    return output.getvalue().rstrip('\r\n')
+
+
+class GrantRowParser:
+    """見出し行から列の位置を決め、各行を検証する"""
+
+    def __init__(self, header, default_reason=''):
+        columns = [_cell(header, index).lower() for index in range(len(header))]
+        self.user_column = next((column for column in USER_COLUMNS if column in columns), None)
+        if self.user_column is None:
+            raise ValueError('ユーザーを特定する列（user_id / username / email）がありません。')
+        if 'points' not in columns:
+            raise ValueError('points 列がありません。')
+
+        self.user_index = columns.index(self.user_column)
+        self.points_index = columns.index('points')
+        self.reason_index = columns.index('reason') if 'reason' in columns else None
+        self.default_reason = default_reason
+
+    def parse(self, row):
+        """(ユーザーの値, 付与ポイント数, 付与理由) を返す（不正な行は ValueError）"""
+        user_value = _cell(row, self.user_index)
+        if not user_value:
+            raise ValueError('ユーザーが指定されていません。')
+        if self.user_column == 'user_id':
+            if not user_value.isdigit():
+                raise ValueError('user_id が数値ではありません。')
+            user_value = int(user_value)
+
+        points = _cell(row, self.points_index).replace(',', '')
+        if not points.isdigit():
+            raise ValueError('points が正の整数ではありません。')
+        points = int(points)
+        if not 0 < points <= MAX_POINTS_PER_ROW:
+            raise ValueError(f'points は1〜{MAX_POINTS_PER_ROW}の範囲で指定してください。')
+
+        reason = _cell(row, self.reason_index) or self.default_reason
+        if not reason:
+            raise ValueError('付与理由がありません。')
+        if len(reason) > 200:
+            raise ValueError('付与理由が200文字を超えています。')
+        return user_value, points, reason
+
+    def resolve_users(self, values):
+        """ユーザーの値 → ユーザーID の辞書（管理者は対象外）"""
+        lookup = 'id' if self.user_column == 'user_id' else self.user_column
+        return dict(
+            get_user_model().objects.filter(**{f'{lookup}__in': values}, is_admin=False).values_list(lookup, 'id')
+        )
+
+
+def _import_chunk(grant_import, parser, chunk, rows_processed):
+    """1チャンク分の行を検証して付与し、処理済み行数と合わせてコミットする"""
+    parsed = []
+    errors = []
+    for row_number, row in chunk:
+        if not any(_cell(row, index) for index in range(len(row))):
+            continue  # 空行
+        try:
+            parsed.append((row_number, row) + parser.parse(row))
+        except ValueError as e:
+            errors.append(GrantImportError(
+                grant_import=grant_import, row_number=row_number, values=_format_row(row), message=str(e)
+            ))
+
+    user_ids = parser.resolve_users({user_value for _, _, user_value, _, _ in parsed})
+    grants = []
+    for row_number, row, user_value, points, reason in parsed:
+        if user_value in user_ids:
+            grants.append((user_ids[user_value], points, reason))
+        else:
+            errors.append(GrantImportError(
+                grant_import=grant_import, row_number=row_number, values=_format_row(row),
+                message='ユーザーが見つかりません。'
+            ))
+
+    errors.sort(key=lambda error: error.row_number)
+    with transaction.atomic():
+        Point.bulk_grant_rows(grants, created_by=grant_import.created_by)
+        GrantImportError.objects.bulk_create(errors)
+        grant_import.rows_processed = rows_processed
+        grant_import.granted_rows += len(grants)
+        grant_import.granted_points += sum(points for _, points, _ in grants)
+        grant_import.error_rows += len(errors)
+        grant_import.save(update_fields=[
+            'rows_processed', 'granted_rows', 'granted_points', 'error_rows', 'updated_at'
+        ])
+
+
+def write_error_file(grant_import, output, chunk_size=2000):
+    """エラー行を CSV（行番号・エラー・元の内容）でテキストのファイルに書き出す"""
+    writer = csv.writer(output)
+    writer.writerow(['row_number', 'error', 'values'])
+    last_id = 0
+    while True:
+        rows = list(
+            grant_import.errors.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'row_number', 'message', 'values'
+            )[:chunk_size]
+        )
+        writer.writerows(row[1:] for row in rows)
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _save_error_file(grant_import):
+    with tempfile.TemporaryFile() as temp:
+        output = io.TextIOWrapper(temp, encoding='utf-8-sig', newline='')
+        write_error_file(grant_import, output)
+        output.flush()
+        temp.seek(0)
+        grant_import.error_file.save(f'grant_import_{grant_import.id}_errors.csv', File(temp), save=False)
+        output.detach()
+
+
+def _finish(grant_import, status, message=''):
+    grant_import.status = status
+    grant_import.message = message
+    grant_import.finished_at = timezone.now()
+    grant_import.save(update_fields=['status', 'message', 'finished_at', 'error_file', 'updated_at'])
+
+
+def run_import(grant_import, chunk_size=None, on_progress=None):
+    """
+    取り込みを実行する（処理済みの行は飛ばして再開する）
+
+    chunk_size を省略した場合は GRANT_IMPORT_CHUNK_SIZE 行ずつコミットする。
+    ファイルの形式・見出しの誤りは失敗として記録する。それ以外の例外は
+    失敗を記録した上で送出する（ジョブから実行した場合は再試行される）。
+    """
+    chunk_size = chunk_size or settings.GRANT_IMPORT_CHUNK_SIZE
+    GrantImport.objects.filter(id=grant_import.id).update(status='running', message='')
+    grant_import.refresh_from_db()
+    rows_processed = grant_import.rows_processed
+
+    try:
+        with grant_import.file.open('rb') as fileobj:
+            rows = open_rows(fileobj, grant_import.file.name)
+            header = next(rows, None)
+            if header is None:
+                raise ValueError('ファイルが空です。')
+            parser = GrantRowParser(header, grant_import.default_reason)
+
+            # 1行目は見出し
+            numbered = islice(enumerate(rows, start=2), rows_processed, None)
+            while True:
+                chunk = list(islice(numbered, chunk_size))
+                if not chunk:
+                    break
+                rows_processed += len(chunk)
+                _import_chunk(grant_import, parser, chunk, rows_processed)
+                if on_progress:
+                    on_progress(grant_import)
+    except ValueError as e:
+        _finish(grant_import, 'failed', str(e))
+        return grant_import
+    except Exception as e:
+        _finish(grant_import, 'failed', f'{grant_import.rows_processed}行まで処理して中断しました: {e}')
+        raise
+
+    if grant_import.error_rows:
+        _save_error_file(grant_import)
+    _finish(grant_import, 'succeeded')
+    return grant_import
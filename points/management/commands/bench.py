@@ -0,0 +1,101 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from points.benchmark import BenchmarkDataset, BenchmarkRunner, environment_info
+
+
+class Command(BaseCommand):
+    """ホットパスのベンチマークコマンド"""
+    help = '合成データを投入して主要な処理を計測し、結果を JSON で出力します（計測後に合成データは削除されます）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='ユーザー数（デフォルト: 1000）')
+        parser.add_argument('--lots-per-user', type=int, default=12, help='ユーザーあたりのポイント件数（デフォルト: 12）')
+        parser.add_argument('--products', type=int, default=50, help='商品数（デフォルト: 50）')
+        parser.add_argument(
+            '--transactions-per-user', type=int, default=20,
+            help='ユーザーあたりの取引履歴件数（デフォルト: 20）',
+        )
+        parser.add_argument(
+            '--exchanges-per-user', type=int, default=5,
+            help='ユーザーあたりの交換履歴件数（デフォルト: 5）',
+        )
+        parser.add_argument(
+            '--history-rows', type=int, default=20020,
+            help='履歴計測用ユーザーの取引履歴件数（1000ページ目の計測には20000件超が必要。デフォルト: 20020）',
+        )
+        parser.add_argument('--iterations', type=int, default=30, help='計測回数（デフォルト: 30）')
+        parser.add_argument('--warmup', type=int, default=3, help='ウォームアップ回数（デフォルト: 3）')
+        parser.add_argument('--bulk-size', type=int, default=500, help='一括付与1回あたりのユーザー数（デフォルト: 500）')
+        parser.add_argument('--seed', type=int, default=42, help='乱数シード（デフォルト: 42）')
+        parser.add_argument('--prefix', default='bench_', help='合成ユーザー名の接頭辞（デフォルト: bench_）')
+        parser.add_argument('--case', action='append', dest='cases', help='計測する処理名（複数指定可。省略時はすべて）')
+        parser.add_argument('-o', '--output', help='結果の JSON を書き出すファイル')
+        parser.add_argument('--compare', help='比較対象とする過去の結果 JSON')
+
+    def handle(self, *args, **options):
+        dataset = BenchmarkDataset(
+            prefix=options['prefix'],
+            users=options['users'],
+            lots_per_user=options['lots_per_user'],
+            products=options['products'],
+            transactions_per_user=options['transactions_per_user'],
+            exchanges_per_user=options['exchanges_per_user'],
+            history_rows=options['history_rows'],
+            seed=options['seed'],
+        )
+        if options['users'] < 2:
+            raise CommandError('--users は2以上を指定してください')
+        if dataset.user_queryset().exists():
+            # 前回の中断で残った合成データ
+            self.stdout.write(self.style.WARNING('前回の合成データが残っているため削除します'))
+            dataset.cleanup()
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        runner = BenchmarkRunner(
+            dataset,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            bulk_size=options['bulk_size'],
+            stdout=self.stdout,
+        )
+        self.stdout.write('合成データを投入しています...')
+        results = runner.run(only=options['cases'])
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': environment_info(),
+            'dataset': dataset.as_dict(),
+            'settings': {
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'bulk_size': options['bulk_size'],
+            },
+            'results': results,
+        }
+
+        self._print_table(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'結果を {options["output"]} に出力しました。'))
+
+    def _print_table(self, results, baseline=None):
+        previous = (baseline or {}).get('results', {})
+        self.stdout.write(f'{"処理":<28}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"クエリ":>8}  比較(p50)')
+        for name, result in results.items():
+            line = (
+                f'{name:<28}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                f'{result["p99_ms"]:>10.2f}{result["queries"]:>8}'
+            )
+            before = previous.get(name)
+            if before and before.get('p50_ms'):
+                change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+                line += f'  {change:+.1f}%'
+            self.stdout.write(line)
@@ -0,0 +1,67 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from incentive_system.db import isolated_databases
+from points.query_budgets import Skipped, fallback_templates, measure_sizes
+
+
+class Command(BaseCommand):
+    """全URLのクエリ数がデータ量に比例しないことを確認するコマンド"""
+    help = (
+        'データ量の異なる2種類の合成データで points / products / accounts の全URLを表示し、'
+        'データ量に応じてクエリ数が増えるビューがあればエラー終了します（CI での実行を想定）。'
+        '合成データは検証用に作成したデータベース（テスト用データベース）に投入され、終了時に削除されます'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='qbudget_', help='合成ユーザー名の接頭辞（デフォルト: qbudget_）')
+        parser.add_argument('--seed', type=int, default=42, help='乱数シード（デフォルト: 42）')
+
+    def handle(self, *args, **options):
+        # GET が許可されないビュー（405）で出力されるリクエストログを抑止する
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            self.stdout.write('検証用のデータベースを作成しています...')
+            with isolated_databases():
+                counts = measure_sizes(
+                    prefix=options['prefix'],
+                    seed=options['seed'],
+                    on_size=lambda size: self.stdout.write(f'{size} データで計測しています...'),
+                )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            request_logger.setLevel(previous_level)
+        self._report(counts)
+
+    def _report(self, counts):
+        budgets = getattr(settings, 'VIEW_PERFORMANCE_BUDGETS', {})
+        failures = []
+        self.stdout.write(f'{"URL名":<28}{"small":>8}{"large":>8}  結果')
+        for name, small in counts['small'].items():
+            large = counts['large'].get(name)
+            if isinstance(small, Skipped) or isinstance(large, Skipped):
+                self.stdout.write(f'{name:<28}{"-":>8}{"-":>8}  スキップ（{small if isinstance(small, Skipped) else large}）')
+                continue
+
+            result = 'OK'
+            if large > small:
+                result = self.style.ERROR('NG（データ量に比例）')
+                failures.append(f'{name}: {small} → {large}')
+            else:
+                limit = budgets.get(name, budgets.get('default', {})).get('queries')
+                if limit is not None and large > limit:
+                    result = self.style.WARNING(f'予算超過（上限 {limit}）')
+            self.stdout.write(f'{name:<28}{small:>8}{large:>8}  {result}')
+
+        if fallback_templates:
+            self.stdout.write(
+                'テンプレートが未作成のため表示内容の評価のみで計測: ' + ', '.join(sorted(fallback_templates))
+            )
+        if failures:
+            raise CommandError('データ量に応じてクエリ数が増えるビューがあります: ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('すべてのビューのクエリ数はデータ量に依存していません。'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from incentive_system.db import isolated_databases
+from points.query_plans import check_plans
+
+
+class Command(BaseCommand):
+    """主要なクエリの実行計画を確認するコマンド"""
+    help = (
+        '合成データを投入して主要なクエリの実行計画（EXPLAIN）を表示し、'
+        '想定したインデックスが使われていなければエラー終了します（CI での実行を想定）。'
+        '合成データは検証用に作成したデータベース（テスト用データベース）に投入され、終了時に削除されます'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='qplan_', help='合成ユーザー名の接頭辞（デフォルト: qplan_）')
+        parser.add_argument('--users', type=int, default=200, help='合成ユーザー数（デフォルト: 200）')
+        parser.add_argument('--seed', type=int, default=42, help='乱数シード（デフォルト: 42）')
+        parser.add_argument('--verbose-plan', action='store_true', help='実行計画の全文を表示する')
+
+    def handle(self, *args, **options):
+        self.stdout.write('検証用のデータベースを作成しています...')
+        with isolated_databases():
+            plans = check_plans(prefix=options['prefix'], users=options['users'], seed=options['seed'])
+
+        failures = []
+        for label, index_name, plan in plans:
+            if index_name in plan:
+                self.stdout.write(f'OK  {label}: {index_name}')
+            else:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'NG  {label}: {index_name} が使われていません'))
+            if options['verbose_plan'] or index_name not in plan:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError('想定したインデックスが使われていないクエリがあります: ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('すべてのクエリで想定したインデックスが使われています。'))
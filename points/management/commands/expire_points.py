@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from points.models import Point
+
+
+class Command(BaseCommand):
+    """有効期限切れポイントの失効処理コマンド"""
+    help = '有効期限を過ぎたポイントを一括で失効させ、失効履歴を作成します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='1トランザクションで処理するポイント件数（デフォルト: 5000）',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        targets = Point.objects.filter(is_expired=False, expires_at__lte=now)
+
+        # (expires_at, id) のキーセットで走査する。処理済みのポイントは
+        # is_expired=True になるため、中断後に再実行しても続きから処理される。
+        expired_count = 0
+        skipped_count = 0
+        last_key = None
+        while True:
+            batch_query = targets
+            if last_key:
+                batch_query = batch_query.filter(
+                    Q(expires_at__gt=last_key[0]) | Q(expires_at=last_key[0], id__gt=last_key[1])
+                )
+            batch = list(
+                batch_query.order_by('expires_at', 'id').values_list('id', 'expires_at')[:batch_size]
+            )
+            if not batch:
+                break
+
+            point_ids = [point_id for point_id, _ in batch]
+            expired = Point.expire_points(
+                Point.objects.filter(id__in=point_ids, expires_at__lte=now),
+                skip_locked=True
+            )
+            expired_count += expired
+            skipped_count += len(point_ids) - expired
+            last_key = (batch[-1][1], batch[-1][0])
+
+            self.stdout.write(f'{expired_count}件処理済み...')
+
+        self.stdout.write(self.style.SUCCESS(f'{expired_count}件のポイントを失効させました。'))
+        if skipped_count:
+            self.stdout.write(self.style.WARNING(
+                f'{skipped_count}件は処理中のためスキップしました。次回実行時に処理されます。'
+            ))
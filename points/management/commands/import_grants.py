@@ -0,0 +1,85 @@
+import os
+import shutil
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from points.imports import run_import
+from points.models import GrantImport
+
+
+class Command(BaseCommand):
+    """ポイント付与ファイルの取り込みコマンド"""
+    help = (
+        'CSV / XLSX のポイント付与ファイル（見出し: user_id / username / email, points, reason）を取り込みます。'
+        '中断した取り込みは --resume で続きから再開できます'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='取り込むファイル（.csv / .xlsx）')
+        parser.add_argument('--reason', default='', help='reason 列が無い行の付与理由')
+        parser.add_argument('--created-by', help='付与者として記録する管理者のユーザー名')
+        parser.add_argument('--resume', type=int, metavar='IMPORT_ID', help='中断した取り込みを再開する')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='1トランザクションで処理する行数（デフォルト: GRANT_IMPORT_CHUNK_SIZE）',
+        )
+        parser.add_argument('--errors', metavar='PATH', help='エラー行の CSV の出力先')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            grant_import = GrantImport.objects.filter(id=options['resume']).first()
+            if grant_import is None:
+                raise CommandError(f'取り込み #{options["resume"]} が見つかりません。')
+            if grant_import.status == 'succeeded':
+                raise CommandError(f'取り込み #{grant_import.id} は完了しています。')
+            self.stdout.write(f'取り込み #{grant_import.id} を {grant_import.rows_processed} 行目の次から再開します。')
+        elif options['path']:
+            grant_import = self._create_import(options)
+        else:
+            raise CommandError('ファイル、または --resume を指定してください。')
+
+        started = time.monotonic()
+        grant_import = run_import(
+            grant_import,
+            chunk_size=options['chunk_size'],
+            on_progress=lambda progress: self.stdout.write(f'{progress.rows_processed}行を処理済み'),
+        )
+        elapsed = time.monotonic() - started
+
+        if grant_import.error_rows and options['errors']:
+            with grant_import.error_file.open('rb') as source, open(options['errors'], 'wb') as destination:
+                shutil.copyfileobj(source, destination)
+
+        if grant_import.status == 'failed':
+            raise CommandError(f'取り込み #{grant_import.id} に失敗しました: {grant_import.message}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'取り込み #{grant_import.id} が完了しました: '
+            f'{grant_import.granted_rows}行・{grant_import.granted_points}ポイントを付与、'
+            f'エラー {grant_import.error_rows}行（{elapsed:.1f}秒）'
+        ))
+        if grant_import.error_rows:
+            self.stdout.write(f'エラー行: {options["errors"] or grant_import.error_file.name}')
+
+    def _create_import(self, options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'ファイルが見つかりません: {path}')
+
+        created_by = None
+        if options['created_by']:
+            created_by = User.objects.filter(username=options['created_by'], is_admin=True).first()
+            if created_by is None:
+                raise CommandError(f'管理者が見つかりません: {options["created_by"]}')
+
+        # 再開できるよう、ファイルは取り込みと合わせて保存する
+        with open(path, 'rb') as source:
+            return GrantImport.objects.create(
+                file=File(source, name=os.path.basename(path)),
+                default_reason=options['reason'],
+                created_by=created_by,
+            )
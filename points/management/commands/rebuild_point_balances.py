@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from points.models import UserPointBalance
+
+
+class Command(BaseCommand):
+    """ポイント残高テーブルをPointから再構築するコマンド"""
+    help = 'Pointの残りポイントからユーザー別・カテゴリ別残高を再構築します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='対象ユーザーID（複数指定可、省略時は全ユーザー）',
+        )
+
+    def handle(self, *args, **options):
+        updated = UserPointBalance.rebuild(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'{updated}件の残高を更新しました。'))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_balances(apps, schema_editor):
+    Point = apps.get_model('points', 'Point')
+    UserPointBalance = apps.get_model('points', 'UserPointBalance')
+    totals = Point.objects.filter(remaining_amount__gt=0, is_expired=False).values(
+        'user_id', 'category_id'
+    ).annotate(total_remaining=models.Sum('remaining_amount'))
+    UserPointBalance.objects.bulk_create([
+        UserPointBalance(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            balance=row['total_remaining'],
+            version=1,
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('points', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPointBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.PositiveIntegerField(default=0, verbose_name='残高')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='バージョン')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='points.pointcategory', verbose_name='カテゴリ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='point_balances', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'ポイント残高',
+                'verbose_name_plural': 'ポイント残高',
+                'db_table': 'user_point_balances',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userpointbalance',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='unique_user_point_balance'),
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0002_user_point_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpointbalance',
+            name='last_sequence',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='最終取引連番'),
+        ),
+    ]
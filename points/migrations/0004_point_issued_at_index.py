@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0003_userpointbalance_last_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='point',
+            index=models.Index(fields=['issued_at'], name='points_issued__ab6b60_idx'),
+        ),
+    ]
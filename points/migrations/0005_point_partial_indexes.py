@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0004_point_issued_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='point',
+            index=models.Index(condition=models.Q(('is_expired', False), ('remaining_amount__gt', 0)), fields=['user', 'category', 'expires_at', 'id', 'remaining_amount'], name='points_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='point',
+            index=models.Index(condition=models.Q(('is_expired', False)), fields=['expires_at', 'id'], name='points_unexpired_idx'),
+        ),
+    ]
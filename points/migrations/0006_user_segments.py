@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('jobs', '0001_initial'),
+        ('points', '0005_point_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='セグメント名')),
+                ('description', models.TextField(blank=True, verbose_name='説明')),
+                ('active_only', models.BooleanField(default=True, verbose_name='有効なユーザーのみ')),
+                ('joined_before', models.DateField(blank=True, null=True, verbose_name='登録日（この日より前）')),
+                ('balance_below', models.PositiveIntegerField(blank=True, help_text='全カテゴリの残高合計で判定', null=True, verbose_name='保有ポイント（この値未満）')),
+                ('uses_member_list', models.BooleanField(default=False, help_text='取り込んだユーザーIDのユーザーに限定する', verbose_name='IDファイルで限定')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_segments', to=settings.AUTH_USER_MODEL, verbose_name='作成者')),
+            ],
+            options={
+                'verbose_name': 'ユーザーセグメント',
+                'verbose_name_plural': 'ユーザーセグメント',
+                'db_table': 'user_segments',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSegmentMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='points.usersegment', verbose_name='セグメント')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_memberships', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'セグメントメンバー',
+                'verbose_name_plural': 'セグメントメンバー',
+                'db_table': 'user_segment_members',
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentGrantResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.PositiveIntegerField(verbose_name='付与ポイント数')),
+                ('balance_after', models.PositiveIntegerField(verbose_name='付与後の保有ポイント')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='付与日時')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_grant_results', to='jobs.job', verbose_name='ジョブ')),
+                ('segment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grant_results', to='points.usersegment', verbose_name='セグメント')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_grant_results', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'セグメント付与結果',
+                'verbose_name_plural': 'セグメント付与結果',
+                'db_table': 'segment_grant_results',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usersegmentmember',
+            constraint=models.UniqueConstraint(fields=('segment', 'user'), name='unique_segment_member'),
+        ),
+        migrations.AddConstraint(
+            model_name='segmentgrantresult',
+            constraint=models.UniqueConstraint(fields=('job', 'user'), name='unique_segment_grant_result'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('points', '0006_user_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GrantImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='grant_imports/', verbose_name='ファイル')),
+                ('default_reason', models.CharField(blank=True, help_text='ファイルに reason 列が無い行で使用', max_length=200, verbose_name='付与理由（既定）')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '取り込み中'), ('succeeded', '完了'), ('failed', '失敗')], default='pending', max_length=20, verbose_name='状態')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='処理済み行数')),
+                ('granted_rows', models.PositiveIntegerField(default=0, verbose_name='付与した行数')),
+                ('granted_points', models.PositiveBigIntegerField(default=0, verbose_name='付与ポイント合計')),
+                ('error_rows', models.PositiveIntegerField(default=0, verbose_name='エラー行数')),
+                ('error_file', models.FileField(blank=True, upload_to='grant_imports/errors/', verbose_name='エラーファイル')),
+                ('message', models.TextField(blank=True, verbose_name='メッセージ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grant_imports', to=settings.AUTH_USER_MODEL, verbose_name='登録者')),
+            ],
+            options={
+                'verbose_name': 'ポイント付与の取り込み',
+                'verbose_name_plural': 'ポイント付与の取り込み',
+                'db_table': 'grant_imports',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GrantImportError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField(verbose_name='行番号')),
+                ('values', models.TextField(blank=True, verbose_name='内容')),
+                ('message', models.CharField(max_length=200, verbose_name='エラー')),
+                ('grant_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='points.grantimport', verbose_name='取り込み')),
+            ],
+            options={
+                'verbose_name': '取り込みエラー',
+                'verbose_name_plural': '取り込みエラー',
+                'db_table': 'grant_import_errors',
+                'ordering': ['row_number'],
+                'indexes': [models.Index(fields=['grant_import', 'row_number'], name='grant_impor_grant_i_39f28f_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F, Sum
 from django.conf import settings
 from django.utils import timezone
 import calendar
@@ -29,23 +30,38 @@ class PointCategory(models.Model):
     def __str__(self):
         return self.get_name_display()
     
+    @classmethod
+    def get_cached(cls, name, defaults):
+        """カテゴリをキャッシュから取得（未登録の場合は作成）"""
+        from .cache import category_cache
+        
+        category = category_cache.get_by_name(name)
+        if category is None:
+            category, created = cls.objects.get_or_create(name=name, defaults=defaults)
+        return category
+    
+    @classmethod
+    def get_active_categories(cls):
+        """有効なカテゴリ一覧を取得（キャッシュ経由）"""
+        from .cache import category_cache
+        
+        return [category for category in category_cache.all() if category.is_active]
+    
     @classmethod
     def get_digital_category(cls):
         """デジタルギフトカテゴリを取得"""
-        category, created = cls.objects.get_or_create(
-            name=cls.DIGITAL_GIFT,
+        return cls.get_cached(
+            cls.DIGITAL_GIFT,
             defaults={'ratio': 0.60, 'description': 'Amazonギフト券など'}
         )
-        return category
     
     @classmethod
     def get_corporate_category(cls):
         """企業商品カテゴリを取得"""
-        category, created = cls.objects.get_or_create(
-            name=cls.CORPORATE_PRODUCT,
+        return cls.get_cached(
+            cls.CORPORATE_PRODUCT,
             defaults={'ratio': 0.40, 'description': '企業オリジナル商品'}
         )
-        return category
 
 
 class PointManager(models.Manager):
@@ -110,6 +126,20 @@ class Point(models.Model):
         indexes = [
             models.Index(fields=['user', 'category', 'expires_at']),
             models.Index(fields=['expires_at', 'is_expired']),
+            models.Index(fields=['issued_at']),
+            # 利用可能ポイント（FIFO消費・残高集計）用。残りポイント数まで含めて
+            # テーブルを読まずに集計できるようにする
+            models.Index(
+                fields=['user', 'category', 'expires_at', 'id', 'remaining_amount'],
+                condition=models.Q(remaining_amount__gt=0, is_expired=False),
+                name='points_available_idx',
+            ),
+            # 失効処理（expire_points）の走査用
+            models.Index(
+                fields=['expires_at', 'id'],
+                condition=models.Q(is_expired=False),
+                name='points_unexpired_idx',
+            ),
         ]
     
     def __str__(self):
@@ -171,116 +201,780 @@ class Point(models.Model):
         
         points_created = []
         
-        # デジタルギフトポイント付与
-        if digital_points > 0:
-            digital_point = cls.objects.create(
+        with transaction.atomic():
+            points_created.extend(cls._grant_category_points(
+                user, digital_category, digital_points, reason, created_by
+            ))
+            points_created.extend(cls._grant_category_points(
+                user, corporate_category, corporate_points, reason, created_by
+            ))
+        
+        return points_created
+    
+    @classmethod
+    def _grant_category_points(cls, user, category, amount, reason, created_by=None):
+        """カテゴリ単位でポイントを付与し、残高と取引履歴を更新"""
+        if amount <= 0:
+            return []
+        
+        point = cls.objects.create(
+            user=user,
+            category=category,
+            amount=amount,
+            reason=reason
+        )
+        UserPointBalance.apply_delta(user, category, amount)
+        
+        # 取引履歴作成
+        try:
+            from transactions.models import PointTransaction
+            PointTransaction.create_grant_transaction(
                 user=user,
-                category=digital_category,
-                amount=digital_points,
-                reason=reason
+                category=category,
+                amount=amount,
+                reason=reason,
+                point_id=point.id,
+                created_by=created_by
             )
-            points_created.append(digital_point)
+        except ImportError:
+            pass  # transactionsアプリがない場合は無視
+        
+        return [point]
+    
+    @classmethod
+    def bulk_grant(cls, users, total_points, reason, created_by=None, chunk_size=1000):
+        """
+        複数ユーザーへ一括でポイントを付与（6:4の比率で分割）
+        
+        ユーザーをchunk_size件ずつ処理し、ポイント・残高・取引履歴を
+        チャンクごとに一括INSERT/UPDATEする。付与したユーザー数を返す。
+        """
+        if total_points <= 0:
+            return 0
+        
+        granted_count = 0
+        
+        if hasattr(users, 'values_list'):
+            user_ids = list(users.values_list('pk', flat=True))
+        else:
+            user_ids = [getattr(user, 'pk', user) for user in users]
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            with transaction.atomic():
+                cls.bulk_grant_rows([(user_id, total_points, reason) for user_id in chunk], created_by=created_by)
             
-            # 取引履歴作成
-            try:
-                from transactions.models import PointTransaction
-                PointTransaction.create_grant_transaction(
-                    user=user,
-                    category=digital_category,
-                    amount=digital_points,
-                    reason=reason,
-                    point_id=digital_point.id,
-                    created_by=created_by
-                )
-            except ImportError:
-                pass  # transactionsアプリがない場合は無視
+            granted_count += len(chunk)
         
-        # 企業商品ポイント付与
-        if corporate_points > 0:
-            corporate_point = cls.objects.create(
-                user=user,
-                category=corporate_category,
-                amount=corporate_points,
-                reason=reason
+        return granted_count
+    
+    @classmethod
+    def bulk_grant_rows(cls, rows, created_by=None):
+        """
+        (ユーザーID, 付与ポイント数, 付与理由) の行ごとにポイントを付与（6:4の比率で分割）
+        
+        ポイント・残高・取引履歴をまとめてINSERT/UPDATEする。同じユーザーの行が複数あってもよい。
+        呼び出し元のトランザクション内で実行すること。作成したポイントの件数を返す。
+        取り込みなど数十万行を付与するため、モデルのインスタンスを作らずに INSERT する。
+        """
+        from incentive_system.db import insert_rows
+        
+        categories = (PointCategory.get_digital_category(), PointCategory.get_corporate_category())
+        connection = connections[router.db_for_write(cls)]
+        issued_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        expires_at = connection.ops.adapt_datetimefield_value(cls().calculate_expiry_date())
+        
+        # (ユーザーID, カテゴリID, ポイント数, 付与理由)
+        lots = []
+        for user_id, total_points, reason in rows:
+            digital_points = int(total_points * 0.6)
+            for category, amount in zip(categories, (digital_points, total_points - digital_points)):
+                if amount > 0:
+                    lots.append((user_id, category.pk, amount, reason))
+        if not lots:
+            return 0
+        
+        point_ids = insert_rows(
+            cls,
+            ['user_id', 'category_id', 'amount', 'remaining_amount', 'reason',
+             'issued_at', 'expires_at', 'is_expired', 'created_at', 'updated_at'],
+            [(user_id, category_id, amount, amount, reason, issued_at, expires_at, False, issued_at, issued_at)
+             for user_id, category_id, amount, reason in lots],
+            returning='id',
+        )
+        deltas = {}
+        entries = {}
+        for user_id, category_id, amount, _ in lots:
+            key = (user_id, category_id)
+            deltas[key] = deltas.get(key, 0) + amount
+            entries[key] = entries.get(key, 0) + 1
+        balances = UserPointBalance.apply_deltas(deltas, entries=entries)
+        
+        # 取引履歴作成
+        try:
+            from transactions.models import PointTransaction
+        except ImportError:
+            return len(lots)  # transactionsアプリがない場合は無視
+        
+        # 同じユーザー・カテゴリの行は、更新後の残高・連番から後ろ向きに割り当てる
+        created_by_id = created_by.pk if created_by else None
+        history = []
+        for (user_id, category_id, amount, reason), point_id in zip(reversed(lots), reversed(point_ids)):
+            key = (user_id, category_id)
+            balance, sequence = balances[key]
+            history.append((
+                user_id, 'grant', category_id, amount, balance, sequence, reason, point_id, issued_at, created_by_id
+            ))
+            balances[key] = (balance - amount, sequence - 1)
+        history.reverse()
+        insert_rows(
+            PointTransaction,
+            ['user_id', 'transaction_type', 'category_id', 'amount', 'balance_after', 'sequence', 'reason',
+             'related_point_id', 'created_at', 'created_by_id'],
+            history,
+        )
+        
+        return len(lots)
+    
+    @classmethod
+    def get_user_points_summary(cls, user):
+        """ユーザーのポイント残高を取得（残高テーブルから読み出し）"""
+        return UserPointBalance.get_summary(user)
+    
+    @classmethod
+    def consume_points(cls, user, category, required_points, batch_size=50):
+        """
+        ポイントを消費（FIFO: 有効期限が近い順）
+        
+        ユーザー・カテゴリの残高行をロックして同一ユーザーの消費を直列化し、
+        必要な分のポイントだけを有効期限順にロックして1回のUPDATEで減算する。
+        """
+        available_points = cls.objects.available_points(user=user, category=category)
+        
+        with transaction.atomic():
+            list(UserPointBalance.objects.select_for_update().filter(user=user, category=category))
+            
+            total_available = available_points.aggregate(
+                total=Sum('remaining_amount')
+            )['total'] or 0
+            if total_available < required_points:
+                raise ValueError('利用可能ポイントが不足しています')
+            
+            locked_points = available_points.select_for_update().order_by('expires_at', 'id')
+            consumed_points = []
+            new_remaining = {}
+            remaining_required = required_points
+            last_key = None
+            
+            while remaining_required > 0:
+                batch_query = locked_points
+                if last_key:
+                    batch_query = batch_query.filter(
+                        models.Q(expires_at__gt=last_key[0])
+                        | models.Q(expires_at=last_key[0], id__gt=last_key[1])
+                    )
+                batch = list(batch_query.values_list('id', 'remaining_amount', 'expires_at')[:batch_size])
+                if not batch:
+                    raise ValueError('利用可能ポイントが不足しています')
+                
+                for point_id, remaining_amount, expires_at in batch:
+                    consume_amount = min(remaining_required, remaining_amount)
+                    new_remaining[point_id] = remaining_amount - consume_amount
+                    consumed_points.append({
+                        'point_id': point_id,
+                        'consumed_amount': consume_amount
+                    })
+                    remaining_required -= consume_amount
+                    if remaining_required <= 0:
+                        break
+                last_key = (batch[-1][2], batch[-1][0])
+            
+            cls.objects.filter(id__in=new_remaining).update(
+                remaining_amount=models.Case(
+                    *[models.When(id=point_id, then=models.Value(amount))
+                      for point_id, amount in new_remaining.items()],
+                    output_field=models.PositiveIntegerField()
+                ),
+                updated_at=timezone.now()
             )
-            points_created.append(corporate_point)
+            UserPointBalance.apply_delta(user, category, -required_points)
+        
+        return consumed_points
+    
+    @classmethod
+    def expire_points(cls, queryset, reason='有効期限切れ', skip_locked=False):
+        """
+        指定したポイントを失効させ、残高テーブルと失効履歴に反映
+        
+        失効フラグの更新・残高の減算・失効履歴の作成をまとめて行う。
+        skip_locked=True の場合、交換処理でロック中のポイントは次回に回す。
+        失効させたポイント件数を返す。
+        """
+        with transaction.atomic():
+            expiring = list(
+                queryset.select_for_update(skip_locked=skip_locked)
+                .filter(is_expired=False)
+                .order_by('id')
+                .values_list('id', 'user_id', 'category_id', 'remaining_amount')
+            )
+            if not expiring:
+                return 0
+            
+            deltas = {}
+            entries = {}
+            for point_id, user_id, category_id, remaining_amount in expiring:
+                key = (user_id, category_id)
+                deltas[key] = deltas.get(key, 0) - remaining_amount
+                if remaining_amount > 0:
+                    entries[key] = entries.get(key, 0) + 1
+            
+            updated = cls.objects.filter(
+                id__in=[point_id for point_id, _, _, _ in expiring]
+            ).update(is_expired=True, updated_at=timezone.now())
+            balances = UserPointBalance.apply_deltas(deltas, entries=entries)
             
-            # 取引履歴作成
+            # 取引履歴作成（失効前残高から順に差し引いて取引後残高を求める）
             try:
                 from transactions.models import PointTransaction
-                PointTransaction.create_grant_transaction(
-                    user=user,
-                    category=corporate_category,
-                    amount=corporate_points,
-                    reason=reason,
-                    point_id=corporate_point.id,
-                    created_by=created_by
-                )
+                running = {
+                    key: [balances[key][0] - deltas[key], balances[key][1] - count]
+                    for key, count in entries.items()
+                }
+                expire_transactions = []
+                for point_id, user_id, category_id, remaining_amount in expiring:
+                    if remaining_amount <= 0:
+                        continue
+                    state = running[(user_id, category_id)]
+                    state[0] -= remaining_amount
+                    state[1] += 1
+                    expire_transactions.append(PointTransaction(
+                        user_id=user_id,
+                        transaction_type='expire',
+                        category_id=category_id,
+                        amount=-remaining_amount,  # 失効は負の値
+                        balance_after=state[0],
+                        sequence=state[1],
+                        reason=reason,
+                        related_point_id=point_id
+                    ))
+                PointTransaction.objects.bulk_create(expire_transactions, batch_size=1000)
             except ImportError:
                 pass  # transactionsアプリがない場合は無視
         
-        return points_created
+        return updated
+
+
+class UserPointBalance(models.Model):
+    """
+    ユーザー別・カテゴリ別ポイント残高
+    
+    失効処理前（is_expired=False）のPointの残りポイント合計を保持する。
+    付与・消費・失効の各処理が同一トランザクション内で差分更新する。
+    last_sequence は取引履歴（PointTransaction.sequence）の払い出し済み連番。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='ユーザー',
+        related_name='point_balances'
+    )
+    category = models.ForeignKey(
+        PointCategory,
+        on_delete=models.CASCADE,
+        verbose_name='カテゴリ'
+    )
+    balance = models.PositiveIntegerField('残高', default=0)
+    version = models.PositiveIntegerField('バージョン', default=0)
+    last_sequence = models.PositiveBigIntegerField('最終取引連番', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    
+    # apply_deltas で差分ごとのUPDATEにまとめる上限（超える場合は行ごとの差分で更新）
+    GROUPED_UPDATE_LIMIT = 20
+    VALUES_UPDATE_SIZE = 500
+    
+    class Meta:
+        verbose_name = 'ポイント残高'
+        verbose_name_plural = 'ポイント残高'
+        db_table = 'user_point_balances'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_user_point_balance'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.category_id} - {self.balance}pt"
     
     @classmethod
-    def get_user_points_summary(cls, user):
-        """ユーザーのポイント残高を取得"""
-        from django.db.models import Sum
+    def apply_delta(cls, user, category, delta):
+        """残高を差分更新（呼び出し元のトランザクション内で実行する）"""
+        user_id = getattr(user, 'pk', user)
+        category_id = getattr(category, 'pk', category)
         
-        # 有効なポイントのみ集計
-        valid_points = cls.objects.filter(
-            user=user,
-            remaining_amount__gt=0,
-            is_expired=False,
-            expires_at__gt=timezone.now()
-        )
+        def _update():
+            return cls.objects.filter(user_id=user_id, category_id=category_id).update(
+                balance=F('balance') + delta,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+        
+        from .cache import invalidate_user_points
+        
+        if not _update():
+            cls.objects.get_or_create(user_id=user_id, category_id=category_id)
+            _update()
+        invalidate_user_points([user_id])
+    
+    @classmethod
+    def next_sequence(cls, user, category):
+        """
+        取引履歴の連番を1つ払い出し、(現在の残高, 連番) を返す
         
-        summary = valid_points.values('category__name').annotate(
-            total_remaining=Sum('remaining_amount')
+        残高行をUPDATEでロックするため、同一ユーザー・カテゴリの連番は欠番なく増加する。
+        呼び出し元のトランザクション内で残高を更新した後に呼ぶこと。
+        """
+        user_id = getattr(user, 'pk', user)
+        category_id = getattr(category, 'pk', category)
+        rows = cls.objects.filter(user_id=user_id, category_id=category_id)
+        
+        if not rows.update(last_sequence=F('last_sequence') + 1):
+            cls.objects.get_or_create(user_id=user_id, category_id=category_id)
+            rows.update(last_sequence=F('last_sequence') + 1)
+        return rows.values_list('balance', 'last_sequence').get()
+    
+    @classmethod
+    def apply_deltas(cls, deltas, entries=None):
+        """
+        {(user_id, category_id): delta} の差分をまとめて反映
+        
+        entries に {(user_id, category_id): 件数} を渡すと、取引履歴の連番も同じUPDATEで払い出す。
+        更新後の {(user_id, category_id): (残高, 最終連番)} を返す。
+        カテゴリ・差分値・件数が同じユーザーを1本のUPDATEにまとめるため、
+        一括付与のように差分が揃っている場合はユーザー数に関わらずクエリ数は一定。
+        """
+        entries = entries or {}
+        keys = [key for key in set(deltas) | set(entries) if deltas.get(key) or entries.get(key)]
+        if not keys:
+            return {}
+        
+        # 未作成の残高行を用意する
+        existing = set(
+            cls.objects.filter(user_id__in={user_id for user_id, _ in keys}).values_list('user_id', 'category_id')
+        )
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, category_id=category_id) for user_id, category_id in keys
+             if (user_id, category_id) not in existing],
+            ignore_conflicts=True,
+            batch_size=1000
         )
         
+        groups = {}
+        for user_id, category_id in keys:
+            group_key = (category_id, deltas.get((user_id, category_id), 0), entries.get((user_id, category_id), 0))
+            groups.setdefault(group_key, []).append(user_id)
+        
+        from .cache import invalidate_user_points
+        
+        invalidate_user_points(user_id for user_id, _ in keys)
+        now = timezone.now()
+        if len(groups) <= cls.GROUPED_UPDATE_LIMIT:
+            for (category_id, delta, count), user_ids in groups.items():
+                cls.objects.filter(category_id=category_id, user_id__in=user_ids).update(
+                    balance=F('balance') + delta,
+                    version=F('version') + 1,
+                    last_sequence=F('last_sequence') + count,
+                    updated_at=now
+                )
+        else:
+            # 差分がユーザーごとに異なる場合（取り込みなど）
+            cls._apply_varied_deltas(
+                [(user_id, category_id, deltas.get((user_id, category_id), 0), entries.get((user_id, category_id), 0))
+                 for user_id, category_id in keys],
+                now
+            )
+        
+        new_balances = {}
+        for category_id in {category_id for _, category_id in keys}:
+            user_ids = [user_id for user_id, key_category_id in keys if key_category_id == category_id]
+            new_balances.update(
+                ((user_id, category_id), (balance, last_sequence))
+                for user_id, balance, last_sequence in cls.objects.filter(
+                    category_id=category_id, user_id__in=user_ids
+                ).values_list('user_id', 'balance', 'last_sequence')
+            )
+        return new_balances
+    
+    @classmethod
+    def _apply_varied_deltas(cls, rows, now):
+        """
+        (user_id, category_id, 差分, 件数) の行ごとに残高・連番を更新
+        
+        ORM の CASE 式は行数に比例して組み立てが重くなるため、SQL を直接実行する。
+        PostgreSQL では VALUES リストとの UPDATE ... FROM でまとめて、
+        SQLite ではプロセス内で実行されるため executemany で1行ずつ更新する。
+        """
+        connection = connections[router.db_for_write(cls)]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        updated_at = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for start in range(0, len(rows), cls.VALUES_UPDATE_SIZE):
+                    part = rows[start:start + cls.VALUES_UPDATE_SIZE]
+                    cursor.execute(
+                        f'UPDATE {table} SET balance = {table}.balance + v.column3, '
+                        f'version = {table}.version + 1, '
+                        f'last_sequence = {table}.last_sequence + v.column4, updated_at = %s '
+                        f'FROM (VALUES {", ".join(["(%s, %s, %s, %s)"] * len(part))}) AS v '
+                        f'WHERE {table}.user_id = v.column1 AND {table}.category_id = v.column2',
+                        [updated_at] + [value for row in part for value in row]
+                    )
+            else:
+                cursor.executemany(
+                    f'UPDATE {table} SET balance = balance + %s, version = version + 1, '
+                    f'last_sequence = last_sequence + %s, updated_at = %s '
+                    f'WHERE user_id = %s AND category_id = %s',
+                    [(delta, count, updated_at, user_id, category_id) for user_id, category_id, delta, count in rows]
+                )
+    
+    @classmethod
+    def get_summary(cls, user):
+        """カテゴリ別の利用可能残高の辞書を取得"""
         result = {
             'digital_gift': 0,
             'corporate_product': 0,
             'total': 0
         }
         
-        for item in summary:
-            category_name = item['category__name']
-            total = item['total_remaining'] or 0
-            result[category_name] = total
-            result['total'] += total
+        for category_name, balance in cls.remaining_by_category(user=user).items():
+            result[category_name] = balance
+            result['total'] += balance
         
         return result
     
     @classmethod
-    def consume_points(cls, user, category, required_points):
-        """ポイントを消費（FIFO: 有効期限が近い順）"""
-        available_points = cls.objects.filter(
-            user=user,
-            category=category,
-            remaining_amount__gt=0,
-            is_expired=False,
-            expires_at__gt=timezone.now()
-        ).order_by('expires_at')
+    def remaining_by_category(cls, **filters):
+        """
+        カテゴリ名ごとの利用可能残高（filters で対象ユーザーを絞り込む。省略時は全ユーザー）
+        
+        残高テーブルには有効期限を過ぎて失効処理前のポイントも含まれるため、
+        その残数を差し引いて消費処理（available_points）と一致させる。
+        """
+        balances = cls.objects.filter(**filters).values_list('category__name').annotate(
+            total=Sum('balance')
+        ).order_by()
+        # 有効期限切れ・失効処理前のポイント（points_available_idx / points_unexpired_idx の範囲で集計）
+        unswept = dict(
+            Point.objects.filter(
+                remaining_amount__gt=0, is_expired=False, expires_at__lte=timezone.now(), **filters
+            ).order_by().values_list('category__name').annotate(total=Sum('remaining_amount'))
+        )
+        return {
+            category_name: max(balance - unswept.get(category_name, 0), 0)
+            for category_name, balance in balances
+        }
+    
+    @classmethod
+    def rebuild(cls, user_ids=None):
+        """
+        Pointの未失効残高から残高テーブルを再構築
         
-        total_available = sum(point.remaining_amount for point in available_points)
-        if total_available < required_points:
-            raise ValueError('利用可能ポイントが不足しています')
+        残高行をロックしてから同じトランザクション内で集計するため、並行する付与・消費は
+        再構築の前後どちらかに直列化され、集計後にコミットされた更新を上書きしない。
+        """
+        from .cache import invalidate_user_points
         
-        consumed_points = []
-        remaining_required = required_points
+        lots = Point.objects.filter(remaining_amount__gt=0, is_expired=False)
+        balances = cls.objects.all()
+        if user_ids is not None:
+            lots = lots.filter(user_id__in=user_ids)
+            balances = balances.filter(user_id__in=user_ids)
         
-        for point in available_points:
-            if remaining_required <= 0:
-                break
+        with transaction.atomic():
+            # 残高行の無いユーザー・カテゴリは先に作成し、すべての行をロックしてから集計する
+            keys = set(lots.order_by().values_list('user_id', 'category_id').distinct())
+            keys -= set(balances.values_list('user_id', 'category_id'))
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, category_id=category_id) for user_id, category_id in keys],
+                ignore_conflicts=True,
+                batch_size=1000
+            )
+            locked = list(balances.select_for_update())
+            totals = {
+                (row['user_id'], row['category_id']): row['total_remaining']
+                for row in lots.values('user_id', 'category_id').annotate(
+                    total_remaining=Sum('remaining_amount')
+                )
+            }
             
-            consume_amount = min(remaining_required, point.remaining_amount)
-            point.consume(consume_amount)
-            consumed_points.append({
-                'point_id': point.id,
-                'consumed_amount': consume_amount
-            })
-            remaining_required -= consume_amount
+            # 既存行を差し替え（残高0になった行も含む）
+            now = timezone.now()
+            changed = []
+            for balance in locked:
+                new_balance = totals.get((balance.user_id, balance.category_id), 0)
+                if balance.balance != new_balance:
+                    balance.balance = new_balance
+                    balance.version += 1
+                    balance.updated_at = now
+                    changed.append(balance)
+            cls.objects.bulk_update(changed, ['balance', 'version', 'updated_at'], batch_size=1000)
+            invalidate_user_points(balance.user_id for balance in changed)
         
-        return consumed_points
+        return len(changed)
+
+
+class UserSegment(models.Model):
+    """
+    ポイント付与の対象とするユーザーセグメント
+    
+    条件（有効なユーザー・登録日・残高）と取り込んだユーザーIDの一覧を組み合わせて定義する。
+    対象ユーザーは付与の実行時にサーバー側で条件から求める。
+    """
+    name = models.CharField('セグメント名', max_length=100, unique=True)
+    description = models.TextField('説明', blank=True)
+    active_only = models.BooleanField('有効なユーザーのみ', default=True)
+    joined_before = models.DateField('登録日（この日より前）', null=True, blank=True)
+    balance_below = models.PositiveIntegerField(
+        '保有ポイント（この値未満）', null=True, blank=True, help_text='全カテゴリの残高合計で判定'
+    )
+    uses_member_list = models.BooleanField(
+        'IDファイルで限定', default=False, help_text='取り込んだユーザーIDのユーザーに限定する'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_segments',
+        verbose_name='作成者'
+    )
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'ユーザーセグメント'
+        verbose_name_plural = 'ユーザーセグメント'
+        db_table = 'user_segments'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    def get_users(self):
+        """セグメントに該当する一般ユーザー"""
+        from django.contrib.auth import get_user_model
+        from django.db.models import OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        
+        users = get_user_model().objects.filter(is_admin=False)
+        if self.active_only:
+            users = users.filter(is_active=True)
+        if self.joined_before:
+            joined_before = timezone.make_aware(datetime.combine(self.joined_before, datetime.min.time()))
+            users = users.filter(date_joined__lt=joined_before)
+        if self.balance_below is not None:
+            balances = UserPointBalance.objects.filter(user=OuterRef('pk')).values('user').annotate(
+                total=Sum('balance')
+            ).values('total')
+            users = users.annotate(
+                segment_balance=Coalesce(Subquery(balances), 0)
+            ).filter(segment_balance__lt=self.balance_below)
+        if self.uses_member_list:
+            users = users.filter(segment_memberships__segment=self)
+        return users
+    
+    def iter_user_id_chunks(self, chunk_size=1000, after_id=0):
+        """対象ユーザーのIDを主キーのキーセットで chunk_size 件ずつ返す"""
+        users = self.get_users()
+        while True:
+            chunk = list(
+                users.filter(id__gt=after_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            after_id = chunk[-1]
+    
+    def import_members(self, lines, chunk_size=1000):
+        """
+        ユーザーIDの一覧（1行1件、CSVの場合は先頭列）を取り込み、メンバーを置き換える
+        
+        行を順に読みながら chunk_size 件ずつ存在確認・一括INSERTする。
+        (メンバー数, 取り込めなかった行数) を返す。
+        """
+        import csv
+        from django.contrib.auth import get_user_model
+        
+        User = get_user_model()
+        skipped = 0
+        
+        def _flush(user_ids):
+            existing = list(User.objects.filter(id__in=user_ids, is_admin=False).values_list('id', flat=True))
+            UserSegmentMember.objects.bulk_create(
+                [UserSegmentMember(segment=self, user_id=user_id) for user_id in existing],
+                ignore_conflicts=True
+            )
+            # 存在しない（または管理者の）ユーザーID
+            return len(user_ids) - len(existing)
+        
+        with transaction.atomic():
+            self.members.all().delete()
+            pending = set()
+            for row in csv.reader(lines):
+                value = row[0].strip() if row else ''
+                if not value.isdigit():
+                    # 見出し行・空行は数えない
+                    if value and value.lower() not in ('id', 'user_id'):
+                        skipped += 1
+                    continue
+                pending.add(int(value))
+                if len(pending) >= chunk_size:
+                    skipped += _flush(pending)
+                    pending = set()
+            if pending:
+                skipped += _flush(pending)
+            
+            self.uses_member_list = True
+            self.save(update_fields=['uses_member_list', 'updated_at'])
+        
+        return self.members.count(), skipped
+    
+    def enqueue_grant(self, total_points, reason, created_by=None):
+        """セグメント全員への付与をバックグラウンドジョブとして登録"""
+        from jobs.models import Job
+        
+        return Job.enqueue('points.segment_grant', {
+            'segment_id': self.id,
+            'total_points': total_points,
+            'reason': reason,
+            'created_by_id': getattr(created_by, 'id', None),
+        }, created_by=created_by)
+
 
+class UserSegmentMember(models.Model):
+    """IDファイルで取り込んだセグメントのメンバー"""
+    segment = models.ForeignKey(
+        UserSegment,
+        on_delete=models.CASCADE,
+        related_name='members',
+        verbose_name='セグメント'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='segment_memberships',
+        verbose_name='ユーザー'
+    )
+    
+    class Meta:
+        verbose_name = 'セグメントメンバー'
+        verbose_name_plural = 'セグメントメンバー'
+        db_table = 'user_segment_members'
+        constraints = [
+            models.UniqueConstraint(fields=['segment', 'user'], name='unique_segment_member'),
+        ]
+
+
+class SegmentGrantResult(models.Model):
+    """セグメントへの付与ジョブのユーザー別結果"""
+    job = models.ForeignKey(
+        'jobs.Job',
+        on_delete=models.CASCADE,
+        related_name='segment_grant_results',
+        verbose_name='ジョブ'
+    )
+    segment = models.ForeignKey(
+        UserSegment,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='grant_results',
+        verbose_name='セグメント'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='segment_grant_results',
+        verbose_name='ユーザー'
+    )
+    points = models.PositiveIntegerField('付与ポイント数')
+    balance_after = models.PositiveIntegerField('付与後の保有ポイント')
+    created_at = models.DateTimeField('付与日時', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'セグメント付与結果'
+        verbose_name_plural = 'セグメント付与結果'
+        db_table = 'segment_grant_results'
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'user'], name='unique_segment_grant_result'),
+        ]
+
+
+class GrantImport(models.Model):
+    """
+    ポイント付与ファイル（CSV / XLSX）の取り込み
+    
+    取り込みはチャンク単位でコミットし、処理済み行数を同じトランザクションで記録する。
+    中断した場合は次の行から再開する。
+    """
+    STATUS_CHOICES = [
+        ('pending', '待機中'),
+        ('running', '取り込み中'),
+        ('succeeded', '完了'),
+        ('failed', '失敗'),
+    ]
+    
+    file = models.FileField('ファイル', upload_to='grant_imports/')
+    default_reason = models.CharField(
+        '付与理由（既定）', max_length=200, blank=True, help_text='ファイルに reason 列が無い行で使用'
+    )
+    status = models.CharField('状態', max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_processed = models.PositiveIntegerField('処理済み行数', default=0)
+    granted_rows = models.PositiveIntegerField('付与した行数', default=0)
+    granted_points = models.PositiveBigIntegerField('付与ポイント合計', default=0)
+    error_rows = models.PositiveIntegerField('エラー行数', default=0)
+    error_file = models.FileField('エラーファイル', upload_to='grant_imports/errors/', blank=True)
+    message = models.TextField('メッセージ', blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='grant_imports',
+        verbose_name='登録者'
+    )
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    finished_at = models.DateTimeField('終了日時', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'ポイント付与の取り込み'
+        verbose_name_plural = 'ポイント付与の取り込み'
+        db_table = 'grant_imports'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"#{self.id} {self.file.name} ({self.get_status_display()})"
+    
+    def enqueue(self):
+        """取り込みをバックグラウンドジョブとして登録"""
+        from jobs.models import Job
+        
+        return Job.enqueue('points.import_grants', {'import_id': self.id}, created_by=self.created_by)
+
+
+class GrantImportError(models.Model):
+    """取り込めなかった行"""
+    grant_import = models.ForeignKey(
+        GrantImport,
+        on_delete=models.CASCADE,
+        related_name='errors',
+        verbose_name='取り込み'
+    )
+    row_number = models.PositiveIntegerField('行番号')
+    values = models.TextField('内容', blank=True)
+    message = models.CharField('エラー', max_length=200)
+    
+    class Meta:
+        verbose_name = '取り込みエラー'
+        verbose_name_plural = '取り込みエラー'
+        db_table = 'grant_import_errors'
+        ordering = ['row_number']
+        indexes = [
+            models.Index(fields=['grant_import', 'row_number']),
+        ]
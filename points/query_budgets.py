@@ -0,0 +1,184 @@
+"""
+全URLのクエリ数の計測（manage.py check_query_budgets・points.tests から利用）
+
+データ量の異なる2種類の合成データで points / products / accounts の全URLを表示し、
+URL名ごとのクエリ数を返す。データ量に応じてクエリ数が増えるビューは N+1 の疑いがある。
+テンプレートが未作成のビューは、代わりに表示内容（QuerySet・モデルの各行の文字列表現）を
+評価するテンプレートで計測する。
+"""
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from django.template import TemplateDoesNotExist
+from django.template.backends.base import BaseEngine
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+import accounts.urls
+import points.urls
+import products.urls
+from accounts.models import User
+from incentive_system.middleware import QueryCounter
+from jobs.models import Job
+from .benchmark import BenchmarkDataset, client_host
+from .models import Point, SegmentGrantResult
+
+URL_MODULES = (points.urls, products.urls, accounts.urls)
+
+# データ量の異なる2種類の合成データ（1ページの表示件数を下回る量と上回る量）
+DATASET_SIZES = {
+    'small': {
+        'users': 5, 'lots_per_user': 3, 'products': 5,
+        'transactions_per_user': 5, 'exchanges_per_user': 2, 'history_rows': 10,
+    },
+    'large': {
+        'users': 40, 'lots_per_user': 30, 'products': 40,
+        'transactions_per_user': 60, 'exchanges_per_user': 20, 'history_rows': 300,
+    },
+}
+
+
+class Skipped(str):
+    """計測できなかった理由"""
+
+
+# 代わりのテンプレートで計測したテンプレート名
+fallback_templates = set()
+
+
+class ContextEvaluatingEngine(BaseEngine):
+    """未作成のテンプレートの代わりに、表示内容を評価するだけのテンプレートを返すエンジン"""
+
+    def __init__(self, params):
+        params = params.copy()
+        params.pop('OPTIONS', None)
+        super().__init__(params)
+
+    def from_string(self, template_code):
+        return ContextEvaluatingTemplate()
+
+    def get_template(self, template_name):
+        fallback_templates.add(template_name)
+        return ContextEvaluatingTemplate()
+
+
+class ContextEvaluatingTemplate:
+    def render(self, context=None, request=None):
+        for value in (context or {}).values():
+            _evaluate(value)
+        return ''
+
+
+def _evaluate(value, depth=0):
+    """QuerySet・リスト・辞書を読み出し、モデルは文字列表現（関連の参照を含む）を評価する"""
+    if depth > 2 or isinstance(value, (str, bytes)):
+        return
+    if isinstance(value, Model):
+        str(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _evaluate(item, depth + 1)
+    elif hasattr(value, '__iter__'):
+        for item in value:
+            _evaluate(item, depth + 1)
+
+
+FALLBACK_TEMPLATES = {
+    'BACKEND': 'points.query_budgets.ContextEvaluatingEngine',
+    'NAME': 'query_budgets_fallback',
+    'DIRS': [],
+    'APP_DIRS': False,
+    'OPTIONS': {},
+}
+
+
+def measure_sizes(prefix='qbudget_', seed=42, on_size=None):
+    """データ量ごとに全URLのクエリ数を計測（{データ量: {URL名: クエリ数 または Skipped}}）"""
+    counts = {}
+    for size, params in DATASET_SIZES.items():
+        if on_size:
+            on_size(size)
+        dataset = BenchmarkDataset(prefix=prefix, seed=seed, **params)
+        if dataset.user_queryset().exists():
+            dataset.cleanup()
+        try:
+            counts[size] = measure_all(dataset)
+        finally:
+            dataset.cleanup()
+    return counts
+
+
+def measure_all(dataset):
+    """合成データを投入して全URLのクエリ数を計測"""
+    user_ids = dataset.create()
+    user = User.objects.get(id=user_ids[0])
+    admin = User.objects.create(
+        username=f'{dataset.prefix}admin',
+        email=f'{dataset.prefix}admin@bench.invalid',
+        full_name='ベンチマーク管理者',
+        is_admin=True,
+    )
+    # 交換処理がポイント不足で別の分岐に入らないよう、十分なポイントを付与しておく
+    Point.grant_points(user, 100000, 'クエリ数確認用')
+
+    product = dataset.product_queryset().order_by('required_points', 'id').first()
+    exchange = user.product_exchanges.filter(status='pending').first() or user.product_exchanges.first()
+    # セグメント付与の結果CSV用に、全ユーザー分の結果を持つジョブを用意する
+    job = Job.objects.create(name='points.segment_grant', status='succeeded', created_by=admin)
+    SegmentGrantResult.objects.bulk_create([
+        SegmentGrantResult(job=job, user_id=user_id, points=100, balance_after=100) for user_id in user_ids
+    ])
+    url_kwargs = {'user_id': user.id, 'product_id': product.id, 'exchange_id': exchange.id, 'job_id': job.id}
+    post_data = {'user_id': user.id, 'product_id': product.id, 'status': 'processing'}
+
+    counts = {}
+    # ダッシュボードのキャッシュが効くとテンプレート内のクエリを計測できないため無効にする
+    try:
+        with override_settings(DASHBOARD_CACHE_TTL=0, TEMPLATES=[*settings.TEMPLATES, FALLBACK_TEMPLATES]):
+            for module in URL_MODULES:
+                for pattern in module.urlpatterns:
+                    kwargs = {key: url_kwargs[key] for key in pattern.pattern.converters}
+                    url = reverse(pattern.name, kwargs=kwargs)
+                    route = str(pattern.pattern)
+                    as_user = admin if route.startswith('manage/') or 'admin/' in route else user
+                    counts[pattern.name] = measure_url(pattern.name, url, as_user, post_data)
+    finally:
+        job.delete()
+    return counts
+
+
+def measure_url(name, url, user, post_data):
+    """
+    1つのURLを表示してクエリ数を返す（GETが許可されない場合はPOSTで計測）
+
+    別のURLとして解決される・エラーを返す場合は RuntimeError。
+    """
+    for method in ('get', 'post'):
+        client = Client(HTTP_HOST=client_host())
+        client.force_login(user)
+        counter = QueryCounter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                if method == 'get':
+                    response = client.get(url)
+                else:
+                    response = client.post(url, post_data)
+                # ストリーミングのレスポンスは読み出すときにクエリを実行する
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        except TemplateDoesNotExist as e:
+            return Skipped(f'テンプレート {e} がありません')
+
+        if response.status_code == 405 and method == 'get':
+            continue
+        if response.resolver_match is None or response.resolver_match.url_name != name:
+            raise RuntimeError(f'{name} ({url}) が別のURLとして解決されます')
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name} ({url}) が {response.status_code} を返しました')
+        return counter.count
+    return Skipped('GET / POST いずれも許可されていません')
@@ -0,0 +1,73 @@
+"""
+主要なクエリの実行計画の確認（manage.py check_query_plans・points.tests から利用）
+
+合成データを投入し、ポイント消費・失効処理・交換履歴などの主要なクエリの実行計画（EXPLAIN）に
+想定したインデックスが含まれるかを返す。
+"""
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from accounts.models import User
+from .benchmark import BenchmarkDataset
+from .models import Point, PointCategory
+
+# 合成データの量（ユーザー数は引数で指定）
+DATASET_PARAMS = {
+    'lots_per_user': 20, 'products': 10, 'transactions_per_user': 5,
+    'exchanges_per_user': 20, 'history_rows': 10,
+}
+
+
+def hot_queries(user, category):
+    """確認するクエリと、使われるべきインデックス"""
+    from products.models import ProductExchange
+
+    now = timezone.now()
+    available = Point.objects.available_points(user=user, category=category)
+    return [
+        ('利用可能ポイントの集計', 'points_available_idx',
+         available.values('category').annotate(total=Sum('remaining_amount'))),
+        ('FIFO消費の走査', 'points_available_idx',
+         available.order_by('expires_at', 'id').values_list('id', 'remaining_amount', 'expires_at')[:50]),
+        ('失効処理の走査', 'points_unexpired_idx',
+         Point.objects.filter(is_expired=False, expires_at__lte=now)
+         .order_by('expires_at', 'id').values_list('id', 'expires_at')[:5000]),
+        ('交換履歴（ユーザー別）', 'exchanges_user_date_idx',
+         ProductExchange.objects.filter(user=user).order_by('-exchange_date', '-id')[:21]),
+        ('交換一覧（状態別）', 'product_exc_status_2df876_idx',
+         ProductExchange.objects.filter(status='pending').order_by('-exchange_date', '-id')[:21]),
+    ]
+
+
+@contextmanager
+def prefer_indexes():
+    """PostgreSQL では件数の少ない合成データでも索引が選ばれるよう、シーケンシャルスキャンを抑止する"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        yield
+
+
+def explain_plans(user):
+    """主要なクエリの実行計画を取得（[(説明, インデックス名, 実行計画)]）"""
+    plans = []
+    for label, index_name, queryset in hot_queries(user, PointCategory.get_digital_category()):
+        with prefer_indexes():
+            plans.append((label, index_name, queryset.explain()))
+    return plans
+
+
+def check_plans(prefix='qplan_', users=200, seed=42):
+    """合成データを投入して主要なクエリの実行計画を取得（合成データは終了時に削除）"""
+    dataset = BenchmarkDataset(prefix=prefix, users=users, seed=seed, **DATASET_PARAMS)
+    if dataset.user_queryset().exists():
+        dataset.cleanup()
+    try:
+        user_ids = dataset.create()
+        return explain_plans(User.objects.get(id=user_ids[0]))
+    finally:
+        dataset.cleanup()
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import category_cache
+from .models import PointCategory
+
+
+@receiver(post_save, sender=PointCategory)
+@receiver(post_delete, sender=PointCategory)
+def invalidate_category_cache(sender, **kwargs):
+    """カテゴリ更新時にキャッシュを無効化（コミット後にも再度無効化）"""
+    category_cache.invalidate()
+    transaction.on_commit(category_cache.invalidate)
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from accounts.models import User
+from jobs.registry import register
+from .imports import run_import
+from .models import GrantImport, Point, SegmentGrantResult, UserPointBalance, UserSegment
+
+
+@register('points.bulk_grant')
+def bulk_grant(job, user_ids, total_points, reason, created_by_id=None, chunk_size=1000):
+    """
+    一括ポイント付与
+    
+    チャンクごとに付与と進捗の記録を同じトランザクションで行うため、
+    中断・再試行した場合は付与済みのユーザーを飛ばして続きから再開する。
+    """
+    created_by = User.objects.filter(id=created_by_id).first() if created_by_id else None
+    user_ids = sorted(set(user_ids))
+    done = job.progress_current
+    job.set_progress(done, total=len(user_ids), message='付与中')
+    
+    while done < len(user_ids):
+        chunk = user_ids[done:done + chunk_size]
+        with transaction.atomic():
+            Point.bulk_grant(chunk, total_points, reason, created_by=created_by, chunk_size=chunk_size)
+            done += len(chunk)
+            job.set_progress(done, message=f'{done}名に付与済み')
+    
+    return {'granted_users': len(user_ids), 'total_points': total_points}
+
+
+@register('points.segment_grant')
+def segment_grant(job, segment_id, total_points, reason, created_by_id=None, chunk_size=1000):
+    """
+    セグメントへのポイント付与
+    
+    対象ユーザーを主キー順に chunk_size 件ずつ求めながら付与し、
+    付与・ユーザー別結果・進捗の記録をチャンクごとに同じトランザクションで行う。
+    再試行した場合は結果を記録済みの最後のユーザーの次から再開する。
+    """
+    segment = UserSegment.objects.get(id=segment_id)
+    created_by = User.objects.filter(id=created_by_id).first() if created_by_id else None
+    
+    results = SegmentGrantResult.objects.filter(job=job)
+    last_user_id = results.aggregate(last=Max('user_id'))['last'] or 0
+    done = results.count()
+    if job.progress_total is None:
+        job.set_progress(done, total=segment.get_users().count(), message='付与中')
+    
+    for chunk in segment.iter_user_id_chunks(chunk_size=chunk_size, after_id=last_user_id):
+        with transaction.atomic():
+            Point.bulk_grant(chunk, total_points, reason, created_by=created_by, chunk_size=chunk_size)
+            balances = dict(
+                UserPointBalance.objects.filter(user_id__in=chunk).values('user_id').annotate(
+                    total=Sum('balance')
+                ).values_list('user_id', 'total')
+            )
+            SegmentGrantResult.objects.bulk_create([
+                SegmentGrantResult(
+                    job=job,
+                    segment=segment,
+                    user_id=user_id,
+                    points=total_points,
+                    balance_after=balances.get(user_id, 0),
+                )
+                for user_id in chunk
+            ])
+            done += len(chunk)
+            job.set_progress(done, message=f'{done}名に付与済み')
+    
+    return {'segment': segment.name, 'granted_users': done, 'total_points': total_points}
+
+
+@register('points.import_grants')
+def import_grants(job, import_id, chunk_size=None):
+    """ポイント付与ファイルの取り込み（再試行した場合は処理済みの行の次から再開する）"""
+    grant_import = run_import(
+        GrantImport.objects.get(id=import_id),
+        chunk_size=chunk_size,
+        on_progress=lambda grant_import: job.set_progress(
+            grant_import.rows_processed, message=f'{grant_import.rows_processed}行を処理済み'
+        ),
+    )
+    if grant_import.status == 'failed':
+        raise ValueError(grant_import.message)
+    return {
+        'granted_rows': grant_import.granted_rows,
+        'granted_points': grant_import.granted_points,
+        'error_rows': grant_import.error_rows,
+    }
+
+
+@register('points.expire_points')
+def expire_points(job, batch_size=5000):
+    """期限切れポイントの失効処理"""
+    output = StringIO()
+    call_command('expire_points', batch_size=batch_size, stdout=output)
+    return {'output': output.getvalue()}
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from points.cache import category_cache
+from points.models import Point, PointCategory, UserPointBalance
+
+
+class PointsSummaryTests(TestCase):
+    """残高（get_user_points_summary）と消費処理の整合性"""
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        self.digital = PointCategory.get_digital_category()
+        Point.grant_points(self.user, 1000, '付与1')  # デジタル 600 / 企業 400
+        Point.grant_points(self.user, 500, '付与2')   # デジタル 300 / 企業 200
+
+    def test_summary_excludes_expired_lots_before_sweep(self):
+        """有効期限を過ぎて失効処理前のポイントは残高に含めない"""
+        lot = Point.objects.filter(user=self.user, category=self.digital, reason='付与1').get()
+        Point.objects.filter(id=lot.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        # 残高テーブルは失効処理まで変わらない
+        self.assertEqual(UserPointBalance.objects.get(user=self.user, category=self.digital).balance, 900)
+
+        summary = Point.get_user_points_summary(self.user)
+        self.assertEqual(summary['digital_gift'], 300)
+        self.assertEqual(summary['corporate_product'], 600)
+        self.assertEqual(summary['total'], 900)
+
+        available = sum(Point.objects.available_points(user=self.user, category=self.digital).values_list(
+            'remaining_amount', flat=True
+        ))
+        self.assertEqual(summary['digital_gift'], available)
+        with self.assertRaises(ValueError):
+            Point.consume_points(self.user, self.digital, 301)
+        Point.consume_points(self.user, self.digital, 300)
+        self.assertEqual(Point.get_user_points_summary(self.user)['digital_gift'], 0)
+
+    def test_summary_after_sweep(self):
+        """失効処理の後も残高は変わらない"""
+        Point.objects.filter(user=self.user, reason='付与1').update(expires_at=timezone.now() - timedelta(minutes=1))
+        before = Point.get_user_points_summary(self.user)
+        Point.expire_points(Point.objects.filter(user=self.user, reason='付与1'))
+        self.assertEqual(Point.get_user_points_summary(self.user), before)
+        self.assertEqual(before, {'digital_gift': 300, 'corporate_product': 200, 'total': 500})
+
+    def test_admin_dashboard_remaining_matches_summary(self):
+        """管理者ダッシュボードの残高も失効処理前のポイントを含めない"""
+        from points.views import _get_admin_dashboard_context
+
+        Point.objects.filter(user=self.user, reason='付与1').update(expires_at=timezone.now() - timedelta(minutes=1))
+        today = timezone.localdate()
+        context = _get_admin_dashboard_context(today, today)
+        summary = Point.get_user_points_summary(self.user)
+        self.assertEqual(context['total_points_remaining'], summary['total'])
+        self.assertEqual(
+            {row['category__name']: row['total_remaining'] for row in context['category_stats']},
+            {'digital_gift': summary['digital_gift'], 'corporate_product': summary['corporate_product']},
+        )
+
+
+class RebuildBalancesTests(TestCase):
+    """残高テーブルの再構築"""
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        self.digital = PointCategory.get_digital_category()
+        Point.grant_points(self.user, 1000, '付与')  # デジタル 600 / 企業 400
+
+    def test_rebuild_fixes_drifted_and_missing_rows(self):
+        UserPointBalance.objects.filter(user=self.user, category=self.digital).update(balance=1)
+        UserPointBalance.objects.filter(user=self.user).exclude(category=self.digital).delete()
+
+        self.assertEqual(UserPointBalance.rebuild(user_ids=[self.user.id]), 2)
+        self.assertEqual(
+            dict(UserPointBalance.objects.filter(user=self.user).values_list('category__name', 'balance')),
+            {'digital_gift': 600, 'corporate_product': 400},
+        )
+        # 差分が無ければ更新しない
+        self.assertEqual(UserPointBalance.rebuild(user_ids=[self.user.id]), 0)
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from points.cache import category_cache
+from points.models import Point
+from points.views import _get_admin_dashboard_context
+from transactions.models import DailyPointStats
+
+
+class DashboardCacheTests(TestCase):
+    """ダッシュボードのキャッシュ・ETag は共有キャッシュがある場合のみ使う"""
+
+    def setUp(self):
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_etag_with_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with override_settings(CACHES=caches):
+            etag = self.client.get('/')['ETag']
+            self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Point.grant_points(self.user, 100, '付与')
+            response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_no_etag_with_local_cache(self):
+        cache.clear()
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class AdminDashboardStatsTests(TestCase):
+    """管理者ダッシュボードの集計に当日分（日次集計の作成前）を含める"""
+
+    def setUp(self):
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        Point.grant_points(self.user, 1000, '付与')
+
+    def test_today_is_counted_before_and_after_rollup(self):
+        today = timezone.localdate()
+        for rollup in (False, True):
+            with self.subTest(rollup=rollup):
+                if rollup:
+                    DailyPointStats.rollup(today, today)
+                context = _get_admin_dashboard_context(today - timedelta(days=6), today)
+                self.assertEqual(context['total_points_granted'], 1000)
+                self.assertEqual(sum(row['total_granted'] for row in context['category_stats']), 1000)
+                self.assertEqual(sum(stats.granted for stats in context['daily_stats']), 1000)
@@ -0,0 +1,83 @@
+import base64
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from accounts.models import User
+from incentive_system.pagination import CursorPaginator, InvalidCursor
+from points.cache import category_cache
+from points.models import Point
+from transactions.models import PointTransaction
+
+
+def make_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class PointHistoryPaginationTests(TestCase):
+    """ポイント履歴 API のカーソルページネーション"""
+
+    def setUp(self):
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        for index in range(25):
+            Point.grant_points(self.user, 100 + index, f'付与{index}')  # 1回の付与で取引履歴が2件
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('point_history_api')
+
+    def _get(self, cursor=None):
+        response = self.client.get(self.url, {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_and_prev_round_trip(self):
+        expected = list(
+            PointTransaction.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        pages = []
+        data = self._get()
+        self.assertIsNone(data['previous_cursor'])
+        while True:
+            pages.append([row['id'] for row in data['transactions']])
+            if not data['next_cursor']:
+                break
+            data = self._get(data['next_cursor'])
+        self.assertEqual([len(page) for page in pages], [20, 20, 10])
+        self.assertEqual([row_id for page in pages for row_id in page], expected)
+
+        # 最後のページから前のページへ戻る
+        for page in reversed(pages[:-1]):
+            data = self._get(data['previous_cursor'])
+            self.assertEqual([row['id'] for row in data['transactions']], page)
+        self.assertIsNone(data['previous_cursor'])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        first_page = [row['id'] for row in self._get()['transactions']]
+        tampered = [
+            'not-base64!',
+            make_cursor(['next', 5]),
+            make_cursor(['next', ['2024-01-01T00:00:00+00:00', 'abc']]),
+            make_cursor(['next', [{'a': 1}, 1]]),
+            make_cursor(['next', ['not a date', 1]]),
+            make_cursor(['next', [None, 1]]),
+            make_cursor(['sideways', ['2024-01-01T00:00:00+00:00', 1]]),
+            make_cursor(['next', ['2024-01-01T00:00:00+00:00']]),
+            make_cursor({'next': 1}),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertEqual([row['id'] for row in self._get(cursor)['transactions']], first_page)
+
+        history_page = self.client.get(reverse('point_history'), {'cursor': tampered[2]})
+        self.assertEqual(history_page.status_code, 200)
+
+    def test_decode_cursor_converts_field_types(self):
+        paginator = CursorPaginator(PointTransaction.objects.all(), ('-created_at', '-id'))
+        direction, values = paginator.decode_cursor(make_cursor(['prev', ['2024-01-01T00:00:00+00:00', '7']]))
+        self.assertEqual(direction, 'prev')
+        self.assertEqual(values[0].isoformat(), '2024-01-01T00:00:00+00:00')
+        self.assertEqual(values[1], 7)
+        with self.assertRaises(InvalidCursor):
+            paginator.decode_cursor(make_cursor(['next', [{'a': 1}, 1]]))
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db.models import Count, Max, Sum
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from points.cache import category_cache
+from points.imports import run_import
+from points.models import GrantImport, Point, UserPointBalance
+from transactions.models import PointTransaction
+
+
+class GrantImportTests(TestCase):
+    """ポイント付与ファイルの取り込み"""
+
+    def setUp(self):
+        category_cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.users = [
+            User.objects.create(username=f'member{index}', email=f'member{index}@example.com', full_name='会員')
+            for index in range(3)
+        ]
+
+    def _import(self, content, chunk_size):
+        grant_import = GrantImport(default_reason='売上実績')
+        grant_import.file.save('grants.csv', ContentFile(content.encode()), save=False)
+        grant_import.save()
+        return run_import(grant_import, chunk_size=chunk_size)
+
+    def test_ledger_matches_lots_and_balances(self):
+        lines = ['username,points'] + [f'member{index % 3},{100 + index}' for index in range(10)] + ['unknown,100']
+        grant_import = self._import('\n'.join(lines) + '\n', chunk_size=4)
+
+        self.assertEqual(grant_import.status, 'succeeded')
+        self.assertEqual((grant_import.granted_rows, grant_import.error_rows), (10, 1))
+        self.assertEqual(grant_import.granted_points, sum(100 + index for index in range(10)))
+
+        # 取引履歴はそれぞれのポイントを参照し、金額が一致する
+        ledger = PointTransaction.objects.filter(transaction_type='grant')
+        self.assertEqual(ledger.count(), Point.objects.count())
+        for transaction in ledger:
+            point = Point.objects.get(id=transaction.related_point_id)
+            self.assertEqual((transaction.user_id, transaction.category_id, transaction.amount),
+                             (point.user_id, point.category_id, point.amount))
+
+        # ユーザー・カテゴリごとに連番に欠番が無く、最後の取引後残高が残高テーブルと一致する
+        for row in ledger.values('user_id', 'category_id').annotate(rows=Count('id'), last=Max('sequence')):
+            self.assertEqual(row['rows'], row['last'])
+            balance = UserPointBalance.objects.get(user_id=row['user_id'], category_id=row['category_id'])
+            last = ledger.get(user_id=row['user_id'], category_id=row['category_id'], sequence=row['last'])
+            self.assertEqual(last.balance_after, balance.balance)
+        self.assertEqual(
+            Point.objects.aggregate(Sum('remaining_amount'))['remaining_amount__sum'],
+            UserPointBalance.objects.aggregate(Sum('balance'))['balance__sum'],
+        )
+        # 有効期限の比較（日時の保存形式）が ORM と一致する
+        self.assertEqual(Point.objects.available_points(user=self.users[0]).count(),
+                         Point.objects.filter(user=self.users[0]).count())
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from points.cache import category_cache
+from points.query_budgets import Skipped, measure_sizes
+
+
+class QueryBudgetTests(TestCase):
+    """全URLのクエリ数がデータ量に応じて増えないこと（N+1 の検出）"""
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+
+    def test_query_counts_do_not_grow_with_data(self):
+        counts = measure_sizes()
+        small, large = counts['small'], counts['large']
+        for name, count in small.items():
+            with self.subTest(url=name):
+                # 管理者用のビューも含め、すべてのURLを計測できていること
+                self.assertNotIsInstance(count, Skipped)
+                self.assertLessEqual(large[name], count)
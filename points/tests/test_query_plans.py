@@ -0,0 +1,20 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from points.cache import category_cache
+from points.query_plans import check_plans
+
+
+class QueryPlanTests(TestCase):
+    """主要なクエリで想定したインデックスが使われること"""
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+
+    def test_hot_queries_use_expected_indexes(self):
+        plans = check_plans(users=50)
+        self.assertTrue(plans)
+        for label, index_name, plan in plans:
+            with self.subTest(query=label):
+                self.assertIn(index_name, plan)
@@ -0,0 +1,105 @@
+from contextlib import ExitStack
+
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from incentive_system.routers import REPLICA_ALIAS, enable_replica, end_request, start_request
+from points.cache import category_cache
+from points.models import Point, PointCategory
+from products.models import Product
+
+
+class QueryLog:
+    """connection.execute_wrapper に渡して発行された SQL を記録する"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+# TestCase ではトランザクション内のデータがレプリカ（別接続）から見えないため TransactionTestCase を使う
+@override_settings(DATABASE_REPLICA_VIEWS=['point_history', 'exchange_history'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """読み取りレプリカへのルーティング（レプリカはテスト用 DB のミラー）"""
+
+    databases = {'default', REPLICA_ALIAS}
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        Point.grant_points(self.user, 1000, '付与')
+        self.product = Product.objects.create(
+            category=PointCategory.get_digital_category(), name='商品', required_points=100
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _request(self, method, url):
+        """リクエストを送り、(応答, プライマリの SQL, レプリカの SQL) を返す"""
+        logs = {alias: QueryLog() for alias in ('default', REPLICA_ALIAS)}
+        with ExitStack() as stack:
+            for alias, log in logs.items():
+                stack.enter_context(connections[alias].execute_wrapper(log))
+            response = getattr(self.client, method)(url)
+        return response, logs['default'].queries, logs[REPLICA_ALIAS].queries
+
+    def test_history_views_read_from_replica(self):
+        for name in ('point_history', 'exchange_history'):
+            with self.subTest(url=name):
+                response, _, replica_queries = self._request('get', reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(replica_queries)
+                self.assertNotIn('db_primary', response.cookies)
+
+        # 対象外の画面はプライマリから読む
+        _, _, replica_queries = self._request('get', reverse('dashboard'))
+        self.assertEqual(replica_queries, [])
+
+    def test_reads_stay_on_primary_after_write(self):
+        response, primary_queries, replica_queries = self._request(
+            'post', reverse('exchange_product', args=[self.product.id])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(replica_queries, [])
+        self.assertIn('db_primary', response.cookies)
+
+        # Cookie がある間は書き込み直後の内容をプライマリから読む
+        response, _, replica_queries = self._request('get', reverse('exchange_history'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica_queries, [])
+
+        del self.client.cookies['db_primary']
+        _, _, replica_queries = self._request('get', reverse('exchange_history'))
+        self.assertTrue(replica_queries)
+
+    def test_auth_and_session_models_stay_on_primary(self):
+        _, _, replica_queries = self._request('get', reverse('point_history'))
+        self.assertTrue(replica_queries)
+        for sql in replica_queries:
+            self.assertNotIn('"users"', sql)
+            self.assertNotIn('"django_session"', sql)
+
+        tokens = start_request()
+        try:
+            enable_replica()
+            self.assertEqual(router.db_for_read(Point), REPLICA_ALIAS)
+            for model in (User, Session, Permission):
+                with self.subTest(model=model.__name__):
+                    self.assertEqual(router.db_for_read(model), 'default')
+        finally:
+            end_request(tokens)
+
+    def test_replica_is_never_migrated(self):
+        for app_label in ('points', 'products', 'transactions', 'accounts', 'sessions'):
+            with self.subTest(app_label=app_label):
+                self.assertFalse(router.allow_migrate(REPLICA_ALIAS, app_label))
+                self.assertTrue(router.allow_migrate('default', app_label))
@@ -6,12 +6,14 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('history/', views.point_history, name='point_history'),
     
-    # 管理者用
-    path('admin/', views.admin_dashboard, name='admin_dashboard'),
-    path('admin/grant/', views.grant_points, name='grant_points'),
-    path('admin/bulk-grant/', views.bulk_grant_points, name='bulk_grant_points'),
-    path('admin/user/<int:user_id>/', views.user_points_detail, name='user_points_detail'),
+    # 管理者用（admin/ は Django 管理画面の URL と重なるため manage/ に置く）
+    path('manage/', views.admin_dashboard, name='admin_dashboard'),
+    path('manage/grant/', views.grant_points, name='grant_points'),
+    path('manage/bulk-grant/', views.bulk_grant_points, name='bulk_grant_points'),
+    path('manage/segment-grants/<int:job_id>/report/', views.segment_grant_report, name='segment_grant_report'),
+    path('manage/user/<int:user_id>/', views.user_points_detail, name='user_points_detail'),
     
     # AJAX API
     path('api/user-points/', views.get_user_points_ajax, name='get_user_points_ajax'),
+    path('api/history/', views.point_history_api, name='point_history_api'),
 ]
@@ -3,11 +3,18 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Q
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from .models import Point, PointCategory
+from incentive_system.pagination import CursorPaginator
+from .cache import get_user_points_version, is_shared_cache
+from .models import Point, PointCategory, UserSegment
 from accounts.models import User
 
 
@@ -16,33 +23,68 @@ def is_admin(user):
     return user.is_authenticated and user.is_admin
 
 
+def _has_pending_messages(request):
+    """未表示のメッセージがあるかどうか"""
+    return len(messages.get_messages(request)) > 0
+
+
 @login_required
 def dashboard(request):
     """ダッシュボード画面"""
     user = request.user
     
+    # 共有キャッシュが無い場合、残高の更新が他のプロセスに伝わらないためキャッシュ・ETag を使わない
+    if not is_shared_cache():
+        return render(request, 'points/dashboard.html', _get_dashboard_context(user))
+    
+    # 残高の更新ごとに変わるバージョンと日付（期限間近の判定用）でキャッシュを区別
+    version = get_user_points_version(user.pk)
+    today = timezone.localdate()
+    etag = f'"dashboard-{user.pk}-{version}-{today:%Y%m%d}"'
+    
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')) and not _has_pending_messages(request):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    cache_key = f'points:dashboard:{user.pk}:{version}:{today:%Y%m%d}'
+    context = cache.get(cache_key)
+    if context is None:
+        context = _get_dashboard_context(user)
+        cache.set(cache_key, context, getattr(settings, 'DASHBOARD_CACHE_TTL', 3600))
+    
+    response = render(request, 'points/dashboard.html', context)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _get_dashboard_context(user):
+    """ダッシュボードの表示内容"""
     # ユーザーのポイント残高を取得
     points_summary = Point.get_user_points_summary(user)
     
     # 最近のポイント履歴（最新10件）
-    recent_points = Point.objects.filter(user=user).order_by('-issued_at')[:10]
+    recent_points = list(
+        Point.objects.filter(user=user).select_related('category').order_by('-issued_at')[:10]
+    )
     
     # 期限間近のポイント（30日以内）
-    expiring_points = Point.objects.expiring_soon(days=30).filter(user=user)
+    expiring_points = list(
+        Point.objects.expiring_soon(days=30).filter(user=user).select_related('category')
+    )
     
-    context = {
+    return {
         'points_summary': points_summary,
         'recent_points': recent_points,
         'expiring_points': expiring_points,
-        'expiring_count': expiring_points.count(),
+        'expiring_count': len(expiring_points),
     }
-    
-    return render(request, 'points/dashboard.html', context)
 
 
-@login_required
-def point_history(request):
-    """ポイント履歴画面"""
+def _get_point_history_page(request):
+    """ポイント履歴の1ページ分を取得（カーソルページネーション）"""
     user = request.user
     
     # フィルタリング
@@ -52,7 +94,7 @@ def point_history(request):
     # 取引履歴を取得
     try:
         from transactions.models import PointTransaction
-        transactions_query = PointTransaction.objects.filter(user=user).order_by('-created_at')
+        transactions_query = PointTransaction.objects.filter(user=user).select_related('category')
         
         if category_filter:
             transactions_query = transactions_query.filter(category__name=category_filter)
@@ -61,23 +103,27 @@ def point_history(request):
             transactions_query = transactions_query.filter(transaction_type=transaction_type_filter)
         
         # ページネーション
-        paginator = Paginator(transactions_query, 20)
-        page_number = request.GET.get('page')
-        transactions = paginator.get_page(page_number)
+        paginator = CursorPaginator(transactions_query, ('-created_at', '-id'), per_page=20)
         
     except ImportError:
         # transactionsアプリがない場合は従来の方式
-        points_query = Point.objects.filter(user=user).order_by('-issued_at')
+        points_query = Point.objects.filter(user=user).select_related('category')
         
         if category_filter:
             points_query = points_query.filter(category__name=category_filter)
         
-        paginator = Paginator(points_query, 20)
-        page_number = request.GET.get('page')
-        transactions = paginator.get_page(page_number)
+        paginator = CursorPaginator(points_query, ('-issued_at', '-id'), per_page=20)
+    
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@login_required
+def point_history(request):
+    """ポイント履歴画面"""
+    transactions = _get_point_history_page(request)
     
     # カテゴリ一覧（フィルタ用）
-    categories = PointCategory.objects.filter(is_active=True)
+    categories = PointCategory.get_active_categories()
     
     # 取引種別一覧
     transaction_types = [
@@ -85,43 +131,125 @@ def point_history(request):
         ('exchange', '商品交換'),
         ('expire', 'ポイント失効'),
         ('adjustment', '調整'),
+        ('refund', '交換キャンセル返還'),
     ]
     
     context = {
         'transactions': transactions,
         'categories': categories,
         'transaction_types': transaction_types,
-        'current_category': category_filter,
-        'current_transaction_type': transaction_type_filter,
+        'current_category': request.GET.get('category'),
+        'current_transaction_type': request.GET.get('transaction_type'),
     }
     
     return render(request, 'points/history.html', context)
 
 
-@user_passes_test(is_admin)
-def admin_dashboard(request):
-    """管理者ダッシュボード"""
+@login_required
+def point_history_api(request):
+    """API: ポイント履歴を取得（カーソルページネーション）"""
+    transactions = _get_point_history_page(request)
+    
+    return JsonResponse({
+        'success': True,
+        'transactions': [
+            {
+                'id': transaction.id,
+                'transaction_type': transaction.transaction_type,
+                'category': transaction.category.name,
+                'amount': transaction.amount,
+                'balance_after': transaction.balance_after,
+                'reason': transaction.reason,
+                'created_at': transaction.created_at.isoformat(),
+            }
+            for transaction in transactions
+        ],
+        'next_cursor': transactions.next_cursor,
+        'previous_cursor': transactions.previous_cursor,
+    })
+
+
+def _get_admin_dashboard_context(date_from, date_to):
+    """
+    管理者ダッシュボードの表示内容を取得（日次集計・残高テーブルのみ参照）
+    
+    当日分は日次集計が未作成・途中の場合があるため、当日の取引履歴から集計して加える。
+    """
+    from transactions.models import DailyPointStats
+    from .cache import category_cache
+    from .models import UserPointBalance
+    
+    today = timezone.localdate()
+    rolled_up = DailyPointStats.objects.filter(date__lt=today)
+    today_stats = DailyPointStats.aggregate(today, today)
+    for stats in today_stats:
+        stats.category = category_cache.get_by_id(stats.category_id)
+    
     # 全体統計
     total_users = User.objects.filter(is_admin=False).count()
-    total_points_granted = Point.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    total_points_remaining = Point.objects.aggregate(Sum('remaining_amount'))['remaining_amount__sum'] or 0
+    total_points_granted = (
+        (rolled_up.aggregate(Sum('granted'))['granted__sum'] or 0)
+        + sum(stats.granted for stats in today_stats)
+    )
+    # 残高（有効期限を過ぎて失効処理前のポイントを除く。ユーザーの残高表示と同じ定義）
+    remaining_by_category = UserPointBalance.remaining_by_category()
+    total_points_remaining = sum(remaining_by_category.values())
     
     # カテゴリ別統計
-    category_stats = Point.objects.values('category__name').annotate(
-        total_granted=Sum('amount'),
-        total_remaining=Sum('remaining_amount')
-    ).order_by('category__name')
+    totals_by_category = {
+        row['category__name']: row
+        for row in rolled_up.values('category__name').annotate(
+            total_granted=Sum('granted'),
+            total_consumed=Sum('consumed'),
+            total_expired=Sum('expired'),
+            total_refunded=Sum('refunded'),
+        ).order_by()
+    }
+    for stats in today_stats:
+        row = totals_by_category.setdefault(stats.category.name, {
+            'category__name': stats.category.name,
+            'total_granted': 0, 'total_consumed': 0, 'total_expired': 0, 'total_refunded': 0,
+        })
+        row['total_granted'] += stats.granted
+        row['total_consumed'] += stats.consumed
+        row['total_expired'] += stats.expired
+        row['total_refunded'] += stats.refunded
+    category_stats = [
+        {**row, 'total_remaining': remaining_by_category.get(name, 0)}
+        for name, row in sorted(totals_by_category.items())
+    ]
+    
+    # 日別推移
+    daily_stats = list(
+        rolled_up.filter(date__gte=date_from, date__lte=date_to)
+        .select_related('category').order_by('date', 'category__name')
+    )
+    if date_from <= today <= date_to:
+        daily_stats += sorted(today_stats, key=lambda stats: stats.category.name)
     
     # 最近のポイント付与（最新20件）
-    recent_grants = Point.objects.order_by('-issued_at')[:20]
+    recent_grants = Point.objects.select_related('user', 'category').order_by('-issued_at')[:20]
     
-    context = {
+    return {
         'total_users': total_users,
         'total_points_granted': total_points_granted,
         'total_points_remaining': total_points_remaining,
         'category_stats': category_stats,
+        'daily_stats': daily_stats,
+        'date_from': date_from,
+        'date_to': date_to,
         'recent_grants': recent_grants,
     }
+
+
+@user_passes_test(is_admin)
+def admin_dashboard(request):
+    """管理者ダッシュボード"""
+    # 日別推移の期間（デフォルトは直近30日）
+    date_to = parse_date(request.GET.get('date_to') or '') or timezone.localdate()
+    date_from = parse_date(request.GET.get('date_from') or '') or date_to - timedelta(days=29)
+    
+    context = _get_admin_dashboard_context(date_from, date_to)
     
     return render(request, 'points/admin_dashboard.html', context)
 
@@ -151,14 +279,8 @@ def grant_points(request):
         else:
             messages.error(request, '必要な情報を入力してください。')
     
-    # 一般ユーザー一覧
-    users = User.objects.filter(is_admin=False).order_by('full_name')
-    
-    context = {
-        'users': users,
-    }
-    
-    return render(request, 'points/grant_points.html', context)
+    # 対象ユーザーは画面上で user_search_api から検索する
+    return render(request, 'points/grant_points.html')
 
 
 @user_passes_test(is_admin)
@@ -167,20 +289,37 @@ def bulk_grant_points(request):
     if request.method == 'POST':
         total_points = int(request.POST.get('total_points', 0))
         reason = request.POST.get('reason', '')
+        segment_id = request.POST.get('segment_id')
         user_ids = request.POST.getlist('user_ids')
         
-        if total_points > 0 and reason and user_ids:
+        if total_points > 0 and reason and segment_id:
+            # セグメントの対象ユーザーはジョブの中で求める
+            segment = get_object_or_404(UserSegment, id=segment_id)
+            job = segment.enqueue_grant(total_points, reason, created_by=request.user)
+            messages.success(
+                request,
+                f'セグメント「{segment.name}」への{total_points}ポイント付与をジョブ #{job.id} として受け付けました。'
+                '完了後にユーザー別の結果をCSVでダウンロードできます。'
+            )
+            return redirect('bulk_grant_points')
+        elif total_points > 0 and reason and user_ids:
             try:
-                users = User.objects.filter(id__in=user_ids, is_admin=False)
-                success_count = 0
-                
-                for user in users:
-                    Point.grant_points(user, total_points, reason)
-                    success_count += 1
+                from jobs.models import Job
+                target_ids = list(
+                    User.objects.filter(id__in=user_ids, is_admin=False).values_list('id', flat=True)
+                )
+                # 付与はバックグラウンドジョブで実行する
+                job = Job.enqueue('points.bulk_grant', {
+                    'user_ids': target_ids,
+                    'total_points': total_points,
+                    'reason': reason,
+                    'created_by_id': request.user.id,
+                }, created_by=request.user)
                 
                 messages.success(
                     request, 
-                    f'{success_count}名のユーザーに{total_points}ポイントずつ付与しました。'
+                    f'{len(target_ids)}名への{total_points}ポイント付与をジョブ #{job.id} として受け付けました。'
+                    '進捗は管理画面のジョブ一覧で確認できます。'
                 )
                 return redirect('bulk_grant_points')
             except Exception as e:
@@ -188,16 +327,52 @@ def bulk_grant_points(request):
         else:
             messages.error(request, '必要な情報を入力してください。')
     
-    # 一般ユーザー一覧
-    users = User.objects.filter(is_admin=False).order_by('full_name')
+    # 対象ユーザーは画面上で user_search_api から検索し、選択内容はブラウザ側で保持する
+    from jobs.models import Job
     
     context = {
-        'users': users,
+        'segments': UserSegment.objects.all(),
+        'segment_jobs': Job.objects.filter(name='points.segment_grant').order_by('-id')[:10],
     }
-    
     return render(request, 'points/bulk_grant_points.html', context)
 
 
+SEGMENT_GRANT_REPORT_COLUMNS = [
+    'user_id', 'user__username', 'user__full_name', 'points', 'balance_after', 'created_at',
+]
+
+
+def _iter_segment_grant_results(job, chunk_size=2000):
+    """ユーザー別結果を主キーのキーセットで chunk_size 件ずつ読み出す"""
+    last_id = 0
+    while True:
+        rows = list(
+            job.segment_grant_results.filter(id__gt=last_id).order_by('id').values_list(
+                'id', *SEGMENT_GRANT_REPORT_COLUMNS
+            )[:chunk_size]
+        )
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+@user_passes_test(is_admin)
+def segment_grant_report(request, job_id):
+    """セグメント付与のユーザー別結果（CSV をストリーミングで返す）"""
+    from jobs.models import Job
+    from transactions.exports import iter_csv
+    
+    job = get_object_or_404(Job, id=job_id, name='points.segment_grant')
+    lines = iter_csv(SEGMENT_GRANT_REPORT_COLUMNS, _iter_segment_grant_results(job))
+    response = StreamingHttpResponse(
+        (line.encode('utf-8') for line in lines), content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="segment_grant_{job.id}.csv"'
+    return response
+
+
 @user_passes_test(is_admin)
 def user_points_detail(request, user_id):
     """ユーザー別ポイント詳細"""
@@ -207,7 +382,7 @@ def user_points_detail(request, user_id):
     points_summary = Point.get_user_points_summary(user)
     
     # ポイント履歴
-    points_history = Point.objects.filter(user=user).order_by('-issued_at')
+    points_history = Point.objects.filter(user=user).select_related('user', 'category').order_by('-issued_at')
     
     # ページネーション
     paginator = Paginator(points_history, 20)
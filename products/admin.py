@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Product, ProductExchange
+from incentive_system.admin_scale import AutocompleteListFilter, DateDrillDownListFilter, ScaleModeAdminMixin
+from .models import PointConsumption, Product, ProductExchange
 
 
 @admin.register(Product)
@@ -11,6 +12,7 @@ class ProductAdmin(admin.ModelAdmin):
         'is_active', 'sort_order', 'created_at'
     )
     list_filter = ('category', 'is_active', 'created_at')
+    list_select_related = ('category',)
     search_fields = ('name', 'description')
     ordering = ('sort_order', 'created_at')
     readonly_fields = ('created_at', 'updated_at')
@@ -43,17 +45,42 @@ class ProductAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('category')
 
 
+class PointConsumptionInline(admin.TabularInline):
+    """ポイント消費内訳（参照のみ）"""
+    model = PointConsumption
+    fields = ('point', 'amount', 'refunded_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        """追加権限なし（交換処理で作成）"""
+        return False
+    
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('point__user', 'point__category')
+
+
 @admin.register(ProductExchange)
-class ProductExchangeAdmin(admin.ModelAdmin):
+class ProductExchangeAdmin(ScaleModeAdminMixin, admin.ModelAdmin):
     """商品交換履歴管理画面"""
     list_display = (
         'user', 'product', 'points_used', 'get_status_display', 
         'exchange_date'
     )
-    list_filter = ('status', 'exchange_date', 'product__category')
+    list_filter = (
+        'status',
+        ('exchange_date', DateDrillDownListFilter),
+        ('product__category', AutocompleteListFilter),
+        ('product', AutocompleteListFilter),
+        ('user', AutocompleteListFilter),
+    )
+    list_select_related = ('user', 'product', 'product__category')
     search_fields = ('user__username', 'user__full_name', 'product__name')
     ordering = ('-exchange_date',)
     readonly_fields = ('exchange_date', 'points_used')
+    inlines = [PointConsumptionInline]
     
     fieldsets = (
         ('交換情報', {
@@ -84,16 +111,56 @@ class ProductExchangeAdmin(admin.ModelAdmin):
         """クエリセット最適化"""
         return super().get_queryset(request).select_related('user', 'product', 'product__category')
     
-    actions = ['mark_as_completed', 'mark_as_processing']
+    actions = ['mark_as_completed', 'mark_as_processing', 'cancel_and_refund']
+    
+    def get_readonly_fields(self, request, obj=None):
+        """キャンセル済みの交換は返還済みのため状態を変更できない"""
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is not None and obj.status == 'cancelled':
+            return readonly_fields + ('status',)
+        return readonly_fields
+    
+    def save_model(self, request, obj, form, change):
+        """キャンセルへの変更はポイントの返還を伴うため cancel() で処理"""
+        if change and 'status' in form.changed_data and obj.status == 'cancelled':
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            try:
+                _, refunded_points = ProductExchange.objects.filter(pk=obj.pk).cancel()
+            except ValueError as e:
+                self.message_user(request, str(e), level=messages.ERROR)
+                return
+            obj.status = 'cancelled'
+            self.message_user(request, f'交換をキャンセルし、{refunded_points}ptを返還しました。')
+        else:
+            super().save_model(request, obj, form, change)
     
     def mark_as_completed(self, request, queryset):
         """選択した交換を完了にする"""
-        updated = queryset.update(status='completed')
+        try:
+            updated = queryset.update_status('completed')
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
         self.message_user(request, f'{updated}件の交換を完了にしました。')
     mark_as_completed.short_description = '選択した交換を完了にする'
     
     def mark_as_processing(self, request, queryset):
         """選択した交換を処理中にする"""
-        updated = queryset.update(status='processing')
+        try:
+            updated = queryset.update_status('processing')
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
         self.message_user(request, f'{updated}件の交換を処理中にしました。')
     mark_as_processing.short_description = '選択した交換を処理中にする'
+    
+    def cancel_and_refund(self, request, queryset):
+        """選択した交換をキャンセルしてポイントを返還する"""
+        try:
+            cancelled, refunded_points = queryset.cancel()
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
+        self.message_user(request, f'{cancelled}件の交換をキャンセルし、{refunded_points}ptを返還しました。')
+    cancel_and_refund.short_description = '選択した交換をキャンセルしてポイントを返還する'
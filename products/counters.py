@@ -0,0 +1,67 @@
+"""
+商品交換の状態別件数カウンター
+
+状態別の件数を Django キャッシュ（本番では Redis）に保持し、状態の遷移時に
+増減させる。キャッシュが無い場合は条件付き集計の1クエリで再集計する。
+TTL を設けているため、万一ずれが生じても一定時間で再集計される。
+キャッシュがプロセスごとに独立している場合（Redis を使わない場合）は、他のワーカーの
+増減が伝わらないためキャッシュを使わず毎回集計する。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from points.cache import is_shared_cache
+
+CACHE_KEY = 'products:exchange_status_count:{}'
+
+
+def _statuses():
+    from .models import ProductExchange
+    return [value for value, _ in ProductExchange.STATUS_CHOICES]
+
+
+def count_statuses(queryset=None):
+    """全状態の件数を1クエリで集計"""
+    from .models import ProductExchange
+
+    queryset = ProductExchange.objects.all() if queryset is None else queryset
+    return queryset.aggregate(**{
+        status: Count('id', filter=Q(status=status)) for status in _statuses()
+    })
+
+
+def get_status_counts():
+    """状態別の件数を取得（キャッシュが無い場合は再集計してキャッシュ）"""
+    if not is_shared_cache():
+        return count_statuses()
+
+    keys = {status: CACHE_KEY.format(status) for status in _statuses()}
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {status: cached[key] for status, key in keys.items()}
+
+    counts = count_statuses()
+    cache.set_many(
+        {keys[status]: count for status, count in counts.items()},
+        getattr(settings, 'EXCHANGE_STATUS_COUNT_TTL', 300)
+    )
+    return counts
+
+
+def adjust_status_counts(changes):
+    """{状態: 増減数} をトランザクションのコミット後にカウンターへ反映"""
+    if not is_shared_cache():
+        return
+
+    def apply():
+        for status, delta in changes.items():
+            if not delta:
+                continue
+            try:
+                cache.incr(CACHE_KEY.format(status), delta)
+            except ValueError:
+                pass  # キャッシュが無い場合は次回参照時に再集計される
+
+    transaction.on_commit(apply)
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from products.models import PointConsumption, ProductExchange
+
+
+class Command(BaseCommand):
+    """商品交換の一括キャンセルコマンド"""
+    help = '条件に一致する交換をキャンセルし、消費したポイントを返還します（取引履歴も作成されます）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exchange-id', type=int, action='append', dest='exchange_ids', help='交換ID（複数指定可）')
+        parser.add_argument('--product-id', type=int, action='append', dest='product_ids', help='商品ID（複数指定可）')
+        parser.add_argument(
+            '--status', action='append', dest='statuses', choices=['pending', 'processing', 'completed'],
+            help='対象の状態（複数指定可。省略時はキャンセル以外のすべて）',
+        )
+        parser.add_argument('--reason', default='交換キャンセル', help='取引履歴に記録する理由')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='1トランザクションで処理する交換件数（デフォルト: 1000）',
+        )
+
+    def handle(self, *args, **options):
+        if not options['exchange_ids'] and not options['product_ids']:
+            raise CommandError('--exchange-id または --product-id を指定してください')
+
+        targets = ProductExchange.objects.exclude(status='cancelled')
+        if options['exchange_ids']:
+            targets = targets.filter(id__in=options['exchange_ids'])
+        if options['product_ids']:
+            targets = targets.filter(product_id__in=options['product_ids'])
+        if options['statuses']:
+            targets = targets.filter(status__in=options['statuses'])
+
+        # 消費記録の導入前の交換は返還額が分からないため対象外にする
+        unrecorded = targets.filter(points_used__gt=0).exclude(
+            Exists(PointConsumption.objects.filter(exchange=OuterRef('pk'), refunded_at__isnull=True))
+        )
+        unrecorded_ids = list(unrecorded.order_by('id').values_list('id', flat=True))
+        if unrecorded_ids:
+            self.stdout.write(self.style.WARNING(
+                f'消費記録が無い交換 {len(unrecorded_ids)}件はキャンセルしません（ポイントを手動で調整してください）: '
+                + ', '.join(map(str, unrecorded_ids[:20])) + (' ほか' if len(unrecorded_ids) > 20 else '')
+            ))
+            targets = targets.exclude(id__in=unrecorded.values('id'))
+
+        # ID のキーセットで走査する。キャンセル済みは対象外になるため、中断後に再実行しても続きから処理される。
+        cancelled_count = 0
+        refunded_total = 0
+        last_id = 0
+        while True:
+            ids = list(
+                targets.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+
+            cancelled, refunded = ProductExchange.objects.filter(id__in=ids).exclude(
+                status='cancelled'
+            ).cancel(reason=options['reason'])
+            cancelled_count += cancelled
+            refunded_total += refunded
+            last_id = ids[-1]
+            self.stdout.write(f'{cancelled_count}件処理済み...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{cancelled_count}件の交換をキャンセルし、{refunded_total}ptを返還しました。'
+        ))
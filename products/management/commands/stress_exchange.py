@@ -0,0 +1,200 @@
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Count, Max, Sum
+from django.test.utils import override_settings
+
+from accounts.models import User
+from incentive_system.db import isolated_databases
+from points.models import Point, PointCategory, UserPointBalance
+from products.models import Product, ProductExchange
+from transactions.models import PointTransaction
+
+GRANT_OUTCOMES = ('granted', 'grant_failed')
+
+
+class Command(BaseCommand):
+    """商品交換の同時実行ストレステストコマンド"""
+    help = (
+        '複数スレッドから同じユーザーの商品交換を同時に実行し（冪等キーの再送を含む）、'
+        '取引履歴・ポイント・残高テーブルが一致することを確認します'
+        '（検証用に作成したデータベース（テスト用データベース）で実行し、終了時に削除されます）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3, help='ユーザー数（デフォルト: 3）')
+        parser.add_argument('--requests-per-user', type=int, default=200, help='ユーザーあたりの交換申請数（デフォルト: 200）')
+        parser.add_argument('--threads', type=int, default=16, help='スレッド数（デフォルト: 16）')
+        parser.add_argument(
+            '--duplicate-rate', type=float, default=0.3,
+            help='既に送信した冪等キーで再送する割合（デフォルト: 0.3）',
+        )
+        parser.add_argument(
+            '--funded-rate', type=float, default=0.5,
+            help='新規の交換申請のうち、ポイントが足りる割合（デフォルト: 0.5）',
+        )
+        parser.add_argument(
+            '--grants-per-user', type=int, default=0,
+            help='交換と並行して実行するユーザーあたりのポイント付与数（デフォルト: 0）',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int,
+            help='交換1件あたりのトランザクション試行回数（省略時は EXCHANGE_MAX_ATTEMPTS）',
+        )
+        parser.add_argument('--prefix', default='stress_', help='検証用ユーザー名の接頭辞（デフォルト: stress_）')
+        parser.add_argument('--seed', type=int, default=42, help='乱数シード（デフォルト: 42）')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write('検証用のデータベースを作成しています...')
+        with isolated_databases():
+            users, product = self._setup(options)
+            jobs = self._build_jobs(users, options, rng)
+            self.stdout.write(f'{len(jobs)}件の交換申請を{options["threads"]}スレッドで実行しています...')
+
+            overrides = {}
+            if options['max_attempts']:
+                overrides['EXCHANGE_MAX_ATTEMPTS'] = options['max_attempts']
+            started = time.perf_counter()
+            with override_settings(**overrides), ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(lambda job: self._run_job(product, *job), jobs))
+            elapsed = time.perf_counter() - started
+
+            outcomes = Counter(outcome for outcome, _ in results)
+            self.stdout.write('結果: ' + ', '.join(f'{key}={value}' for key, value in sorted(outcomes.items())))
+            self.stdout.write(
+                f'所要時間 {elapsed:.1f}秒（交換 {outcomes["created"] / elapsed * 60:.0f}件/分、'
+                f'申請 {len(jobs) / elapsed * 60:.0f}件/分）'
+            )
+            self._verify(users, product, [result for result in results if result[0] not in GRANT_OUTCOMES])
+
+    def _setup(self, options):
+        prefix = options['prefix']
+        category = PointCategory.get_digital_category()
+        product = Product.objects.create(
+            category=category,
+            name=f'{prefix}商品',
+            required_points=100,
+        )
+        users = []
+        # 新規の交換申請のうち funded_rate の割合だけ交換できるポイントを付与する
+        unique_requests = options['requests_per_user'] * (1 - options['duplicate_rate'])
+        grant = int(unique_requests * options['funded_rate']) * product.required_points
+        for index in range(options['users']):
+            user = User.objects.create(
+                username=f'{prefix}{index:04d}',
+                email=f'{prefix}{index:04d}@stress.invalid',
+                full_name=f'ストレステスト {index:04d}',
+            )
+            # カテゴリ比率で分割されるため、対象カテゴリに grant 以上が入るように付与する
+            Point.grant_points(user, int(grant / float(category.ratio)) + 1, 'ストレステスト')
+            users.append(user)
+        return users, product
+
+    def _build_jobs(self, users, options, rng):
+        jobs = []
+        sent_keys = {user.id: [] for user in users}
+        for _ in range(options['requests_per_user']):
+            for user in users:
+                keys = sent_keys[user.id]
+                if keys and rng.random() < options['duplicate_rate']:
+                    key = rng.choice(keys)
+                else:
+                    key = uuid.uuid4().hex
+                    keys.append(key)
+                jobs.append((user, key))
+        for _ in range(options['grants_per_user']):
+            for user in users:
+                jobs.append((user, None))
+        rng.shuffle(jobs)
+        return jobs
+
+    def _run_job(self, product, user, key):
+        """冪等キーがあれば交換申請、無ければポイント付与を実行"""
+        try:
+            if key is None:
+                return self._grant(user)
+            return self._exchange(product, user, key)
+        finally:
+            connections.close_all()
+
+    def _grant(self, user):
+        try:
+            Point.grant_points(user, 100, 'ストレステスト追加付与')
+            return 'granted', (user.id, None, None)
+        except OperationalError:
+            return 'grant_failed', (user.id, None, None)
+
+    def _exchange(self, product, user, key):
+        try:
+            exchange, created = ProductExchange.create_exchange(user, product, key)
+            return ('created' if created else 'duplicate'), (user.id, key, exchange.id)
+        except ValueError:
+            return 'insufficient', (user.id, key, None)
+        except OperationalError:
+            return 'retry_exhausted', (user.id, key, None)
+
+    def _verify(self, users, product, results):
+        errors = []
+        user_ids = [user.id for user in users]
+
+        # 同じ冪等キーの申請は1件の交換履歴にまとまっていること
+        exchange_ids = {}
+        for outcome, (user_id, key, exchange_id) in results:
+            if exchange_id is None:
+                continue
+            if exchange_ids.setdefault((user_id, key), exchange_id) != exchange_id:
+                errors.append(f'冪等キー {key} に複数の交換履歴が返されました')
+        exchanges = ProductExchange.objects.filter(user_id__in=user_ids)
+        if exchanges.count() != len(exchange_ids):
+            errors.append(f'交換履歴 {exchanges.count()}件 / 受付済みの冪等キー {len(exchange_ids)}件')
+
+        lots = dict(
+            Point.objects.filter(user_id__in=user_ids, is_expired=False).values_list('user_id')
+            .annotate(Sum('remaining_amount')).order_by()
+        )
+        ledger = {
+            row['user_id']: row
+            for row in PointTransaction.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                total=Sum('amount'), rows=Count('id'), last_sequence=Max('sequence')
+            ).order_by()
+        }
+        balances = dict(
+            UserPointBalance.objects.filter(user_id__in=user_ids).values_list('user_id')
+            .annotate(Sum('balance')).order_by()
+        )
+        exchanged = dict(
+            exchanges.values_list('user_id').annotate(Sum('points_used')).order_by()
+        )
+        granted = dict(
+            Point.objects.filter(user_id__in=user_ids).values_list('user_id').annotate(Sum('amount')).order_by()
+        )
+
+        for user in users:
+            row = ledger[user.id]
+            expected = granted[user.id] - exchanged.get(user.id, 0)
+            values = (lots.get(user.id, 0), row['total'], balances.get(user.id, 0), expected)
+            if len(set(values)) != 1:
+                errors.append(
+                    f'{user.username}: ポイント残 {values[0]} / 取引履歴合計 {values[1]} / '
+                    f'残高テーブル {values[2]} / 付与-交換 {values[3]}'
+                )
+            if row['rows'] != row['last_sequence']:
+                # 付与はカテゴリごとに連番を振るため、カテゴリ単位で確認する
+                per_category = PointTransaction.objects.filter(user=user).values('category_id').annotate(
+                    rows=Count('id'), last_sequence=Max('sequence')
+                ).order_by()
+                for category_row in per_category:
+                    if category_row['rows'] != category_row['last_sequence']:
+                        errors.append(f'{user.username}: 取引連番に欠番・重複があります')
+
+        if errors:
+            raise CommandError('整合性チェックに失敗しました:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS(
+            f'整合性チェックOK: 交換 {len(exchange_ids)}件、取引履歴・ポイント・残高テーブルは一致しています。'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productexchange',
+            index=models.Index(fields=['status', 'exchange_date'], name='product_exc_status_2df876_idx'),
+        ),
+    ]
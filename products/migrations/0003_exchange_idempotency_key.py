@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_exchange_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productexchange',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='同じ交換申請の再送を識別するキー（ユーザーごとに一意）', max_length=64, null=True, verbose_name='冪等キー'),
+        ),
+        migrations.AddConstraint(
+            model_name='productexchange',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_product_exchange_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0003_userpointbalance_last_sequence'),
+        ('products', '0003_exchange_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='消費ポイント数')),
+                ('refunded_at', models.DateTimeField(blank=True, null=True, verbose_name='返還日時')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('exchange', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumptions', to='products.productexchange', verbose_name='交換履歴')),
+                ('point', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumptions', to='points.point', verbose_name='ポイント')),
+            ],
+            options={
+                'verbose_name': 'ポイント消費内訳',
+                'verbose_name_plural': 'ポイント消費内訳',
+                'db_table': 'point_consumptions',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_point_consumption'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productexchange',
+            index=models.Index(fields=['exchange_date'], name='product_exc_exchang_11fcc6_idx'),
+        ),
+    ]
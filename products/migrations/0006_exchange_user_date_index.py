@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_exchange_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productexchange',
+            index=models.Index(fields=['user', 'exchange_date', 'id'], name='exchanges_user_date_idx'),
+        ),
+    ]
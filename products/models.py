@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
+from django.utils import timezone
+from incentive_system.db import run_in_transaction
 from points.models import PointCategory
 
 
@@ -36,14 +38,179 @@ class Product(models.Model):
     @classmethod
     def get_available_products(cls, category=None):
         """利用可能な商品を取得"""
-        queryset = cls.objects.filter(is_active=True)
+        queryset = cls.objects.filter(is_active=True).select_related('category')
         if category:
             queryset = queryset.filter(category=category)
         return queryset.order_by('sort_order', 'created_at')
 
 
+class ProductExchangeQuerySet(models.QuerySet):
+    """商品交換履歴クエリセット"""
+    
+    def update_status(self, status):
+        """
+        状態を一括更新し、状態別件数カウンターに反映
+        
+        キャンセルはポイントの返還を伴うため cancel() で行う。
+        キャンセル済みの交換は返還済みのため、他の状態に戻すことはできない（ValueError）。
+        """
+        from .counters import adjust_status_counts
+        
+        if status == 'cancelled':
+            raise ValueError('キャンセルは cancel() で行ってください。')
+        
+        with transaction.atomic():
+            targets = list(self.select_for_update().exclude(status=status).values_list('id', 'status'))
+            if not targets:
+                return 0
+            cancelled = [pk for pk, previous_status in targets if previous_status == 'cancelled']
+            if cancelled:
+                raise ValueError(f'キャンセル済みの交換は状態を変更できません（{len(cancelled)}件）。')
+            
+            updated = ProductExchange.objects.filter(id__in=[pk for pk, _ in targets]).update(status=status)
+            
+            changes = {status: len(targets)}
+            for _, previous_status in targets:
+                changes[previous_status] = changes.get(previous_status, 0) - 1
+            adjust_status_counts(changes)
+        
+        return updated
+    
+    def cancel(self, reason='交換キャンセル'):
+        """
+        交換を一括キャンセルし、消費したポイントを消費元のポイントに返還
+        
+        消費記録をもとに、ポイントの残数・残高テーブル・取引履歴を件数に関わらず
+        一定回数のクエリで更新する。失効済みのポイントから消費した分は返還しない。
+        消費記録が無い交換（消費記録の導入前の交換）は返還額が分からないため、
+        含まれている場合は何も変更せずに ValueError とする。
+        戻り値は (キャンセル件数, 返還ポイント数)。
+        """
+        from points.models import Point, UserPointBalance
+        from .counters import adjust_status_counts
+        
+        with transaction.atomic():
+            targets = list(
+                self.select_for_update(of=('self',)).exclude(status='cancelled').order_by('id').values_list(
+                    'id', 'user_id', 'status', 'product_id', 'product__name', 'product__category_id'
+                )
+            )
+            if not targets:
+                return 0, 0
+            
+            exchange_ids = [target[0] for target in targets]
+            consumptions = list(
+                PointConsumption.objects.filter(
+                    exchange_id__in=exchange_ids, refunded_at__isnull=True
+                ).values_list('id', 'exchange_id', 'point_id', 'amount')
+            )
+            recorded = {exchange_id for _, exchange_id, _, _ in consumptions}
+            unrecorded = list(
+                ProductExchange.objects.filter(
+                    id__in=[exchange_id for exchange_id in exchange_ids if exchange_id not in recorded],
+                    points_used__gt=0
+                ).order_by('id').values_list('id', flat=True)
+            )
+            if unrecorded:
+                raise ValueError(
+                    '消費記録が無いため返還額が分からない交換が含まれています'
+                    f'（交換ID: {", ".join(map(str, unrecorded[:10]))}{" ほか" if len(unrecorded) > 10 else ""}）。'
+                    'ポイントを手動で調整してください。'
+                )
+            
+            # 交換処理と同じく 残高行 → ポイント の順にロックする
+            keys = {(user_id, category_id) for _, user_id, _, _, _, category_id in targets}
+            list(UserPointBalance.objects.select_for_update().filter(
+                user_id__in={user_id for user_id, _ in keys},
+                category_id__in={category_id for _, category_id in keys}
+            ).order_by('user_id', 'category_id').values_list('id'))
+            refundable_point_ids = set(
+                Point.objects.select_for_update().filter(
+                    id__in={point_id for _, _, point_id, _ in consumptions}, is_expired=False
+                ).order_by('expires_at', 'id').values_list('id', flat=True)
+            )
+            
+            refunds_by_point = {}
+            refunds_by_exchange = {}
+            for _, exchange_id, point_id, amount in consumptions:
+                if point_id not in refundable_point_ids:
+                    continue
+                refunds_by_point[point_id] = refunds_by_point.get(point_id, 0) + amount
+                refunds_by_exchange[exchange_id] = refunds_by_exchange.get(exchange_id, 0) + amount
+            
+            now = timezone.now()
+            point_items = list(refunds_by_point.items())
+            for start in range(0, len(point_items), 500):
+                chunk = point_items[start:start + 500]
+                Point.objects.filter(id__in=[point_id for point_id, _ in chunk]).update(
+                    remaining_amount=models.F('remaining_amount') + models.Case(
+                        *[models.When(id=point_id, then=models.Value(amount)) for point_id, amount in chunk],
+                        output_field=models.PositiveIntegerField()
+                    ),
+                    updated_at=now
+                )
+            PointConsumption.objects.filter(
+                id__in=[consumption_id for consumption_id, _, _, _ in consumptions]
+            ).update(refunded_at=now)
+            
+            deltas = {}
+            entries = {}
+            for exchange_id, user_id, _, _, _, category_id in targets:
+                amount = refunds_by_exchange.get(exchange_id, 0)
+                if amount > 0:
+                    key = (user_id, category_id)
+                    deltas[key] = deltas.get(key, 0) + amount
+                    entries[key] = entries.get(key, 0) + 1
+            balances = UserPointBalance.apply_deltas(deltas, entries=entries)
+            
+            # 取引履歴作成（返還前残高から順に加算して取引後残高を求める）
+            try:
+                from transactions.models import PointTransaction
+                running = {
+                    key: [balances[key][0] - deltas[key], balances[key][1] - count]
+                    for key, count in entries.items()
+                }
+                refund_transactions = []
+                for exchange_id, user_id, _, product_id, product_name, category_id in targets:
+                    amount = refunds_by_exchange.get(exchange_id, 0)
+                    if amount <= 0:
+                        continue
+                    state = running[(user_id, category_id)]
+                    state[0] += amount
+                    state[1] += 1
+                    refund_transactions.append(PointTransaction(
+                        user_id=user_id,
+                        transaction_type='refund',
+                        category_id=category_id,
+                        amount=amount,
+                        balance_after=state[0],
+                        sequence=state[1],
+                        reason=f'{reason}: {product_name}',
+                        related_product_id=product_id,
+                        related_exchange_id=exchange_id
+                    ))
+                PointTransaction.objects.bulk_create(refund_transactions, batch_size=1000)
+            except ImportError:
+                pass  # transactionsアプリがない場合は無視
+            
+            ProductExchange.objects.filter(id__in=exchange_ids).update(status='cancelled')
+            changes = {'cancelled': len(targets)}
+            for _, _, previous_status, _, _, _ in targets:
+                changes[previous_status] = changes.get(previous_status, 0) - 1
+            adjust_status_counts(changes)
+        
+        return len(targets), sum(refunds_by_exchange.values())
+
+
 class ProductExchange(models.Model):
     """商品交換履歴"""
+    STATUS_CHOICES = [
+        ('pending', '交換申請中'),
+        ('processing', '処理中'),
+        ('completed', '交換完了'),
+        ('cancelled', 'キャンセル'),
+    ]
+    
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -60,21 +227,165 @@ class ProductExchange(models.Model):
     status = models.CharField(
         '状態',
         max_length=20,
-        choices=[
-            ('pending', '交換申請中'),
-            ('processing', '処理中'),
-            ('completed', '交換完了'),
-            ('cancelled', 'キャンセル'),
-        ],
+        choices=STATUS_CHOICES,
         default='pending'
     )
     notes = models.TextField('備考', blank=True)
+    idempotency_key = models.CharField(
+        '冪等キー',
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text='同じ交換申請の再送を識別するキー（ユーザーごとに一意）'
+    )
+
+    objects = ProductExchangeQuerySet.as_manager()
 
     class Meta:
         verbose_name = '商品交換履歴'
         verbose_name_plural = '商品交換履歴'
         db_table = 'product_exchanges'
         ordering = ['-exchange_date']
+        indexes = [
+            models.Index(fields=['status', 'exchange_date']),
+            models.Index(fields=['exchange_date']),
+            # ユーザーごとの交換履歴（交換日時の新しい順）用
+            models.Index(fields=['user', 'exchange_date', 'id'], name='exchanges_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                name='unique_product_exchange_idempotency_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.product.name} ({self.exchange_date.strftime('%Y/%m/%d')})"
+
+    @classmethod
+    def create_exchange(cls, user, product, idempotency_key=None):
+        """
+        商品交換を申請（ポイント消費・交換履歴・取引履歴の作成）
+        
+        同じ冪等キーで再送された場合は交換せずに既存の交換履歴を返す。
+        ロックは 残高行 → ポイント（有効期限・ID順）の順に取得し、
+        直列化失敗・デッドロック時は EXCHANGE_MAX_ATTEMPTS 回まで再試行する。
+        戻り値は (交換履歴, 新規に作成したか)。
+        """
+        from points.models import Point, UserPointBalance
+        
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 64:
+            raise ValueError('冪等キーの形式が正しくありません')
+        
+        def find_existing():
+            if idempotency_key is None:
+                return None
+            return cls.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        
+        def exchange():
+            # 同一ユーザー・カテゴリの交換を直列化してから冪等キーを確認する
+            list(UserPointBalance.objects.select_for_update().filter(user=user, category=product.category))
+            existing = find_existing()
+            if existing:
+                return existing, False
+            
+            consumed_points = Point.consume_points(
+                user=user,
+                category=product.category,
+                required_points=product.required_points
+            )
+            exchange = cls.objects.create(
+                user=user,
+                product=product,
+                points_used=product.required_points,
+                status='pending',
+                idempotency_key=idempotency_key
+            )
+            PointConsumption.objects.bulk_create([
+                PointConsumption(exchange=exchange, point_id=item['point_id'], amount=item['consumed_amount'])
+                for item in consumed_points
+            ])
+            
+            # 取引履歴作成
+            try:
+                from transactions.models import PointTransaction
+                PointTransaction.create_exchange_transaction(
+                    user=user,
+                    category=product.category,
+                    amount=product.required_points,
+                    reason=f'商品交換: {product.name}',
+                    product_id=product.id,
+                    exchange_id=exchange.id
+                )
+            except ImportError:
+                pass  # transactionsアプリがない場合は無視
+            
+            return exchange, True
+        
+        existing = find_existing()
+        if existing:
+            return existing, False
+        
+        try:
+            return run_in_transaction(
+                exchange, max_attempts=getattr(settings, 'EXCHANGE_MAX_ATTEMPTS', 3)
+            )
+        except IntegrityError:
+            # 同じキーの申請が並行して先に確定した場合
+            existing = find_existing()
+            if existing is None:
+                raise
+            return existing, False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 状態の変更を検知するため読み込み時の状態を保持
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .counters import adjust_status_counts
+        
+        adding = self._state.adding
+        previous_status = getattr(self, '_loaded_status', None)
+        if not adding and previous_status and previous_status != self.status:
+            # キャンセルは返還を伴うため cancel() でのみ行い、キャンセル済みは他の状態に戻さない
+            if previous_status == 'cancelled':
+                raise ValueError('キャンセル済みの交換は状態を変更できません。')
+            if self.status == 'cancelled':
+                raise ValueError('キャンセルは cancel() で行ってください。')
+        super().save(*args, **kwargs)
+        
+        if adding:
+            adjust_status_counts({self.status: 1})
+        elif previous_status and previous_status != self.status:
+            adjust_status_counts({previous_status: -1, self.status: 1})
+        self._loaded_status = self.status
+
+
+class PointConsumption(models.Model):
+    """交換で消費したポイントの内訳（キャンセル時の返還に使用）"""
+    exchange = models.ForeignKey(
+        ProductExchange,
+        on_delete=models.CASCADE,
+        related_name='consumptions',
+        verbose_name='交換履歴'
+    )
+    point = models.ForeignKey(
+        'points.Point',
+        on_delete=models.CASCADE,
+        related_name='consumptions',
+        verbose_name='ポイント'
+    )
+    amount = models.PositiveIntegerField('消費ポイント数')
+    refunded_at = models.DateTimeField('返還日時', null=True, blank=True)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'ポイント消費内訳'
+        verbose_name_plural = 'ポイント消費内訳'
+        db_table = 'point_consumptions'
 
     def __str__(self):
-        return f"{self.user.full_name} - {self.product.name} ({self.exchange_date.strftime('%Y/%m/%d')})"
\ No newline at end of file
+        return f"交換#{self.exchange_id} - ポイント#{self.point_id} - {self.amount}pt"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .counters import adjust_status_counts
+from .models import ProductExchange
+
+
+@receiver(post_delete, sender=ProductExchange)
+def decrement_status_count(sender, instance, **kwargs):
+    """交換履歴の削除を状態別件数カウンターに反映"""
+    adjust_status_counts({instance.status: -1})
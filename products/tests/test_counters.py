@@ -0,0 +1,53 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from points.cache import category_cache
+from points.models import PointCategory
+from products.counters import CACHE_KEY, count_statuses, get_status_counts
+from products.models import Product, ProductExchange
+
+
+class StatusCountTests(TestCase):
+    """商品交換の状態別件数"""
+
+    def setUp(self):
+        cache.clear()
+        category_cache.clear()
+        self.user = User.objects.create(username='member', email='member@example.com', full_name='会員')
+        self.product = Product.objects.create(
+            category=PointCategory.get_digital_category(), name='商品', required_points=1
+        )
+
+    def _exchange_and_complete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            exchanges = [
+                ProductExchange.objects.create(user=self.user, product=self.product, points_used=1)
+                for _ in range(3)
+            ]
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductExchange.objects.filter(id=exchanges[0].id).update_status('completed')
+
+    def test_local_cache_counts_every_request(self):
+        # プロセスごとのキャッシュでは他のワーカーの増減が伝わらないため、キャッシュを使わない
+        self.assertEqual(get_status_counts()['pending'], 0)
+        self._exchange_and_complete()
+        self.assertIsNone(cache.get(CACHE_KEY.format('pending')))
+        with self.assertNumQueries(1):
+            counts = get_status_counts()
+        self.assertEqual(counts, {'pending': 2, 'processing': 0, 'completed': 1, 'cancelled': 0})
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }})
+    def test_shared_cache_keeps_counts_up_to_date(self):
+        cache.clear()
+        self.assertEqual(get_status_counts()['pending'], 0)
+        self._exchange_and_complete()
+        with self.assertNumQueries(0):
+            counts = get_status_counts()
+        self.assertEqual(counts, count_statuses())
+        self.assertEqual(counts, {'pending': 2, 'processing': 0, 'completed': 1, 'cancelled': 0})
@@ -14,4 +14,5 @@ urlpatterns = [
     
     # AJAX API
     path('api/product-info/', views.get_product_info_ajax, name='get_product_info_ajax'),
+    path('api/history/', views.exchange_history_api, name='exchange_history_api'),
 ]
@@ -1,11 +1,14 @@
+import uuid
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from django.db import transaction
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+from incentive_system.pagination import CursorPaginator
+from .counters import get_status_counts
 from .models import Product, ProductExchange
 from points.models import Point, PointCategory
 
@@ -36,7 +39,7 @@ def product_list(request):
     points_summary = Point.get_user_points_summary(request.user)
     
     # カテゴリ一覧
-    categories = PointCategory.objects.filter(is_active=True)
+    categories = PointCategory.get_active_categories()
     
     context = {
         'products': products,
@@ -67,6 +70,7 @@ def product_detail(request, product_id):
         'points_summary': points_summary,
         'category_points': category_points,
         'can_exchange': can_exchange,
+        'idempotency_key': uuid.uuid4().hex,  # 二重送信防止用
     }
     
     return render(request, 'products/product_detail.html', context)
@@ -75,81 +79,49 @@ def product_detail(request, product_id):
 @login_required
 @require_POST
 def exchange_product(request, product_id):
-    """商品交換処理"""
-    product = get_object_or_404(Product, id=product_id, is_active=True)
-    user = request.user
+    """商品交換処理（冪等キー付きの再送は1回の交換として扱う）"""
+    product = get_object_or_404(Product.objects.select_related('category'), id=product_id, is_active=True)
+    idempotency_key = request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key') or None
     
     try:
-        with transaction.atomic():
-            # ユーザーのポイント残高確認
-            points_summary = Point.get_user_points_summary(user)
-            category_points = points_summary.get(product.category.name, 0)
-            
-            if category_points < product.required_points:
-                messages.error(request, 'ポイントが不足しています。')
-                return redirect('product_detail', product_id=product.id)
-            
-            # ポイント消費（FIFO）
-            consumed_points = Point.consume_points(
-                user=user,
-                category=product.category,
-                required_points=product.required_points
-            )
-            
-            # 商品交換履歴作成
-            exchange = ProductExchange.objects.create(
-                user=user,
-                product=product,
-                points_used=product.required_points,
-                status='pending'
-            )
-            
-            # 取引履歴作成
-            try:
-                from transactions.models import PointTransaction
-                PointTransaction.create_exchange_transaction(
-                    user=user,
-                    category=product.category,
-                    amount=product.required_points,
-                    reason=f'商品交換: {product.name}',
-                    product_id=product.id,
-                    exchange_id=exchange.id
-                )
-            except ImportError:
-                pass  # transactionsアプリがない場合は無視
-            
-            messages.success(
-                request, 
-                f'{product.name}の交換申請を受け付けました。管理者による確認後、交換が完了します。'
-            )
-            
-            return redirect('exchange_history')
-            
+        exchange, created = ProductExchange.create_exchange(request.user, product, idempotency_key)
     except ValueError as e:
         messages.error(request, f'交換エラー: {str(e)}')
         return redirect('product_detail', product_id=product.id)
     except Exception as e:
         messages.error(request, 'システムエラーが発生しました。時間をおいて再度お試しください。')
         return redirect('product_detail', product_id=product.id)
+    
+    if created:
+        messages.success(
+            request, 
+            f'{product.name}の交換申請を受け付けました。管理者による確認後、交換が完了します。'
+        )
+    else:
+        messages.info(request, f'{product.name}の交換申請は既に受け付けています。')
+    
+    return redirect('exchange_history')
 
 
-@login_required
-def exchange_history(request):
-    """交換履歴画面"""
-    user = request.user
-    
+def _get_exchange_history_page(request):
+    """交換履歴の1ページ分を取得（カーソルページネーション）"""
     # ステータスフィルター
     status_filter = request.GET.get('status')
     
-    exchanges_query = ProductExchange.objects.filter(user=user).select_related('product', 'product__category')
+    exchanges_query = ProductExchange.objects.filter(user=request.user).select_related('product', 'product__category')
     
     if status_filter:
         exchanges_query = exchanges_query.filter(status=status_filter)
     
     # ページネーション
-    paginator = Paginator(exchanges_query, 20)
-    page_number = request.GET.get('page')
-    exchanges = paginator.get_page(page_number)
+    paginator = CursorPaginator(exchanges_query, ('-exchange_date', '-id'), per_page=20)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@login_required
+def exchange_history(request):
+    """交換履歴画面"""
+    exchanges = _get_exchange_history_page(request)
     
     # ステータス選択肢
     status_choices = ProductExchange._meta.get_field('status').choices
@@ -157,18 +129,37 @@ def exchange_history(request):
     context = {
         'exchanges': exchanges,
         'status_choices': status_choices,
-        'current_status': status_filter,
+        'current_status': request.GET.get('status'),
     }
     
     return render(request, 'products/exchange_history.html', context)
 
 
-@user_passes_test(is_admin)
-def admin_exchange_list(request):
-    """管理者用交換一覧"""
-    # ステータスフィルター
-    status_filter = request.GET.get('status', 'pending')
+@login_required
+def exchange_history_api(request):
+    """API: 交換履歴を取得（カーソルページネーション）"""
+    exchanges = _get_exchange_history_page(request)
     
+    return JsonResponse({
+        'success': True,
+        'exchanges': [
+            {
+                'id': exchange.id,
+                'product': exchange.product.name,
+                'category': exchange.product.category.name,
+                'points_used': exchange.points_used,
+                'status': exchange.status,
+                'exchange_date': exchange.exchange_date.isoformat(),
+            }
+            for exchange in exchanges
+        ],
+        'next_cursor': exchanges.next_cursor,
+        'previous_cursor': exchanges.previous_cursor,
+    })
+
+
+def _get_admin_exchange_page(status_filter, cursor=None):
+    """管理者用交換一覧の1ページ分を取得（カーソルページネーション）"""
     exchanges_query = ProductExchange.objects.select_related(
         'user', 'product', 'product__category'
     ).order_by('-exchange_date')
@@ -177,20 +168,22 @@ def admin_exchange_list(request):
         exchanges_query = exchanges_query.filter(status=status_filter)
     
     # ページネーション
-    paginator = Paginator(exchanges_query, 20)
-    page_number = request.GET.get('page')
-    exchanges = paginator.get_page(page_number)
+    paginator = CursorPaginator(exchanges_query, ('-exchange_date', '-id'), per_page=20)
+    return paginator.get_page(cursor)
+
+
+@user_passes_test(is_admin)
+def admin_exchange_list(request):
+    """管理者用交換一覧"""
+    # ステータスフィルター
+    status_filter = request.GET.get('status', 'pending')
+    exchanges = _get_admin_exchange_page(status_filter, request.GET.get('cursor'))
     
     # ステータス選択肢
     status_choices = ProductExchange._meta.get_field('status').choices
     
     # 統計情報
-    stats = {
-        'pending': ProductExchange.objects.filter(status='pending').count(),
-        'processing': ProductExchange.objects.filter(status='processing').count(),
-        'completed': ProductExchange.objects.filter(status='completed').count(),
-        'cancelled': ProductExchange.objects.filter(status='cancelled').count(),
-    }
+    stats = get_status_counts()
     
     context = {
         'exchanges': exchanges,
@@ -210,7 +203,23 @@ def update_exchange_status(request, exchange_id):
     new_status = request.POST.get('status')
     notes = request.POST.get('notes', '')
     
-    if new_status in dict(ProductExchange._meta.get_field('status').choices):
+    if exchange.status == 'cancelled':
+        # キャンセル済みの交換はポイントを返還済みのため、他の状態に戻さない
+        messages.error(request, 'キャンセル済みの交換は状態を変更できません。')
+    elif new_status == 'cancelled':
+        # キャンセルは消費したポイントの返還を伴う
+        if notes:
+            exchange.notes = notes
+            exchange.save(update_fields=['notes'])
+        try:
+            _, refunded_points = ProductExchange.objects.filter(id=exchange.id).cancel()
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(
+                request, f'{exchange.user.full_name}さんの交換をキャンセルし、{refunded_points}ptを返還しました。'
+            )
+    elif new_status in dict(ProductExchange._meta.get_field('status').choices):
         exchange.status = new_status
         if notes:
             exchange.notes = notes
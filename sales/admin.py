@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+from django.contrib import admin, messages
+from incentive_system.admin_scale import AutocompleteListFilter, DateDrillDownListFilter, ScaleModeAdminMixin
+from .models import FxRate, IncentiveCampaign, IncentiveRule, IncentiveRun, IncentiveRunResult, IncentiveTier, SalesRecord
+
+
+@admin.register(SalesRecord)
+class SalesRecordAdmin(ScaleModeAdminMixin, admin.ModelAdmin):
+    """売上実績管理画面"""
+    list_display = ('external_id', 'user', 'sold_on', 'amount', 'currency', 'created_at')
+    list_filter = (
+        'currency',
+        ('sold_on', DateDrillDownListFilter),
+        ('user', AutocompleteListFilter),
+    )
+    list_select_related = ('user',)
+    search_fields = ('external_id',)
+    ordering = ('-sold_on',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at',)
+
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('user')
+
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    """為替レート管理画面"""
+    list_display = ('month', 'currency', 'rate', 'updated_at')
+    list_filter = ('currency', 'month')
+    ordering = ('-month', 'currency')
+
+
+class IncentiveTierInline(admin.TabularInline):
+    model = IncentiveTier
+    extra = 1
+
+
+class IncentiveCampaignInline(admin.TabularInline):
+    model = IncentiveCampaign
+    extra = 0
+
+
+@admin.register(IncentiveRule)
+class IncentiveRuleAdmin(admin.ModelAdmin):
+    """インセンティブルール管理画面"""
+    list_display = ('name', 'cap_points', 'reason', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'description')
+    inlines = [IncentiveTierInline, IncentiveCampaignInline]
+
+    actions = ['evaluate_last_month']
+
+    def evaluate_last_month(self, request, queryset):
+        """選択したルールで前月分のポイントを算出する"""
+        period_end = date.today().replace(day=1) - timedelta(days=1)
+        period_start = period_end.replace(day=1)
+        for rule in queryset.filter(is_active=True):
+            try:
+                run = IncentiveRun.evaluate(rule, period_start, period_end, created_by=request.user)
+            except ValueError as e:
+                self.message_user(request, f'{rule}: {e}', level=messages.ERROR)
+                continue
+            self.message_user(
+                request, f'{run}: {run.user_count}名・{run.total_points}ポイントを算出しました（売上明細 {run.sales_lines}件）。'
+            )
+    evaluate_last_month.short_description = '選択したルールで前月分のポイントを算出する'
+
+
+@admin.register(IncentiveRun)
+class IncentiveRunAdmin(admin.ModelAdmin):
+    """インセンティブ算出管理画面"""
+    list_display = (
+        'rule', 'period_start', 'period_end', 'status', 'sales_lines', 'user_count',
+        'total_points', 'evaluated_at', 'granted_at'
+    )
+    list_filter = ('status', 'rule')
+    list_select_related = ('rule',)
+    readonly_fields = (
+        'rule', 'period_start', 'period_end', 'status', 'sales_lines', 'user_count',
+        'total_points', 'evaluated_at', 'granted_at', 'created_by'
+    )
+
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('rule')
+
+    def has_add_permission(self, request):
+        """追加権限なし（算出は evaluate_incentives コマンド・ルールのアクションで行う）"""
+        return False
+
+    actions = ['grant_runs']
+
+    def grant_runs(self, request, queryset):
+        """選択した算出結果のポイントを付与する"""
+        for run in queryset.filter(status__in=['evaluated', 'granting']):
+            job, created = run.enqueue_grant(created_by=request.user)
+            if created:
+                self.message_user(request, f'{run} の付与をジョブ #{job.id} として受け付けました。')
+            else:
+                self.message_user(
+                    request, f'{run} はジョブ #{job.id} で付与待ち・付与中です。', level=messages.WARNING
+                )
+    grant_runs.short_description = '選択した算出結果のポイントを付与する'
+
+
+@admin.register(IncentiveRunResult)
+class IncentiveRunResultAdmin(admin.ModelAdmin):
+    """インセンティブ算出結果管理画面"""
+    list_display = ('run', 'user', 'sales_amount', 'points_before_cap', 'points', 'granted')
+    list_filter = ('granted', 'run__rule')
+    list_select_related = ('run__rule', 'user')
+    search_fields = ('user__username', 'user__full_name')
+    raw_id_fields = ('run', 'user')
+
+    def get_queryset(self, request):
+        """クエリセット最適化"""
+        return super().get_queryset(request).select_related('run__rule', 'user')
+
+    def has_add_permission(self, request):
+        """追加権限なし（算出処理が作成する）"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """変更権限なし（算出処理が作成する）"""
+        return False
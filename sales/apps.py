@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SalesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sales'
+    verbose_name = '売上インセンティブ'
+
+    def ready(self):
+        from . import signals  # noqa: F401
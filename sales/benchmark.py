@@ -0,0 +1,155 @@
+"""
+インセンティブ算出のベンチマーク（manage.py bench_incentives から利用）
+
+合成の売上明細（複数通貨・複数月）とルールを投入し、算出処理を繰り返し計測する。
+合成データの明細ID・ユーザー名・ルール名には接頭辞を付け、計測後にまとめて削除する。
+"""
+import random
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+
+from accounts.models import User
+from points.benchmark import measure
+from .engine import _months, evaluate_rule
+from .models import FxRate, IncentiveCampaign, IncentiveRule, IncentiveRun, IncentiveTier, SalesRecord
+
+# 通貨ごとの (換算レートの目安, 1明細の金額の範囲)
+CURRENCIES = {
+    'USD': (Decimal('150'), (10, 2000)),
+    'EUR': (Decimal('160'), (10, 2000)),
+    'SGD': (Decimal('110'), (10, 3000)),
+    'THB': (Decimal('4.2'), (300, 60000)),
+}
+TIERS = [(0, '0.01'), (500000, '0.02'), (2000000, '0.03')]
+
+
+class SalesBenchmarkDataset:
+    """ベンチマーク用の合成売上データ"""
+
+    def __init__(self, prefix='bench_sales_', lines=1000000, users=10000, months=3, seed=42):
+        self.prefix = prefix
+        self.lines = lines
+        self.users = users
+        self.months = months
+        self.seed = seed
+        self.random = random.Random(seed)
+        # 前月までの months ヶ月
+        period_end = date.today().replace(day=1)
+        period_start = period_end
+        for _ in range(months):
+            period_start = date(period_start.year - (period_start.month == 1), (period_start.month - 2) % 12 + 1, 1)
+        self.period_start = period_start
+        self.period_end = date.fromordinal(period_end.toordinal() - 1)
+        self.rule_name = f'{prefix}rule'
+        self.fx_rate_ids = []
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'users': self.users,
+            'months': self.months,
+            'period_start': self.period_start.isoformat(),
+            'period_end': self.period_end.isoformat(),
+            'currencies': len(CURRENCIES) + 1,
+            'seed': self.seed,
+        }
+
+    def user_queryset(self):
+        return User.objects.filter(username__startswith=self.prefix)
+
+    def cleanup(self):
+        """合成データを削除"""
+        SalesRecord.objects.filter(external_id__startswith=self.prefix).delete()
+        IncentiveRun.objects.filter(rule__name=self.rule_name).delete()
+        IncentiveRule.objects.filter(name=self.rule_name).delete()
+        self.user_queryset().delete()
+        for fx_rate in FxRate.objects.filter(id__in=self.fx_rate_ids):
+            fx_rate.delete()
+        self.fx_rate_ids = []
+
+    def create(self):
+        """合成データを投入してルールを返す"""
+        User.objects.bulk_create([
+            User(
+                username=f'{self.prefix}{index:06d}',
+                email=f'{self.prefix}{index:06d}@bench.invalid',
+                full_name=f'ベンチマーク {index:06d}',
+                password='!',
+            )
+            for index in range(self.users)
+        ], batch_size=1000)
+        user_ids = list(self.user_queryset().order_by('id').values_list('id', flat=True))
+
+        self._create_fx_rates()
+        days = (self.period_end - self.period_start).days + 1
+        currencies = list(CURRENCIES) + [None]  # None は基準通貨
+        records = (self._record(index, user_ids, days, currencies) for index in range(self.lines))
+        while True:
+            batch = list(islice(records, 5000))
+            if not batch:
+                break
+            SalesRecord.objects.bulk_create(batch)
+
+        rule = IncentiveRule.objects.create(name=self.rule_name, cap_points=50000)
+        IncentiveTier.objects.bulk_create([
+            IncentiveTier(rule=rule, threshold=threshold, rate=Decimal(rate)) for threshold, rate in TIERS
+        ])
+        IncentiveCampaign.objects.create(
+            rule=rule, name='ベンチマーク', start_date=self.period_start,
+            end_date=self.period_start.replace(day=10), multiplier=Decimal('1.5'),
+        )
+        return rule
+
+    def _record(self, index, user_ids, days, currencies):
+        currency = self.random.choice(currencies)
+        low, high = CURRENCIES[currency][1] if currency else (1000, 300000)
+        return SalesRecord(
+            external_id=f'{self.prefix}{index:08d}',
+            user_id=self.random.choice(user_ids),
+            sold_on=date.fromordinal(self.period_start.toordinal() + self.random.randrange(days)),
+            amount=Decimal(self.random.randrange(low * 100, high * 100)) / 100,
+            currency=currency or settings.SALES_BASE_CURRENCY,
+        )
+
+    def _create_fx_rates(self):
+        """登録されていない通貨・月の為替レートを作成（削除対象として記録する）"""
+        for month, _, _ in _months(self.period_start, self.period_end):
+            existing = set(FxRate.objects.filter(month=month).values_list('currency', flat=True))
+            for currency, (rate, _) in CURRENCIES.items():
+                if currency not in existing:
+                    jitter = Decimal(self.random.randrange(95, 106)) / 100
+                    self.fx_rate_ids.append(FxRate.objects.create(currency=currency, month=month, rate=rate * jitter).id)
+
+
+class SalesBenchmarkRunner:
+    """合成データに対してインセンティブ算出を計測する"""
+
+    def __init__(self, dataset, iterations=5, warmup=1, stdout=None):
+        self.dataset = dataset
+        self.iterations = iterations
+        self.warmup = warmup
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self):
+        rule = self.dataset.create()
+        try:
+            start, end = self.dataset.period_start, self.dataset.period_end
+            cases = {
+                'evaluate_rule': lambda: evaluate_rule(rule, start, end),
+                'evaluate_and_save': lambda: IncentiveRun.evaluate(rule, start, end),
+            }
+            results = {}
+            for name, func in cases.items():
+                self.log(f'計測中: {name}')
+                results[name] = measure(func, self.iterations, self.warmup)
+                results[name]['lines_per_sec'] = round(self.dataset.lines / (results[name]['p50_ms'] / 1000))
+            return results
+        finally:
+            self.dataset.cleanup()
@@ -0,0 +1,130 @@
+"""
+売上実績からのポイント算出
+
+期間内の売上明細は DB 側で (ユーザー, 通貨, 月, キャンペーン倍率) ごとに集計し、
+Python では集計後の行に為替レート（月ごとにキャッシュ）と倍率を掛けてユーザー別に合算する。
+段階レートは下限ごとの累計ポイントを先に計算した表を二分探索して適用するため、
+明細の件数が増えても Python 側の処理量はユーザー数・通貨数・月数にしか比例しない。
+"""
+from bisect import bisect_right
+from datetime import date
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, DateField, DecimalField, Sum, Value, When
+
+from .models import FxRate, SalesRecord
+
+CENT = Decimal('0.01')
+
+
+class TierTable:
+    """段階レートの表（下限ごとの累計ポイントを保持する）"""
+
+    def __init__(self, tiers):
+        tiers = sorted((Decimal(threshold), Decimal(rate)) for threshold, rate in tiers)
+        if not tiers or tiers[0][0] != 0:
+            # 最初の下限未満の売上はポイントの対象外
+            tiers.insert(0, (Decimal('0'), Decimal('0')))
+        self.thresholds = [threshold for threshold, _ in tiers]
+        self.rates = [rate for _, rate in tiers]
+        self.cumulative = [Decimal('0')]
+        for index in range(1, len(tiers)):
+            width = self.thresholds[index] - self.thresholds[index - 1]
+            self.cumulative.append(self.cumulative[-1] + width * self.rates[index - 1])
+
+    @classmethod
+    def for_rule(cls, rule):
+        return cls(rule.tiers.values_list('threshold', 'rate'))
+
+    def points(self, amount):
+        """売上額に対するポイント（1ポイント未満切り捨て）"""
+        if amount <= 0:
+            return 0
+        index = bisect_right(self.thresholds, amount) - 1
+        points = self.cumulative[index] + (amount - self.thresholds[index]) * self.rates[index]
+        return int(points.to_integral_value(rounding=ROUND_DOWN))
+
+
+class Evaluation:
+    """算出結果（results は (ユーザーID, 対象売上, 上限適用前ポイント, 付与ポイント) のリスト）"""
+
+    def __init__(self, results, sales_lines):
+        self.results = results
+        self.sales_lines = sales_lines
+
+
+def _months(period_start, period_end):
+    """期間に含まれる月の (月初日, 期間内の開始日, 期間内の終了日)"""
+    month = period_start.replace(day=1)
+    while month <= period_end:
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        yield month, max(month, period_start), min(date.fromordinal(next_month.toordinal() - 1), period_end)
+        month = next_month
+
+
+def aggregate_sales(rule, period_start, period_end):
+    """
+    期間内の売上を (ユーザー, 通貨, 月, 倍率) ごとに集計したクエリセット
+
+    月・倍率は日付の範囲条件の CASE 式で求める（DB の関数を明細ごとに呼ばない）。
+    キャンペーンが重なる日は、倍率の高いものから順に評価して最初に一致したものを使う。
+    """
+    months = list(_months(period_start, period_end))
+    month_expression = Case(
+        *[When(sold_on__range=(start, end), then=Value(month)) for month, start, end in months],
+        output_field=DateField(),
+    )
+    campaigns = rule.campaigns.filter(start_date__lte=period_end, end_date__gte=period_start).order_by('-multiplier')
+    multiplier_expression = Case(
+        *[When(sold_on__range=(campaign.start_date, campaign.end_date), then=Value(campaign.multiplier))
+          for campaign in campaigns],
+        default=Value(Decimal('1')),
+        output_field=DecimalField(max_digits=5, decimal_places=2),
+    )
+    return SalesRecord.objects.filter(sold_on__gte=period_start, sold_on__lte=period_end).annotate(
+        month=month_expression,
+        multiplier=multiplier_expression,
+    ).values('user_id', 'currency', 'month', 'multiplier').annotate(
+        total=Sum('amount'),
+        lines=Count('id'),
+    ).order_by()
+
+
+def evaluate_rule(rule, period_start, period_end):
+    """
+    ルールを期間の売上に適用してユーザー別のポイントを算出
+
+    為替レートが登録されていない通貨・月がある場合は ValueError。管理者の売上は対象外。
+    """
+    tier_table = TierTable.for_rule(rule)
+    admin_ids = set(get_user_model().objects.filter(is_admin=True).values_list('id', flat=True))
+
+    rates_by_month = {}
+    missing = set()
+    sales = {}
+    sales_lines = 0
+    for row in aggregate_sales(rule, period_start, period_end).iterator():
+        sales_lines += row['lines']
+        if row['user_id'] in admin_ids:
+            continue
+        month = row['month']
+        if month not in rates_by_month:
+            rates_by_month[month] = FxRate.get_rates(month)
+        rate = rates_by_month[month].get(row['currency'])
+        if rate is None:
+            missing.add(f'{month:%Y-%m} {row["currency"]}')
+            continue
+        amount = Decimal(row['total']).quantize(CENT, rounding=ROUND_HALF_UP) * rate * row['multiplier']
+        sales[row['user_id']] = sales.get(row['user_id'], Decimal('0')) + amount
+
+    if missing:
+        raise ValueError('為替レートが登録されていません: ' + ', '.join(sorted(missing)))
+
+    results = []
+    for user_id in sorted(sales):
+        sales_amount = sales[user_id].quantize(CENT, rounding=ROUND_HALF_UP)
+        points_before_cap = tier_table.points(sales_amount)
+        points = points_before_cap if rule.cap_points is None else min(points_before_cap, rule.cap_points)
+        results.append((user_id, sales_amount, points_before_cap, points))
+    return Evaluation(results, sales_lines)
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from points.benchmark import environment_info
+from sales.benchmark import SalesBenchmarkDataset, SalesBenchmarkRunner
+
+
+class Command(BaseCommand):
+    """インセンティブ算出のベンチマークコマンド"""
+    help = '合成の売上明細を投入してインセンティブ算出を計測し、結果を JSON で出力します（計測後に合成データは削除されます）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=1000000, help='売上明細数（デフォルト: 1000000）')
+        parser.add_argument('--users', type=int, default=10000, help='ユーザー数（デフォルト: 10000）')
+        parser.add_argument('--months', type=int, default=3, help='対象期間の月数（前月まで。デフォルト: 3）')
+        parser.add_argument('--iterations', type=int, default=5, help='計測回数（デフォルト: 5）')
+        parser.add_argument('--warmup', type=int, default=1, help='ウォームアップ回数（デフォルト: 1）')
+        parser.add_argument('--seed', type=int, default=42, help='乱数シード（デフォルト: 42）')
+        parser.add_argument('--prefix', default='bench_sales_', help='合成データの接頭辞（デフォルト: bench_sales_）')
+        parser.add_argument('-o', '--output', help='結果の JSON を書き出すファイル')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['lines'] < 1 or options['months'] < 1:
+            raise CommandError('--lines・--users・--months は1以上を指定してください')
+        dataset = SalesBenchmarkDataset(
+            prefix=options['prefix'],
+            lines=options['lines'],
+            users=options['users'],
+            months=options['months'],
+            seed=options['seed'],
+        )
+        if dataset.user_queryset().exists():
+            # 前回の中断で残った合成データ（為替レートは登録済みのものと区別できないため残る）
+            self.stdout.write(self.style.WARNING('前回の合成データが残っているため削除します'))
+            dataset.cleanup()
+
+        runner = SalesBenchmarkRunner(
+            dataset, iterations=options['iterations'], warmup=options['warmup'], stdout=self.stdout
+        )
+        self.stdout.write('合成データを投入しています...')
+        results = runner.run()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': environment_info(),
+            'dataset': dataset.as_dict(),
+            'settings': {'iterations': options['iterations'], 'warmup': options['warmup']},
+            'results': results,
+        }
+
+        self.stdout.write(f'{"処理":<22}{"p50(ms)":>12}{"p95(ms)":>12}{"クエリ":>8}{"明細/秒":>12}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<22}{result["p50_ms"]:>12.1f}{result["p95_ms"]:>12.1f}'
+                f'{result["queries"]:>8}{result["lines_per_sec"]:>12}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'結果を {options["output"]} に出力しました。'))
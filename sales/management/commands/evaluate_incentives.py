@@ -0,0 +1,66 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.models import IncentiveRule, IncentiveRun, _month_end
+
+
+class Command(BaseCommand):
+    """売上インセンティブの算出コマンド"""
+    help = (
+        '売上実績にインセンティブルールを適用して、ユーザー別の付与ポイントを算出します。'
+        '--grant を指定すると算出後にそのまま付与します'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('rule', help='ルール名')
+        parser.add_argument('--period', metavar='YYYY-MM', help='対象月（省略時は前月）')
+        parser.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD', help='対象期間の開始日')
+        parser.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD', help='対象期間の終了日')
+        parser.add_argument('--grant', action='store_true', help='算出後にポイントを付与する')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='付与時に1トランザクションで処理するユーザー数（デフォルト: 1000）',
+        )
+
+    def handle(self, *args, **options):
+        rule = IncentiveRule.objects.filter(name=options['rule']).first()
+        if rule is None:
+            raise CommandError(f'ルールが見つかりません: {options["rule"]}')
+        period_start, period_end = self._get_period(options)
+
+        try:
+            run = IncentiveRun.evaluate(rule, period_start, period_end)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f'{run}: 売上明細 {run.sales_lines}件・対象 {run.user_count}名・{run.total_points}ポイントを算出しました'
+        )
+
+        if options['grant']:
+            granted = run.grant(
+                chunk_size=options['chunk_size'],
+                on_progress=lambda granted: self.stdout.write(f'{granted}名に付与済み'),
+            )
+            self.stdout.write(self.style.SUCCESS(f'{run}: {granted}名にポイントを付与しました'))
+
+    def _get_period(self, options):
+        try:
+            if options['date_from'] or options['date_to']:
+                if not (options['date_from'] and options['date_to']):
+                    raise CommandError('--from と --to は両方指定してください。')
+                period_start = datetime.strptime(options['date_from'], '%Y-%m-%d').date()
+                period_end = datetime.strptime(options['date_to'], '%Y-%m-%d').date()
+            elif options['period']:
+                period_start = datetime.strptime(options['period'], '%Y-%m').date()
+                period_end = _month_end(period_start)
+            else:
+                period_end = date.fromordinal(date.today().replace(day=1).toordinal() - 1)
+                period_start = period_end.replace(day=1)
+        except ValueError:
+            raise CommandError('日付の形式が正しくありません。')
+        if period_start > period_end:
+            raise CommandError('開始日が終了日より後になっています。')
+        return period_start, period_end
@@ -0,0 +1,161 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, verbose_name='通貨')),
+                ('month', models.DateField(help_text='月の1日を指定', verbose_name='対象月')),
+                ('rate', models.DecimalField(decimal_places=8, help_text='1通貨単位あたりの基準通貨額', max_digits=18, verbose_name='換算レート')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '為替レート',
+                'verbose_name_plural': '為替レート',
+                'db_table': 'fx_rates',
+                'ordering': ['-month', 'currency'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IncentiveRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='ルール名')),
+                ('description', models.TextField(blank=True, verbose_name='説明')),
+                ('cap_points', models.PositiveIntegerField(blank=True, help_text='1人・1期間あたり', null=True, verbose_name='上限ポイント')),
+                ('reason', models.CharField(default='{period} 売上インセンティブ', help_text='{period} は対象期間に置き換え', max_length=150, verbose_name='付与理由')),
+                ('is_active', models.BooleanField(default=True, verbose_name='有効')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'インセンティブルール',
+                'verbose_name_plural': 'インセンティブルール',
+                'db_table': 'incentive_rules',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IncentiveRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='対象期間（開始）')),
+                ('period_end', models.DateField(verbose_name='対象期間（終了）')),
+                ('status', models.CharField(choices=[('evaluated', '算出済み'), ('granting', '付与中'), ('granted', '付与済み')], default='evaluated', max_length=20, verbose_name='状態')),
+                ('sales_lines', models.PositiveIntegerField(default=0, verbose_name='売上明細数')),
+                ('user_count', models.PositiveIntegerField(default=0, verbose_name='対象ユーザー数')),
+                ('total_points', models.PositiveBigIntegerField(default=0, verbose_name='付与ポイント合計')),
+                ('evaluated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='算出日時')),
+                ('granted_at', models.DateTimeField(blank=True, null=True, verbose_name='付与日時')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incentive_runs', to=settings.AUTH_USER_MODEL, verbose_name='実行者')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='runs', to='sales.incentiverule', verbose_name='ルール')),
+            ],
+            options={
+                'verbose_name': 'インセンティブ算出',
+                'verbose_name_plural': 'インセンティブ算出',
+                'db_table': 'incentive_runs',
+                'ordering': ['-period_start', 'rule'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(help_text='連携元の明細ID', max_length=100, unique=True, verbose_name='明細ID')),
+                ('sold_on', models.DateField(verbose_name='売上日')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='金額')),
+                ('currency', models.CharField(help_text='ISO 4217 の通貨コード', max_length=3, verbose_name='通貨')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_records', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '売上実績',
+                'verbose_name_plural': '売上実績',
+                'db_table': 'sales_records',
+            },
+        ),
+        migrations.CreateModel(
+            name='IncentiveTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='下限（基準通貨）')),
+                ('rate', models.DecimalField(decimal_places=6, help_text='基準通貨1単位あたりのポイント', max_digits=10, verbose_name='ポイント換算率')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiers', to='sales.incentiverule', verbose_name='ルール')),
+            ],
+            options={
+                'verbose_name': '段階レート',
+                'verbose_name_plural': '段階レート',
+                'db_table': 'incentive_tiers',
+                'ordering': ['threshold'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IncentiveRunResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_amount', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='対象売上（基準通貨・倍率適用後）')),
+                ('points_before_cap', models.PositiveIntegerField(verbose_name='上限適用前ポイント')),
+                ('points', models.PositiveIntegerField(verbose_name='付与ポイント')),
+                ('granted', models.BooleanField(default=False, verbose_name='付与済み')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='sales.incentiverun', verbose_name='算出')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incentive_results', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'インセンティブ算出結果',
+                'verbose_name_plural': 'インセンティブ算出結果',
+                'db_table': 'incentive_run_results',
+            },
+        ),
+        migrations.CreateModel(
+            name='IncentiveCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='キャンペーン名')),
+                ('start_date', models.DateField(verbose_name='開始日')),
+                ('end_date', models.DateField(verbose_name='終了日')),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='倍率')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='sales.incentiverule', verbose_name='ルール')),
+            ],
+            options={
+                'verbose_name': 'キャンペーン',
+                'verbose_name_plural': 'キャンペーン',
+                'db_table': 'incentive_campaigns',
+                'ordering': ['start_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.UniqueConstraint(fields=('currency', 'month'), name='unique_fx_rate'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['sold_on', 'user', 'currency', 'amount'], name='sales_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='incentivetier',
+            constraint=models.UniqueConstraint(fields=('rule', 'threshold'), name='unique_incentive_tier'),
+        ),
+        migrations.AddConstraint(
+            model_name='incentiverunresult',
+            constraint=models.UniqueConstraint(fields=('run', 'user'), name='unique_incentive_run_result'),
+        ),
+        migrations.AddConstraint(
+            model_name='incentiverun',
+            constraint=models.UniqueConstraint(fields=('rule', 'period_start', 'period_end'), name='unique_incentive_run'),
+        ),
+    ]
@@ -0,0 +1,324 @@
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+
+
+class SalesRecord(models.Model):
+    """売上実績（海外拠点の売上明細）"""
+    external_id = models.CharField('明細ID', max_length=100, unique=True, help_text='連携元の明細ID')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='ユーザー',
+        related_name='sales_records'
+    )
+    sold_on = models.DateField('売上日')
+    amount = models.DecimalField('金額', max_digits=14, decimal_places=2)
+    currency = models.CharField('通貨', max_length=3, help_text='ISO 4217 の通貨コード')
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '売上実績'
+        verbose_name_plural = '売上実績'
+        db_table = 'sales_records'
+        indexes = [
+            # 期間の集計（sales.engine）用。集計に使う列まで含めてテーブルを読まずに集計できるようにする
+            models.Index(fields=['sold_on', 'user', 'currency', 'amount'], name='sales_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.external_id} {self.amount} {self.currency}"
+
+
+class FxRate(models.Model):
+    """為替レート（月ごと・基準通貨への換算レート）"""
+    currency = models.CharField('通貨', max_length=3)
+    month = models.DateField('対象月', help_text='月の1日を指定')
+    rate = models.DecimalField('換算レート', max_digits=18, decimal_places=8, help_text='1通貨単位あたりの基準通貨額')
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = '為替レート'
+        verbose_name_plural = '為替レート'
+        db_table = 'fx_rates'
+        ordering = ['-month', 'currency']
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'month'], name='unique_fx_rate'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.currency} {self.rate}"
+
+    @staticmethod
+    def _cache_key(month):
+        return f'sales:fx_rates:{month:%Y-%m}'
+
+    @classmethod
+    def get_rates(cls, month):
+        """対象月の {通貨: 換算レート}（基準通貨は1。キャッシュ経由）"""
+        month = month.replace(day=1)
+        rates = cache.get(cls._cache_key(month))
+        if rates is None:
+            rates = dict(cls.objects.filter(month=month).values_list('currency', 'rate'))
+            cache.set(cls._cache_key(month), rates, getattr(settings, 'FX_RATE_CACHE_TTL', 3600))
+        return {settings.SALES_BASE_CURRENCY: Decimal('1'), **rates}
+
+    @classmethod
+    def invalidate(cls, month):
+        cache.delete(cls._cache_key(month))
+
+
+class IncentiveRule(models.Model):
+    """
+    売上からポイントを算出するルール
+
+    期間内の売上（基準通貨換算・キャンペーン倍率適用後）の合計に段階レートを適用し、
+    1人あたりの上限で切り詰めたものを付与ポイントとする。
+    """
+    name = models.CharField('ルール名', max_length=100, unique=True)
+    description = models.TextField('説明', blank=True)
+    cap_points = models.PositiveIntegerField('上限ポイント', null=True, blank=True, help_text='1人・1期間あたり')
+    reason = models.CharField(
+        '付与理由', max_length=150, default='{period} 売上インセンティブ', help_text='{period} は対象期間に置き換え'
+    )
+    is_active = models.BooleanField('有効', default=True)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = 'インセンティブルール'
+        verbose_name_plural = 'インセンティブルール'
+        db_table = 'incentive_rules'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class IncentiveTier(models.Model):
+    """段階レート（下限を超えた部分に適用する）"""
+    rule = models.ForeignKey(IncentiveRule, on_delete=models.CASCADE, related_name='tiers', verbose_name='ルール')
+    threshold = models.DecimalField('下限（基準通貨）', max_digits=16, decimal_places=2, default=0)
+    rate = models.DecimalField('ポイント換算率', max_digits=10, decimal_places=6, help_text='基準通貨1単位あたりのポイント')
+
+    class Meta:
+        verbose_name = '段階レート'
+        verbose_name_plural = '段階レート'
+        db_table = 'incentive_tiers'
+        ordering = ['threshold']
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'threshold'], name='unique_incentive_tier'),
+        ]
+
+    def __str__(self):
+        return f"{self.threshold}〜: {self.rate}"
+
+
+class IncentiveCampaign(models.Model):
+    """キャンペーン（期間中の売上に倍率を掛ける。重なる場合は最も高い倍率を適用）"""
+    rule = models.ForeignKey(IncentiveRule, on_delete=models.CASCADE, related_name='campaigns', verbose_name='ルール')
+    name = models.CharField('キャンペーン名', max_length=100)
+    start_date = models.DateField('開始日')
+    end_date = models.DateField('終了日')
+    multiplier = models.DecimalField('倍率', max_digits=5, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'キャンペーン'
+        verbose_name_plural = 'キャンペーン'
+        db_table = 'incentive_campaigns'
+        ordering = ['start_date']
+
+    def __str__(self):
+        return f"{self.name}（×{self.multiplier}）"
+
+
+class IncentiveRun(models.Model):
+    """ルールの期間ごとの算出結果（付与前に確認し、付与は1期間につき1回）"""
+    STATUS_CHOICES = [
+        ('evaluated', '算出済み'),
+        ('granting', '付与中'),
+        ('granted', '付与済み'),
+    ]
+
+    rule = models.ForeignKey(IncentiveRule, on_delete=models.PROTECT, related_name='runs', verbose_name='ルール')
+    period_start = models.DateField('対象期間（開始）')
+    period_end = models.DateField('対象期間（終了）')
+    status = models.CharField('状態', max_length=20, choices=STATUS_CHOICES, default='evaluated')
+    sales_lines = models.PositiveIntegerField('売上明細数', default=0)
+    user_count = models.PositiveIntegerField('対象ユーザー数', default=0)
+    total_points = models.PositiveBigIntegerField('付与ポイント合計', default=0)
+    evaluated_at = models.DateTimeField('算出日時', default=timezone.now)
+    granted_at = models.DateTimeField('付与日時', null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='incentive_runs',
+        verbose_name='実行者'
+    )
+
+    class Meta:
+        verbose_name = 'インセンティブ算出'
+        verbose_name_plural = 'インセンティブ算出'
+        db_table = 'incentive_runs'
+        ordering = ['-period_start', 'rule']
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'period_start', 'period_end'], name='unique_incentive_run'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} {self.period_label}"
+
+    @property
+    def period_label(self):
+        if self.period_start.day == 1 and self.period_end == _month_end(self.period_start):
+            return f'{self.period_start:%Y年%m月}'
+        return f'{self.period_start:%Y/%m/%d}〜{self.period_end:%Y/%m/%d}'
+
+    @property
+    def reason(self):
+        return self.rule.reason.replace('{period}', self.period_label)[:200]
+
+    @classmethod
+    def evaluate(cls, rule, period_start, period_end, created_by=None):
+        """
+        期間の売上からポイントを算出して結果を保存（付与済みの期間は再算出しない）
+
+        算出は sales.engine で行い、ユーザー別の結果を一括INSERTする。
+        """
+        from .engine import evaluate_rule
+
+        with transaction.atomic():
+            run, created = cls.objects.select_for_update().get_or_create(
+                rule=rule, period_start=period_start, period_end=period_end,
+                defaults={'created_by': created_by}
+            )
+            if run.status != 'evaluated':
+                raise ValueError(f'{run} は{run.get_status_display()}のため再算出できません。')
+
+            evaluation = evaluate_rule(rule, period_start, period_end)
+            run.results.all().delete()
+            IncentiveRunResult.objects.bulk_create([
+                IncentiveRunResult(
+                    run=run,
+                    user_id=user_id,
+                    sales_amount=sales_amount,
+                    points_before_cap=points_before_cap,
+                    points=points,
+                )
+                for user_id, sales_amount, points_before_cap, points in evaluation.results
+            ], batch_size=1000)
+
+            run.sales_lines = evaluation.sales_lines
+            run.user_count = len(evaluation.results)
+            run.total_points = sum(result[3] for result in evaluation.results)
+            run.evaluated_at = timezone.now()
+            run.created_by = created_by or run.created_by
+            run.save()
+        return run
+
+    def enqueue_grant(self, created_by=None):
+        """
+        付与をバックグラウンドジョブとして登録
+
+        待機中・実行中の付与ジョブがある場合は登録せずにそのジョブを返す。
+        戻り値は (ジョブ, 新規に登録したか)。
+        """
+        from jobs.models import Job
+
+        with transaction.atomic():
+            # 同じ算出の登録を直列化する
+            status = IncentiveRun.objects.select_for_update().filter(id=self.id).values_list('status', flat=True).get()
+            if status == 'granted':
+                raise ValueError(f'{self} は付与済みです。')
+            active = Job.objects.filter(
+                name='sales.grant_incentive_run', payload__run_id=self.id, status__in=['queued', 'running']
+            ).order_by('id').first()
+            if active:
+                return active, False
+            return Job.enqueue('sales.grant_incentive_run', {'run_id': self.id}, created_by=created_by), True
+
+    def grant(self, chunk_size=1000, on_progress=None):
+        """
+        算出結果のポイントを付与
+
+        付与済みの印と付与をチャンクごとに同じトランザクションで記録するため、
+        中断した場合は未付与の結果から再開する。チャンクの行はロックし（SKIP LOCKED）、
+        付与済みの印も未付与を条件に更新するため、同じ算出を複数のジョブが処理しても二重に付与しない。
+        付与した人数を返す。
+        """
+        from points.models import Point
+
+        updated = IncentiveRun.objects.filter(id=self.id, status__in=['evaluated', 'granting']).update(
+            status='granting'
+        )
+        if not updated:
+            raise ValueError(f'{self} は付与済みです。')
+
+        pending = self.results.filter(granted=False, points__gt=0)
+        reason = self.reason
+        granted = 0
+        last_user_id = 0
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    pending.select_for_update(skip_locked=True).filter(user_id__gt=last_user_id).order_by(
+                        'user_id'
+                    ).values_list('id', 'user_id', 'points')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                claimed = IncentiveRunResult.objects.filter(
+                    id__in=[result_id for result_id, _, _ in chunk], granted=False
+                ).update(granted=True)
+                if claimed != len(chunk):
+                    # 他のジョブが先に付与した行がある（ロールバックして再試行に任せる）
+                    raise RuntimeError(f'{self} は他のジョブが付与中です。')
+                Point.bulk_grant_rows([(user_id, points, reason) for _, user_id, points in chunk])
+            granted += len(chunk)
+            last_user_id = chunk[-1][1]
+            if on_progress:
+                on_progress(granted)
+
+        # 他のジョブがロック中の行が残っている場合は、そのジョブが付与済みにする
+        if not pending.exists():
+            self.granted_at = timezone.now()
+            if IncentiveRun.objects.filter(id=self.id, status='granting').update(
+                status='granted', granted_at=self.granted_at
+            ):
+                self.status = 'granted'
+        return granted
+
+
+class IncentiveRunResult(models.Model):
+    """インセンティブ算出のユーザー別結果"""
+    run = models.ForeignKey(IncentiveRun, on_delete=models.CASCADE, related_name='results', verbose_name='算出')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='incentive_results',
+        verbose_name='ユーザー'
+    )
+    sales_amount = models.DecimalField('対象売上（基準通貨・倍率適用後）', max_digits=18, decimal_places=2)
+    points_before_cap = models.PositiveIntegerField('上限適用前ポイント')
+    points = models.PositiveIntegerField('付与ポイント')
+    granted = models.BooleanField('付与済み', default=False)
+
+    class Meta:
+        verbose_name = 'インセンティブ算出結果'
+        verbose_name_plural = 'インセンティブ算出結果'
+        db_table = 'incentive_run_results'
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'user'], name='unique_incentive_run_result'),
+        ]
+
+
+def _month_end(day):
+    """月末日"""
+    next_month = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return date.fromordinal(next_month.toordinal() - 1)
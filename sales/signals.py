@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FxRate
+
+
+@receiver(post_save, sender=FxRate)
+@receiver(post_delete, sender=FxRate)
+def invalidate_fx_rates(sender, instance, **kwargs):
+    """為替レート更新時に対象月のキャッシュを無効化（コミット後にも再度無効化）"""
+    FxRate.invalidate(instance.month)
+    transaction.on_commit(lambda: FxRate.invalidate(instance.month))
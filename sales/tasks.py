@@ -0,0 +1,20 @@
+from jobs.registry import register
+from .models import IncentiveRun
+
+
+@register('sales.grant_incentive_run')
+def grant_incentive_run(job, run_id, chunk_size=1000):
+    """
+    インセンティブ算出結果の付与
+
+    付与済みの印をチャンクごとに付与と同じトランザクションで記録するため、
+    中断・再試行した場合は未付与のユーザーから再開する。
+    """
+    run = IncentiveRun.objects.select_related('rule').get(id=run_id)
+    done = run.results.filter(granted=True).count()
+    job.set_progress(done, total=run.results.filter(points__gt=0).count(), message='付与中')
+    granted = run.grant(
+        chunk_size=chunk_size,
+        on_progress=lambda granted: job.set_progress(done + granted, message=f'{done + granted}名に付与済み'),
+    )
+    return {'run': str(run), 'granted_users': done + granted, 'total_points': run.total_points}
@@ -1,30 +1,34 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PointTransaction
+from incentive_system.admin_scale import AutocompleteListFilter, DateDrillDownListFilter, ScaleModeAdminMixin
+from .models import DailyPointStats, PointTransaction
 
 
 @admin.register(PointTransaction)
-class PointTransactionAdmin(admin.ModelAdmin):
+class PointTransactionAdmin(ScaleModeAdminMixin, admin.ModelAdmin):
     """ポイント取引履歴管理画面"""
     list_display = (
         'created_at', 'user', 'get_transaction_type_display', 'category',
         'get_amount_display', 'balance_after', 'reason'
     )
     list_filter = (
-        'transaction_type', 'category', 'created_at',
-        ('user', admin.RelatedOnlyFieldListFilter)
+        'transaction_type',
+        ('category', AutocompleteListFilter),
+        ('created_at', DateDrillDownListFilter),
+        ('user', AutocompleteListFilter),
     )
+    list_select_related = ('user', 'category')
     search_fields = ('user__username', 'user__full_name', 'reason')
     ordering = ('-created_at',)
     readonly_fields = (
         'user', 'transaction_type', 'category', 'amount', 'balance_after',
-        'reason', 'related_point_id', 'related_product_id', 'related_exchange_id',
+        'sequence', 'reason', 'related_point_id', 'related_product_id', 'related_exchange_id',
         'created_at', 'created_by'
     )
     
     fieldsets = (
         ('取引情報', {
-            'fields': ('user', 'transaction_type', 'category', 'amount', 'balance_after', 'reason')
+            'fields': ('user', 'transaction_type', 'category', 'amount', 'balance_after', 'sequence', 'reason')
         }),
         ('関連情報', {
             'fields': ('related_point_id', 'related_product_id', 'related_exchange_id'),
@@ -59,3 +63,21 @@ class PointTransactionAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """削除権限なし（履歴は削除不可）"""
         return False
+
+
+@admin.register(DailyPointStats)
+class DailyPointStatsAdmin(admin.ModelAdmin):
+    """日次ポイント集計管理画面"""
+    list_display = ('date', 'category', 'granted', 'consumed', 'expired', 'refunded', 'active_users', 'updated_at')
+    list_filter = ('category',)
+    date_hierarchy = 'date'
+    ordering = ('-date', 'category')
+    list_select_related = ('category',)
+    
+    def has_add_permission(self, request):
+        """追加権限なし（rollup_point_statsコマンドで作成）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限なし（集計結果は変更不可）"""
+        return False
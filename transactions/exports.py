@@ -0,0 +1,175 @@
+"""
+ポイント取引履歴・ポイント・商品交換履歴のストリーミング出力
+
+主キーのキーセットで一定件数ずつ取得し、CSV / NDJSON の行として逐次生成する。
+件数に関わらずメモリ使用量は一定で、必要に応じて gzip 圧縮しながら出力する。
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+class ExportSpec:
+    """出力対象の定義"""
+
+    def __init__(self, model_path, columns, date_field, category_field, type_field=None):
+        self.model_path = model_path
+        self.columns = columns
+        self.date_field = date_field
+        self.category_field = category_field
+        self.type_field = type_field
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_path)
+
+
+EXPORTS = {
+    'ledger': ExportSpec(
+        'transactions.PointTransaction',
+        columns=[
+            'id', 'created_at', 'user_id', 'user__username', 'transaction_type',
+            'category__name', 'amount', 'balance_after', 'sequence', 'reason',
+            'related_point_id', 'related_product_id', 'related_exchange_id', 'created_by_id',
+        ],
+        date_field='created_at',
+        category_field='category__name',
+        type_field='transaction_type',
+    ),
+    'lots': ExportSpec(
+        'points.Point',
+        columns=[
+            'id', 'user_id', 'user__username', 'category__name', 'amount',
+            'remaining_amount', 'reason', 'issued_at', 'expires_at', 'is_expired',
+        ],
+        date_field='issued_at',
+        category_field='category__name',
+    ),
+    'exchanges': ExportSpec(
+        'products.ProductExchange',
+        columns=[
+            'id', 'exchange_date', 'user_id', 'user__username', 'product_id',
+            'product__name', 'product__category__name', 'points_used', 'status', 'notes',
+        ],
+        date_field='exchange_date',
+        category_field='product__category__name',
+        type_field='status',
+    ),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _parse_day(value, end=False):
+    """YYYY-MM-DD を日の始まり（end=True の場合は翌日の始まり）の日時に変換"""
+    if not value:
+        return None
+    day = parse_date(value) if isinstance(value, str) else value
+    if day is None:
+        raise ValueError(f'日付の形式が正しくありません: {value}')
+    if end:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_queryset(kind, date_from=None, date_to=None, category=None, type_value=None):
+    """フィルタ条件を適用したクエリセットを作成（date_to は当日を含む）"""
+    spec = EXPORTS[kind]
+    queryset = spec.model.objects.all()
+
+    start = _parse_day(date_from)
+    end = _parse_day(date_to, end=True)
+    if start:
+        queryset = queryset.filter(**{f'{spec.date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{spec.date_field}__lt': end})
+    if category:
+        queryset = queryset.filter(**{spec.category_field: category})
+    if type_value and spec.type_field:
+        queryset = queryset.filter(**{spec.type_field: type_value})
+    return queryset
+
+
+def iter_rows(kind, queryset, chunk_size=2000, window_size=20000):
+    """
+    主キーのキーセットで window_size 件ずつ区切り、各区間を chunk_size 件ずつ
+    サーバーサイドカーソルで読み出して行のタプルを順に返す
+    """
+    columns = EXPORTS[kind].columns
+    last_id = 0
+    while True:
+        window = queryset.filter(id__gt=last_id).order_by('id').values_list(*columns)[:window_size]
+        count = 0
+        for row in window.iterator(chunk_size=chunk_size):
+            yield row
+            last_id = row[0]
+            count += 1
+        if count < window_size:
+            break
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _LineBuffer:
+    """csv.writer の出力をそのまま返す疑似ファイル"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+def iter_ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(columns, (_format_value(value) for value in row))),
+            ensure_ascii=False
+        ) + '\n'
+
+
+def iter_gzip(chunks, flush_size=64 * 1024):
+    """バイト列のチャンクを gzip 圧縮しながら返す"""
+    compressor = zlib.compressobj(wbits=31)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if data:
+            yield data
+        if pending >= flush_size:
+            yield compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+    yield compressor.flush()
+
+
+def stream_export(kind, fmt='csv', compress=False, chunk_size=2000, **filters):
+    """出力内容をバイト列のチャンクとして順に返す"""
+    if kind not in EXPORTS:
+        raise ValueError(f'不明な出力対象です: {kind}')
+    if fmt not in FORMATS:
+        raise ValueError(f'不明な出力形式です: {fmt}')
+
+    columns = EXPORTS[kind].columns
+    rows = iter_rows(kind, build_queryset(kind, **filters), chunk_size=chunk_size)
+    lines = iter_csv(columns, rows) if fmt == 'csv' else iter_ndjson(columns, rows)
+    chunks = (line.encode('utf-8') for line in lines)
+    if compress:
+        chunks = iter_gzip(chunks)
+    return chunks
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.exports import EXPORTS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    """取引履歴・ポイント・商品交換履歴の出力コマンド"""
+    help = '取引履歴・ポイント・商品交換履歴を CSV / NDJSON でストリーミング出力します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=sorted(EXPORTS),
+            default='ledger',
+            help='出力対象（ledger: 取引履歴, lots: ポイント, exchanges: 商品交換履歴）',
+        )
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help='出力形式')
+        parser.add_argument('--gzip', action='store_true', help='gzip 圧縮して出力する')
+        parser.add_argument('--output', '-o', help='出力先ファイル（省略時は標準出力）')
+        parser.add_argument('--date-from', help='開始日（YYYY-MM-DD）')
+        parser.add_argument('--date-to', help='終了日（YYYY-MM-DD、当日を含む）')
+        parser.add_argument('--category', help='カテゴリ名（digital_gift / corporate_product）')
+        parser.add_argument('--type', dest='type_value', help='取引種別（ledger）または状態（exchanges）')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='1回の取得件数')
+
+    def handle(self, *args, **options):
+        try:
+            chunks = stream_export(
+                options['kind'],
+                fmt=options['format'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                category=options['category'],
+                type_value=options['type_value'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from transactions.models import DailyPointStats, PointTransaction
+
+
+class Command(BaseCommand):
+    """日次ポイント集計の作成コマンド"""
+    help = '取引履歴から日次ポイント集計を作成します（デフォルトは前日と当日）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='開始日（YYYY-MM-DD）')
+        parser.add_argument('--date-to', help='終了日（YYYY-MM-DD、当日を含む）')
+        parser.add_argument('--all', action='store_true', help='全期間を再集計する')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+
+        if options['all']:
+            first = PointTransaction.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if first is None:
+                self.stdout.write('取引履歴がありません。')
+                return
+            date_from, date_to = timezone.localtime(first).date(), today
+        else:
+            date_from = self._parse(options['date_from']) or today - timedelta(days=1)
+            date_to = self._parse(options['date_to']) or today
+
+        if date_from > date_to:
+            raise CommandError('開始日は終了日以前を指定してください。')
+
+        # 長期間の再集計でもメモリを抑えるため30日ずつ処理する
+        created = 0
+        start = date_from
+        while start <= date_to:
+            end = min(start + timedelta(days=29), date_to)
+            created += DailyPointStats.rollup(start, end)
+            start = end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{date_from}〜{date_to}の日次集計を{created}件作成しました。'
+        ))
+
+    def _parse(self, value):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'日付の形式が正しくありません: {value}')
+        return parsed
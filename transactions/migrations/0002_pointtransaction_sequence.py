@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:29
+
+from django.db import migrations, models
+
+
+def populate_sequences(apps, schema_editor):
+    """既存の取引履歴にユーザー・カテゴリごとの連番を振り、残高行の最終連番を更新"""
+    PointTransaction = apps.get_model('transactions', 'PointTransaction')
+    UserPointBalance = apps.get_model('points', 'UserPointBalance')
+
+    last_sequences = {}
+    pending = []
+    for transaction in PointTransaction.objects.order_by(
+        'user_id', 'category_id', 'created_at', 'id'
+    ).only('id', 'user_id', 'category_id').iterator(chunk_size=2000):
+        key = (transaction.user_id, transaction.category_id)
+        last_sequences[key] = last_sequences.get(key, 0) + 1
+        transaction.sequence = last_sequences[key]
+        pending.append(transaction)
+        if len(pending) >= 2000:
+            PointTransaction.objects.bulk_update(pending, ['sequence'])
+            pending = []
+    PointTransaction.objects.bulk_update(pending, ['sequence'])
+
+    for (user_id, category_id), last_sequence in last_sequences.items():
+        balance, created = UserPointBalance.objects.get_or_create(
+            user_id=user_id, category_id=category_id
+        )
+        balance.last_sequence = last_sequence
+        balance.save(update_fields=['last_sequence'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0003_userpointbalance_last_sequence'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointtransaction',
+            name='sequence',
+            field=models.PositiveBigIntegerField(help_text='ユーザー・カテゴリごとの取引連番（欠番なし）', null=True, verbose_name='連番'),
+        ),
+        migrations.RunPython(populate_sequences, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pointtransaction',
+            name='sequence',
+            field=models.PositiveBigIntegerField(help_text='ユーザー・カテゴリごとの取引連番（欠番なし）', verbose_name='連番'),
+        ),
+        migrations.AddConstraint(
+            model_name='pointtransaction',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'sequence'), name='unique_point_transaction_sequence'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('points', '0003_userpointbalance_last_sequence'),
+        ('transactions', '0002_pointtransaction_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPointStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日付')),
+                ('granted', models.PositiveBigIntegerField(default=0, verbose_name='付与ポイント数')),
+                ('consumed', models.PositiveBigIntegerField(default=0, verbose_name='交換ポイント数')),
+                ('expired', models.PositiveBigIntegerField(default=0, verbose_name='失効ポイント数')),
+                ('active_users', models.PositiveIntegerField(default=0, verbose_name='取引ユーザー数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='points.pointcategory', verbose_name='カテゴリ')),
+            ],
+            options={
+                'verbose_name': '日次ポイント集計',
+                'verbose_name_plural': '日次ポイント集計',
+                'db_table': 'daily_point_stats',
+                'ordering': ['date', 'category'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailypointstats',
+            constraint=models.UniqueConstraint(fields=('date', 'category'), name='unique_daily_point_stats'),
+        ),
+    ]
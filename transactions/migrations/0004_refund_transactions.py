@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_daily_point_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailypointstats',
+            name='refunded',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='返還ポイント数'),
+        ),
+        migrations.AlterField(
+            model_name='pointtransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('grant', 'ポイント付与'), ('exchange', '商品交換'), ('expire', 'ポイント失効'), ('adjustment', '調整'), ('refund', '交換キャンセル返還')], max_length=20, verbose_name='取引種別'),
+        ),
+    ]
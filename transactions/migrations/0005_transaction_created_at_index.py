@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_refund_transactions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pointtransaction',
+            index=models.Index(fields=['created_at'], name='point_trans_created_71f7c8_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """既存の取引履歴から前日までの日次集計を作成（当日分は管理ダッシュボードが集計する）"""
+    PointTransaction = apps.get_model('transactions', 'PointTransaction')
+    DailyPointStats = apps.get_model('transactions', 'DailyPointStats')
+    tz = timezone.get_current_timezone()
+    today = timezone.localdate()
+
+    rows = PointTransaction.objects.annotate(
+        date=TruncDate('created_at', tzinfo=tz)
+    ).filter(date__lt=today).order_by().values('date', 'category_id').annotate(
+        granted=Sum('amount', filter=Q(transaction_type='grant')),
+        consumed=Sum('amount', filter=Q(transaction_type='exchange')),
+        expired=Sum('amount', filter=Q(transaction_type='expire')),
+        refunded=Sum('amount', filter=Q(transaction_type='refund')),
+        active_users=Count('user_id', distinct=True),
+    )
+
+    DailyPointStats.objects.filter(date__lt=today).delete()
+    DailyPointStats.objects.bulk_create([
+        DailyPointStats(
+            date=row['date'],
+            category_id=row['category_id'],
+            granted=row['granted'] or 0,
+            consumed=-(row['consumed'] or 0),
+            expired=-(row['expired'] or 0),
+            refunded=row['refunded'] or 0,
+            active_users=row['active_users'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_transaction_created_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.conf import settings
+from django.utils import timezone
 from points.models import PointCategory
 
 
@@ -38,6 +43,7 @@ class PointTransaction(models.Model):
         ('exchange', '商品交換'),
         ('expire', 'ポイント失効'),
         ('adjustment', '調整'),
+        ('refund', '交換キャンセル返還'),
     ]
     
     user = models.ForeignKey(
@@ -54,6 +60,7 @@ class PointTransaction(models.Model):
     )
     amount = models.IntegerField('ポイント数')  # 負の値も許可（消費時）
     balance_after = models.PositiveIntegerField('取引後残高')
+    sequence = models.PositiveBigIntegerField('連番', help_text='ユーザー・カテゴリごとの取引連番（欠番なし）')
     reason = models.CharField('理由・説明', max_length=200)
     
     # 関連オブジェクト（オプション）
@@ -82,6 +89,13 @@ class PointTransaction(models.Model):
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['transaction_type', 'created_at']),
             models.Index(fields=['category', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'sequence'],
+                name='unique_point_transaction_sequence'
+            ),
         ]
 
     def __str__(self):
@@ -98,20 +112,33 @@ class PointTransaction(models.Model):
         return self.amount < 0
 
     @classmethod
-    def create_grant_transaction(cls, user, category, amount, reason, point_id=None, created_by=None):
-        """ポイント付与の取引履歴を作成"""
-        from points.models import Point
+    def _append(cls, user, category, transaction_type, amount, reason, **fields):
+        """
+        取引履歴を追記
+        
+        残高行のロック下で連番を払い出し、同一トランザクションで更新済みの残高を
+        取引後残高として記録する（残高の再集計は行わない）。
+        """
+        from points.models import UserPointBalance
         
-        # 現在の残高を計算
-        current_balance = Point.get_user_points_summary(user).get(category.name, 0)
+        balance_after, sequence = UserPointBalance.next_sequence(user, category)
         
         return cls.objects.create(
             user=user,
-            transaction_type='grant',
+            transaction_type=transaction_type,
             category=category,
             amount=amount,
-            balance_after=current_balance,
+            balance_after=balance_after,
+            sequence=sequence,
             reason=reason,
+            **fields
+        )
+
+    @classmethod
+    def create_grant_transaction(cls, user, category, amount, reason, point_id=None, created_by=None):
+        """ポイント付与の取引履歴を作成"""
+        return cls._append(
+            user, category, 'grant', amount, reason,
             related_point_id=point_id,
             created_by=created_by
         )
@@ -119,18 +146,8 @@ class PointTransaction(models.Model):
     @classmethod
     def create_exchange_transaction(cls, user, category, amount, reason, product_id=None, exchange_id=None):
         """商品交換の取引履歴を作成"""
-        from points.models import Point
-        
-        # 現在の残高を計算
-        current_balance = Point.get_user_points_summary(user).get(category.name, 0)
-        
-        return cls.objects.create(
-            user=user,
-            transaction_type='exchange',
-            category=category,
-            amount=-amount,  # 消費は負の値
-            balance_after=current_balance,
-            reason=reason,
+        return cls._append(
+            user, category, 'exchange', -amount, reason,  # 消費は負の値
             related_product_id=product_id,
             related_exchange_id=exchange_id
         )
@@ -138,18 +155,82 @@ class PointTransaction(models.Model):
     @classmethod
     def create_expire_transaction(cls, user, category, amount, reason, point_id=None):
         """ポイント失効の取引履歴を作成"""
-        from points.models import Point
-        
-        # 現在の残高を計算
-        current_balance = Point.get_user_points_summary(user).get(category.name, 0)
-        
-        return cls.objects.create(
-            user=user,
-            transaction_type='expire',
-            category=category,
-            amount=-amount,  # 失効は負の値
-            balance_after=current_balance,
-            reason=reason,
+        return cls._append(
+            user, category, 'expire', -amount, reason,  # 失効は負の値
             related_point_id=point_id
         )
 
+
+class DailyPointStats(models.Model):
+    """日次ポイント集計（取引履歴から作成）"""
+    date = models.DateField('日付')
+    category = models.ForeignKey(
+        PointCategory,
+        on_delete=models.CASCADE,
+        verbose_name='カテゴリ'
+    )
+    granted = models.PositiveBigIntegerField('付与ポイント数', default=0)
+    consumed = models.PositiveBigIntegerField('交換ポイント数', default=0)
+    expired = models.PositiveBigIntegerField('失効ポイント数', default=0)
+    refunded = models.PositiveBigIntegerField('返還ポイント数', default=0)
+    active_users = models.PositiveIntegerField('取引ユーザー数', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = '日次ポイント集計'
+        verbose_name_plural = '日次ポイント集計'
+        db_table = 'daily_point_stats'
+        ordering = ['date', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_point_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.category_id}"
+
+    @classmethod
+    def rollup(cls, date_from, date_to):
+        """
+        指定期間（両端を含む）の日次集計を取引履歴から再作成
+        
+        日単位で洗い替えるため、何度実行しても結果は同じになる。作成した行数を返す。
+        """
+        stats = cls.aggregate(date_from, date_to)
+
+        with transaction.atomic():
+            cls.objects.filter(date__gte=date_from, date__lte=date_to).delete()
+            cls.objects.bulk_create(stats, batch_size=1000)
+
+        return len(stats)
+
+    @classmethod
+    def aggregate(cls, date_from, date_to):
+        """指定期間（両端を含む）の日次集計を取引履歴から計算（保存しない）"""
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(date_from, time.min), tz)
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+
+        rows = PointTransaction.objects.filter(
+            created_at__gte=start, created_at__lt=end
+        ).annotate(
+            date=TruncDate('created_at', tzinfo=tz)
+        ).order_by().values('date', 'category_id').annotate(
+            granted=Sum('amount', filter=Q(transaction_type='grant')),
+            consumed=Sum('amount', filter=Q(transaction_type='exchange')),
+            expired=Sum('amount', filter=Q(transaction_type='expire')),
+            refunded=Sum('amount', filter=Q(transaction_type='refund')),
+            active_users=Count('user_id', distinct=True),
+        )
+
+        return [
+            cls(
+                date=row['date'],
+                category_id=row['category_id'],
+                granted=row['granted'] or 0,
+                consumed=-(row['consumed'] or 0),  # 消費・失効は負の値で記録されている
+                expired=-(row['expired'] or 0),
+                refunded=row['refunded'] or 0,
+                active_users=row['active_users'],
+            )
+            for row in rows
+        ]
@@ -0,0 +1,20 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from jobs.registry import register
+
+
+@register('transactions.rollup_point_stats')
+def rollup_point_stats(job, date_from=None, date_to=None, all=False):
+    """管理ダッシュボード用の日次集計"""
+    args = []
+    if date_from:
+        args += ['--date-from', date_from]
+    if date_to:
+        args += ['--date-to', date_to]
+    if all:
+        args.append('--all')
+    output = StringIO()
+    call_command('rollup_point_stats', *args, stdout=output)
+    return {'output': output.getvalue()}
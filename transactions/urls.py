@@ -1,5 +1,7 @@
 from django.urls import path
+from . import views
 
 urlpatterns = [
-    # プレースホルダー - 後で実装
+    # 管理者用
+    path('admin/export/<str:kind>/', views.export_data, name='export_data'),
 ]
@@ -0,0 +1,46 @@
+from django.contrib.auth.decorators import user_passes_test
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+
+from .exports import EXPORTS, FORMATS, stream_export
+
+
+def is_admin(user):
+    """管理者かどうかチェック"""
+    return user.is_authenticated and user.is_admin
+
+
+@user_passes_test(is_admin)
+def export_data(request, kind):
+    """データ出力（CSV / NDJSON をストリーミングで返す）"""
+    if kind not in EXPORTS:
+        raise Http404
+
+    fmt = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip') == '1'
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest('不明な出力形式です。')
+
+    try:
+        chunks = stream_export(
+            kind,
+            fmt=fmt,
+            compress=compress,
+            date_from=request.GET.get('date_from'),
+            date_to=request.GET.get('date_to'),
+            category=request.GET.get('category'),
+            type_value=request.GET.get('type'),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    filename = f'{kind}_{timezone.localdate():%Y%m%d}.{fmt}'
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    else:
+        content_type = f'{FORMATS[fmt]}; charset=utf-8'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response